@@ -0,0 +1,3 @@
+from hyperbard.pipeline import main
+
+main()
@@ -0,0 +1,488 @@
+"""Benchmarks of the pipeline from TEI files to character rankings.
+
+Every benchmark case is a TEI file that is taken through the stages of
+the pipeline: parsing (get_soup, get_xml_df), annotation (set_onstage,
+set_speaker), aggregation (get_agg_xml_df), every representation
+constructor, loading the representations (load_graph, load_hypergraph),
+and ranking the characters (get_character_ranking). Each stage is timed
+`repeat` times on fresh inputs; the setup of a stage (e.g., copying its
+input) is not timed.
+
+Cases are a small synthetic toy play, selected plays from
+RAWDATA_PATH, scaled copies of these, and synthetic plays from
+`synthetic.write_synthetic_play` with multiples of the size of Hamlet. Runs are
+appended to a JSON history in RESOURCE_USAGE_PATH, and `compare_runs`
+flags the stages that became slower than in a saved baseline run.
+
+Usage:
+
+    python src/hyperbard/benchmark.py run --toy --plays romeo-and-juliet --scales 10
+    python src/hyperbard/benchmark.py run --synthetic 1 10
+    python src/hyperbard/benchmark.py run --toy --save-baseline
+    python src/hyperbard/benchmark.py compare
+"""
+
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from hyperbard.create_graph_representations import GRAPH_EXPANSIONS, get_graph_tables
+from hyperbard.create_hypergraph_representations import (
+    DIRECTED_EXPANSIONS,
+    UNDIRECTED_EXPANSIONS,
+    get_hypergraph_tables,
+)
+from hyperbard.graph_io import load_graph, load_hypergraph
+from hyperbard.hypergraph_representations import get_hypergraph_nodes
+from hyperbard.preprocessing import (
+    get_agg_xml_df,
+    get_body,
+    get_soup,
+    get_xml_df,
+    set_act,
+    set_onstage,
+    set_scene,
+    set_speaker,
+    set_stagegroup,
+)
+from hyperbard.ranking import get_character_ranking
+from hyperbard.statics import RAWDATA_PATH, RESOURCE_USAGE_PATH
+from hyperbard.synthetic import write_synthetic_play
+
+HISTORY_FILE = f"{RESOURCE_USAGE_PATH}/benchmarks.json"
+BASELINE_FILE = f"{RESOURCE_USAGE_PATH}/benchmarks_baseline.json"
+
+# Edge attributes used as weights when loading the graph representations
+# (as in plot_graph_rankings).
+GRAPH_WEIGHTS = {
+    "ce-scene-mw": "n_lines",
+    "ce-group-mw": "n_lines",
+    "ce-scene-w": "count",
+    "ce-group-w": "count",
+    "se-scene-w": "n_lines",
+    "se-group-w": "n_lines",
+    "se-speech-mwd": "n_lines",
+    "se-speech-wd": "n_lines",
+}
+HYPERGRAPH_REPRESENTATIONS = list(UNDIRECTED_EXPANSIONS)
+
+# Parameters of `synthetic.generate_play` for the toy case, which is small
+# enough to run in seconds and fixed so that its timings stay comparable.
+TOY_PARAMETERS = {
+    "seed": 0,
+    "n_characters": 8,
+    "n_acts": 2,
+    "scenes_per_act": 2,
+    "speeches_per_scene": 10,
+}
+
+BENCHMARK_STAGES = (
+    ["get_soup", "get_xml_df", "set_onstage", "set_speaker", "get_agg_xml_df"]
+    + [
+        f"{parameters['constructor'].__name__}[{representation}]"
+        for expansions in [GRAPH_EXPANSIONS, UNDIRECTED_EXPANSIONS]
+        for representation, parameters in expansions.items()
+    ]
+    + [
+        f"{parameters['constructor'].__name__}[{representation}]"
+        for representation, parameters in DIRECTED_EXPANSIONS.items()
+    ]
+    + ["get_hypergraph_nodes"]
+    + [f"load_graph[{representation}]" for representation in GRAPH_EXPANSIONS]
+    + [
+        f"load_hypergraph[{representation}]"
+        for representation in HYPERGRAPH_REPRESENTATIONS
+    ]
+    + ["get_character_ranking"]
+)
+
+
+def _timed(function, setup, repeat):
+    """Call function(*setup()) repeat times, timing only the calls.
+
+    Returns
+    -------
+    tuple
+        Result of the last call and list of the wall times in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def _with_onstage(df):
+    set_onstage(df)
+    set_stagegroup(df)
+    return df
+
+
+def benchmark_file(file, repeat=3):
+    """Time all stages of the pipeline for one TEI file.
+
+    Parameters
+    ----------
+    file : str
+        Path to a TEI file.
+
+    repeat : int
+        Number of timed calls per stage.
+
+    Returns
+    -------
+    list
+        One dictionary per stage (in the order of BENCHMARK_STAGES) with
+        the stage name and the minimum, median, and mean wall time.
+    """
+    timings = {}
+    soup, timings["get_soup"] = _timed(get_soup, lambda: (file,), repeat)
+    body = get_body(soup)
+    xml_df, timings["get_xml_df"] = _timed(get_xml_df, lambda: (body,), repeat)
+    set_act(xml_df)
+    set_scene(xml_df)
+    _, timings["set_onstage"] = _timed(set_onstage, lambda: (xml_df.copy(),), repeat)
+    onstage_df = _with_onstage(xml_df.copy())
+    raw_df = onstage_df.copy()
+    set_speaker(raw_df, body)
+    _, timings["set_speaker"] = _timed(
+        set_speaker, lambda: (onstage_df.copy(), body), repeat
+    )
+    agg_df, timings["get_agg_xml_df"] = _timed(
+        get_agg_xml_df, lambda: (raw_df,), repeat
+    )
+    # Constructors get a copy of agg_df, which misses the frame cache (see
+    # utils.get_frame_cache), so every call builds the membership table.
+    for expansions in [GRAPH_EXPANSIONS, UNDIRECTED_EXPANSIONS]:
+        for representation, parameters in expansions.items():
+            constructor = parameters["constructor"]
+            _, timings[f"{constructor.__name__}[{representation}]"] = _timed(
+                constructor, lambda: (agg_df.copy(), parameters["groupby"]), repeat
+            )
+    for representation, parameters in DIRECTED_EXPANSIONS.items():
+        constructor = parameters["constructor"]
+        _, timings[f"{constructor.__name__}[{representation}]"] = _timed(
+            constructor, lambda: (agg_df.copy(),), repeat
+        )
+    _, timings["get_hypergraph_nodes"] = _timed(
+        get_hypergraph_nodes, lambda: (agg_df.copy(),), repeat
+    )
+
+    play = "benchmark"
+    with tempfile.TemporaryDirectory() as path:
+        tables = get_graph_tables(agg_df)
+        tables.update(get_hypergraph_tables(agg_df))
+        for suffix, table in tables.items():
+            table.to_csv(f"{path}/{play}_{suffix}.csv", index=False)
+        representations = []
+        for representation in GRAPH_EXPANSIONS:
+            weight = GRAPH_WEIGHTS[representation]
+            G, timings[f"load_graph[{representation}]"] = _timed(
+                load_graph,
+                lambda: (play, representation, weight, True, path),
+                repeat,
+            )
+            representations.append(
+                {"name": f"{len(representations):02d}-{representation}", "graph": G}
+            )
+            representations.append(
+                {
+                    "name": f"{len(representations):02d}-{representation}_{weight}",
+                    "graph": G,
+                    "weight": weight,
+                }
+            )
+        for representation in HYPERGRAPH_REPRESENTATIONS:
+            H, timings[f"load_hypergraph[{representation}]"] = _timed(
+                load_hypergraph,
+                lambda: (play, representation, True, False, path),
+                repeat,
+            )
+            representations.append(
+                {"name": f"{len(representations):02d}-{representation}", "graph": H}
+            )
+    _, timings["get_character_ranking"] = _timed(
+        get_character_ranking, lambda: (representations,), repeat
+    )
+    return [
+        {
+            "stage": stage,
+            "min": float(np.min(timings[stage])),
+            "median": float(np.median(timings[stage])),
+            "mean": float(np.mean(timings[stage])),
+        }
+        for stage in BENCHMARK_STAGES
+    ]
+
+
+def get_toy_file(directory):
+    """Write the toy case, a small synthetic play (see TOY_PARAMETERS), to a
+    directory and return its path."""
+    file = os.path.join(directory, "toy.xml")
+    write_synthetic_play(file, **TOY_PARAMETERS)
+    return file
+
+
+def get_play_file(play):
+    """Path of the TEI file of a play, e.g., 'romeo-and-juliet'."""
+    return f"{RAWDATA_PATH}/{play}_TEIsimple_FolgerShakespeare.xml"
+
+
+def _scaled_id(xml_id, replica, width):
+    """Prefix the numeric tail of an xml:id with the replica number, so that
+    replicas keep their order when sorting by xml:id."""
+    match = re.match(r"^(.*?)(\d+)$", xml_id)
+    if match is None:
+        return f"{xml_id}-{replica}"
+    return f"{match.group(1)}{replica:0{width}d}{match.group(2)}"
+
+
+def scale_play(file, factor, out_file):
+    """Write a synthetic play repeating all acts of a play factor times.
+
+    Acts of the replicas are numbered after those of the original, and all
+    xml:ids are made unique while preserving their sort order.
+
+    Parameters
+    ----------
+    file : str
+        Path to a TEI file.
+
+    factor : int
+        Number of replicas of the play, at least 1.
+
+    out_file : str
+        Path of the synthetic TEI file.
+    """
+    if factor < 1:
+        raise ValueError(f"factor={factor}, must be at least 1!")
+    soup = get_soup(file)
+    body = get_body(soup)
+    divs = body.find_all("div", recursive=False)
+    n_acts = max(
+        [int(div.attrs["n"]) for div in divs if div.attrs.get("type") == "act"],
+        default=0,
+    )
+    width = len(str(factor - 1))
+    for replica in range(1, factor):
+        for div in divs:
+            replica_div = copy.copy(div)
+            if replica_div.attrs.get("type") == "act":
+                replica_div.attrs["n"] = str(int(div.attrs["n"]) + replica * n_acts)
+            for elem in [replica_div] + replica_div.find_all(True):
+                if "xml:id" in elem.attrs:
+                    elem.attrs["xml:id"] = _scaled_id(
+                        elem.attrs["xml:id"], replica, width
+                    )
+            body.append(replica_div)
+    for div in divs:
+        for elem in [div] + div.find_all(True):
+            if "xml:id" in elem.attrs:
+                elem.attrs["xml:id"] = _scaled_id(elem.attrs["xml:id"], 0, width)
+    with open(out_file, "w") as f:
+        f.write(str(soup))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases, repeat=3):
+    """Benchmark several cases.
+
+    Parameters
+    ----------
+    cases : dict
+        Dictionary mapping case names (e.g., 'toy', 'hamlet-x10') to TEI
+        files.
+
+    repeat : int
+        Number of timed calls per stage.
+
+    Returns
+    -------
+    dict
+        Run with metadata (timestamp, commit, python, repeat) and one
+        result per case and stage.
+    """
+    results = []
+    for case, file in cases.items():
+        print(f"Benchmarking {case}...")
+        results.extend(
+            {"case": case, **result} for result in benchmark_file(file, repeat)
+        )
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def load_history(file=HISTORY_FILE):
+    """Runs recorded in a history file, oldest first."""
+    if not os.path.exists(file):
+        return []
+    with open(file) as f:
+        return json.load(f)
+
+
+def append_history(run, file=HISTORY_FILE):
+    """Append a run to a history file."""
+    history = load_history(file)
+    history.append(run)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    with open(file, "w") as f:
+        json.dump(history, f, indent=1)
+
+
+def save_baseline(run, file=BASELINE_FILE):
+    """Save a run as the baseline for future comparisons."""
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    with open(file, "w") as f:
+        json.dump(run, f, indent=1)
+
+
+def load_baseline(file=BASELINE_FILE):
+    with open(file) as f:
+        return json.load(f)
+
+
+def compare_runs(run, baseline, tolerance=0.25, min_difference=1e-3):
+    """Compare the minimum wall times of a run with those of a baseline.
+
+    Parameters
+    ----------
+    run, baseline : dict
+        Runs as returned by `run_benchmarks`.
+
+    tolerance : float
+        Relative slowdown above which a stage counts as regression.
+
+    min_difference : float
+        Absolute slowdown in seconds below which differences are ignored,
+        which keeps very fast stages from being flagged due to noise.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per case and stage present in both runs, with the baseline
+        and current times, their ratio, and a boolean regression column.
+    """
+    columns = ["case", "stage", "min"]
+    comparison = pd.merge(
+        pd.DataFrame(baseline["results"], columns=columns),
+        pd.DataFrame(run["results"], columns=columns),
+        on=["case", "stage"],
+        suffixes=("_baseline", "_current"),
+    ).rename(columns={"min_baseline": "baseline", "min_current": "current"})
+    comparison["ratio"] = comparison.current / comparison.baseline
+    comparison["regression"] = (comparison.ratio > 1 + tolerance) & (
+        comparison.current - comparison.baseline > min_difference
+    )
+    return comparison
+
+
+def get_cases(toy, plays, scales, synthetic, directory):
+    """Benchmark cases for the synthetic toy play, selected plays, their
+    scaled versions, and synthetic plays of the given scales, with generated
+    files written to directory."""
+    cases = {}
+    if toy or not (plays or synthetic):
+        cases["toy"] = get_toy_file(directory)
+    for play in plays:
+        cases[play] = get_play_file(play)
+    for case, file in list(cases.items()):
+        for factor in scales:
+            scaled_file = os.path.join(directory, f"{case}-x{factor}.xml")
+            scale_play(file, factor, scaled_file)
+            cases[f"{case}-x{factor}"] = scaled_file
+    for scale in synthetic:
+        synthetic_file = os.path.join(directory, f"synthetic-x{scale}.xml")
+        write_synthetic_play(synthetic_file, scale=scale)
+        cases[f"synthetic-x{scale}"] = synthetic_file
+    return cases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "--toy", action="store_true", help="Benchmark the toy play (default)"
+    )
+    run_parser.add_argument(
+        "--plays", nargs="*", default=[], help="Plays to benchmark, e.g., hamlet"
+    )
+    run_parser.add_argument(
+        "--scales",
+        nargs="*",
+        type=int,
+        default=[],
+        help="Also benchmark synthetic plays repeating each case this often",
+    )
+    run_parser.add_argument(
+        "--synthetic",
+        nargs="*",
+        type=int,
+        default=[],
+        help="Benchmark generated plays of these multiples of the size of Hamlet",
+    )
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="If set, saves the run as baseline for comparisons",
+    )
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare the latest run with the baseline"
+    )
+    compare_parser.add_argument("--baseline", default=BASELINE_FILE)
+    compare_parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        with tempfile.TemporaryDirectory() as directory:
+            cases = get_cases(
+                args.toy, args.plays, args.scales, args.synthetic, directory
+            )
+            run = run_benchmarks(cases, repeat=args.repeat)
+        append_history(run)
+        if args.save_baseline:
+            save_baseline(run)
+        print(pd.DataFrame(run["results"]).to_string(index=False))
+    else:
+        history = load_history()
+        if not history:
+            sys.exit(f"No benchmark runs found in {HISTORY_FILE}!")
+        if not os.path.exists(args.baseline):
+            sys.exit(f"No baseline found at {args.baseline}!")
+        comparison = compare_runs(
+            history[-1], load_baseline(args.baseline), tolerance=args.tolerance
+        )
+        print(comparison.to_string(index=False))
+        if comparison.regression.any():
+            sys.exit(f"{comparison.regression.sum()} stage(s) regressed!")
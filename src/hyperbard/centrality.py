@@ -0,0 +1,572 @@
+"""Spectral centralities for (hyper)graph representations.
+
+Centralities are computed by (Krylov or power) iteration on sparse
+adjacency matrices. For the representations of a play, these matrices are derived
+directly from its canonical incidence (see `hyperbard.incidence`), and
+the solution for the scene-level representation is used as a warm start
+for the corresponding stagegroup-level representation.
+"""
+
+from collections import OrderedDict
+
+import hypernetx as hnx
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.graph_io import load_hypergraph, load_node_weights
+from hyperbard.incidence import get_play_incidence
+
+CENTRALITIES = ["eigenvector", "pagerank", "katz"]
+
+CENTRALITY_REPRESENTATIONS = [
+    "se-scene-b",
+    "se-scene-w",
+    "se-group-b",
+    "se-group-w",
+    "ce-scene-b",
+    "ce-scene-mb",
+    "ce-scene-mw",
+    "ce-group-b",
+    "ce-group-mb",
+    "ce-group-mw",
+    "hg-scene-mb",
+    "hg-scene-mw",
+    "hg-group-mb",
+    "hg-group-mw",
+]
+
+
+def power_iteration(operator, x0, tol=1e-10, max_iter=1000):
+    """Iterate `x <- operator(x)` with L1 normalisation until convergence.
+
+    Parameters
+    ----------
+    operator : callable
+        Function mapping a nonnegative vector to a nonnegative vector.
+
+    x0 : np.ndarray
+        Nonnegative start vector.
+
+    tol : float
+        Convergence threshold on the L1 change, per entry.
+
+    max_iter : int
+        Maximum number of iterations.
+
+    Returns
+    -------
+    np.ndarray
+        Fixed point of the normalised iteration, summing to one.
+    """
+    x = x0 / x0.sum()
+    for _ in range(max_iter):
+        x_next = operator(x)
+        x_next = x_next / x_next.sum()
+        if np.abs(x_next - x).sum() < len(x) * tol:
+            return x_next
+        x = x_next
+    raise RuntimeError(f"Power iteration did not converge in {max_iter} iterations!")
+
+
+def _start_vector(n, x0):
+    if x0 is None or len(x0) != n or not np.any(x0 > 0):
+        return np.ones(n)
+    # Keep the iteration away from zero entries of a previous solution.
+    return x0 + x0[x0 > 0].min()
+
+
+def eigenvector_centrality(A, x0=None, tol=1e-10, max_iter=1000):
+    """Eigenvector centrality of a (weighted) adjacency matrix.
+
+    Computes the dominant left eigenvector, like
+    `networkx.eigenvector_centrality_numpy`, normalised to Euclidean norm
+    one. Plain power iteration converges too slowly on weighted bipartite
+    graphs (whose second eigenvalue is the negated first one), hence the
+    Krylov solvers of ARPACK are used, with `x0` as start vector.
+    """
+    A = sp.csr_matrix(A, dtype=float)
+    n = A.shape[0]
+    if n < 3:
+        eigenvalues, eigenvectors = np.linalg.eig(A.T.toarray())
+        x = eigenvectors[:, np.argmax(eigenvalues.real)].real
+    else:
+        v0 = _start_vector(n, x0)
+        if (A != A.T).nnz == 0:
+            _, eigenvectors = spla.eigsh(
+                A, k=1, which="LA", v0=v0, tol=tol, maxiter=max_iter * n
+            )
+        else:
+            _, eigenvectors = spla.eigs(
+                A.T, k=1, which="LR", v0=v0, tol=tol, maxiter=max_iter * n
+            )
+        x = eigenvectors[:, 0].real
+    x = x if x.sum() >= 0 else -x
+    x[np.abs(x) < tol] = 0.0
+    return x / np.linalg.norm(x)
+
+
+def pagerank(A, alpha=0.85, x0=None, tol=1e-10, max_iter=1000):
+    """PageRank of a (weighted) adjacency matrix.
+
+    Matches `networkx.pagerank` with uniform personalization: the mass of
+    dangling nodes is redistributed uniformly.
+    """
+    A = sp.csr_matrix(A)
+    n = A.shape[0]
+    out_weights = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_weights == 0
+    inverse_out_weights = np.divide(1.0, out_weights, out=np.zeros(n), where=~dangling)
+    P = sp.diags(inverse_out_weights) @ A
+    PT = P.T.tocsr()
+
+    def operator(x):
+        return alpha * (PT @ x + x[dangling].sum() / n) + (1 - alpha) / n
+
+    return power_iteration(operator, _start_vector(n, x0), tol, max_iter)
+
+
+def katz_centrality(A, alpha=None, beta=1.0, x0=None, tol=1e-10, max_iter=1000):
+    """Katz centrality of a (weighted) adjacency matrix.
+
+    Solves x = alpha A^T x + beta by fixed-point iteration and returns a
+    vector with Euclidean norm one, like `networkx.katz_centrality`. If
+    `alpha` is None, it is set to 0.9 over the maximum weighted in-degree,
+    an upper bound on the spectral radius of A, so that the iteration
+    converges.
+    """
+    A = sp.csr_matrix(A)
+    n = A.shape[0]
+    AT = A.T.tocsr()
+    if alpha is None:
+        max_degree = np.abs(AT).sum(axis=1).max() if n else 0
+        alpha = 0.9 / max_degree if max_degree > 0 else 0.0
+    x = np.ones(n) if x0 is None or len(x0) != n else x0.copy()
+    for _ in range(max_iter):
+        x_next = alpha * (AT @ x) + beta
+        if np.abs(x_next - x).sum() < n * tol * np.abs(x_next).sum():
+            return x_next / np.linalg.norm(x_next)
+        x = x_next
+    raise RuntimeError(f"Katz iteration did not converge in {max_iter} iterations!")
+
+
+CENTRALITY_FUNCTIONS = {
+    "eigenvector": eigenvector_centrality,
+    "pagerank": pagerank,
+    "katz": katz_centrality,
+}
+
+
+def compute_centrality(A, centrality="eigenvector", x0=None, **kwargs):
+    """Compute one of the CENTRALITIES of an adjacency matrix."""
+    if centrality not in CENTRALITY_FUNCTIONS:
+        raise ValueError(f"centrality={centrality}, must be in {CENTRALITIES}!")
+    return CENTRALITY_FUNCTIONS[centrality](A, x0=x0, **kwargs)
+
+
+def representation_adjacency(incidence, representation, weight="n_lines"):
+    """Build the adjacency matrix of a representation from the incidence of a
+    play.
+
+    - ce-{scene,group}-b: binary co-occurrence of characters;
+    - ce-{scene,group}-{mb,mw}: number of co-occurrences, resp. summed
+      weights of the text units in which characters co-occur;
+    - se-{scene,group}-{b,w}: bipartite character/text unit adjacency,
+      characters first, with unit weights for the weighted variant;
+    - hg-{scene,group}-{mb,mw}: B W B^T for the character x text unit
+      incidence B and (unit) edge weights W, which unlike the clique
+      expansion keeps the diagonal, i.e., the weight of all edges a
+      character is part of.
+
+    Parameters
+    ----------
+    incidence : PlayIncidence
+        Canonical incidence of a play, see `get_play_incidence`.
+
+    representation : str
+        One of CENTRALITY_REPRESENTATIONS.
+
+    weight : str
+        Text unit attribute used as weight by the weighted representations.
+
+    Returns
+    -------
+    tuple
+        (adjacency matrix, positions of its character rows within
+        `incidence.characters`). Characters that are not nodes of the
+        representation are left out; character rows come first.
+    """
+    if representation not in CENTRALITY_REPRESENTATIONS:
+        raise ValueError(
+            f"representation={representation}, must be in {CENTRALITY_REPRESENTATIONS}!"
+        )
+    expansion, level, variant = representation.split("-")
+    units = incidence[level]
+    B = units.onstage
+    weights = units.weights(weight if "w" in variant else None)
+    BW = B @ sp.diags(weights)
+    present = np.flatnonzero(np.asarray(B.sum(axis=1)).ravel() > 0)
+    if expansion == "se":
+        B = B[present]
+        BW = BW[present]
+        A = sp.bmat([[None, BW], [BW.T, None]], format="csr")
+        return A, present
+    A = (BW @ B.T).tocsr()
+    if expansion == "ce":
+        A.setdiag(0)
+        A.eliminate_zeros()
+        if variant == "b":
+            A.data[:] = 1.0
+        # Characters without co-occurrences are not in the clique expansion.
+        present = np.flatnonzero(np.diff(A.indptr) > 0)
+    return A[present][:, present], present
+
+
+def get_centrality_matrix(
+    df,
+    centrality="eigenvector",
+    representations=CENTRALITY_REPRESENTATIONS,
+    weight="n_lines",
+    **kwargs,
+):
+    """Compute a centrality of the characters of a play in many
+    representations.
+
+    Representations are processed scene level first, and the scene-level
+    solution of each representation is the start vector for its
+    stagegroup-level counterpart.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Aggregated dataframe of a play, as loaded from an .agg.csv file.
+
+    centrality : str
+        One of CENTRALITIES.
+
+    representations : list
+        Representations from CENTRALITY_REPRESENTATIONS.
+
+    weight : str
+        Text unit attribute used as weight by the weighted representations.
+
+    Returns
+    -------
+    pd.DataFrame
+        Data frame indexed by character with one column per
+        representation (NaN where a character is not a node).
+    """
+    incidence = get_play_incidence(df)
+    n_characters = len(incidence.characters)
+    solutions = OrderedDict()
+    previous = {}
+    ordered = sorted(representations, key=lambda r: r.split("-")[1] != "scene")
+    for representation in ordered:
+        A, present = representation_adjacency(incidence, representation, weight)
+        expansion, level, variant = representation.split("-")
+        warm = previous.get((expansion, variant))
+        x0 = None
+        if warm is not None:
+            x0 = warm[present]
+            if expansion == "se":
+                x0 = np.nan_to_num(x0)
+                x0 = np.concatenate([x0, incidence[level].onstage[present].T @ x0])
+            x0 = np.nan_to_num(x0)
+        values = compute_centrality(A, centrality, x0=x0, **kwargs)
+        result = np.full(n_characters, np.nan)
+        result[present] = values[: len(present)]
+        solutions[representation] = result
+        previous[(expansion, variant)] = result
+    return pd.DataFrame(
+        np.column_stack([solutions[r] for r in representations])
+        if representations
+        else np.empty((n_characters, 0)),
+        index=incidence.characters,
+        columns=list(representations),
+    )
+
+
+def graph_centrality(G, centrality="eigenvector", weight=None, **kwargs):
+    """Compute a centrality of the character nodes of a graph or hypergraph.
+
+    Parameters
+    ----------
+    G : nx.Graph, nx.DiGraph, nx.MultiGraph, nx.MultiDiGraph,
+        hnx.Hypergraph, or CompactHypergraph
+        For graphs with a "node_type" node attribute, centralities are
+        computed on the whole graph but only returned for nodes of type
+        "character". Hypergraphs are handled via B W B^T, see
+        `representation_adjacency`.
+
+    centrality : str
+        One of CENTRALITIES, or "hypergraph_pagerank" for the random-walk
+        PageRank of a hypergraph (see `hypergraph_pagerank`).
+
+    weight : None or str
+        If specified, use the edge attribute named `weight`.
+
+    Returns
+    -------
+    dict
+        Dictionary with nodes as keys and centralities as values.
+    """
+    if isinstance(G, hnx.Hypergraph):
+        G = CompactHypergraph.from_hnx(G)
+    if centrality == "hypergraph_pagerank":
+        if not isinstance(G, CompactHypergraph):
+            raise ValueError(f"{centrality} requires a hypergraph, got {type(G)}!")
+        return hypergraph_pagerank(G, edge_weight=weight, **kwargs)
+    if isinstance(G, CompactHypergraph):
+        B = G.incidence_matrix()
+        A = B @ G.incidence_matrix(weight=weight).T
+        values = compute_centrality(A, centrality, **kwargs)
+        return dict(zip(G.node_ids, values))
+    if not isinstance(G, nx.Graph):
+        raise ValueError(f"Unsupported representation type: {type(G)}!")
+    nodes = list(G.nodes)
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format="csr")
+    values = compute_centrality(A, centrality, **kwargs)
+    node_types = dict(G.nodes(data="node_type"))
+    if any(node_type is not None for node_type in node_types.values()):
+        return {
+            node: value
+            for node, value in zip(nodes, values)
+            if node_types[node] == "character"
+        }
+    return dict(zip(nodes, values))
+
+
+HYPERGRAPH_KEY_COLUMNS = ["act", "scene", "stagegroup"]
+
+
+def node_in_edge_weights(H, node_weights, weight="n_lines_speaker"):
+    """Look up the weight of every node in every hyperedge it belongs to.
+
+    Parameters
+    ----------
+    H : CompactHypergraph
+        Hypergraph whose edges carry (a subset of) the key columns "act",
+        "scene", and "stagegroup" as attributes, e.g., built from an
+        `hg-*.edges.csv` file.
+
+    node_weights : pd.DataFrame
+        Edge-specific node weights as written to the `hg-*.node-weights.csv`
+        files, with columns "node", the key columns, and `weight`.
+
+    weight : str
+        Column of `node_weights` to use, e.g., "n_lines_speaker" or
+        "n_tokens_speaker". (The "*_onstage" columns equal the edge weight
+        for all members of an edge and hence do not change the walk.)
+
+    Returns
+    -------
+    np.ndarray
+        Float array aligned with `H.indices` (0 for missing entries).
+    """
+    keys = [
+        c
+        for c in HYPERGRAPH_KEY_COLUMNS
+        if c in H.edge_attributes and c in node_weights
+    ]
+    edge_positions = H.incidence_edges()
+    entries = pd.DataFrame(
+        {
+            "node": H.node_ids[H.indices],
+            **{key: H.edge_attributes[key][edge_positions] for key in keys},
+        }
+    )
+    merged = entries.merge(
+        node_weights[["node"] + keys + [weight]], on=["node"] + keys, how="left"
+    )
+    return merged[weight].fillna(0).values.astype(float)
+
+
+def hypergraph_transition_matrix(H, edge_weight="n_lines", node_weights=None):
+    """Transition matrix of the random walk on a hypergraph with
+    edge-dependent vertex weights.
+
+    From node v, the walk picks a hyperedge e containing v with probability
+    proportional to its weight w(e), and then a node u of e with
+    probability proportional to the weight g_e(u) of u in e, i.e.,
+    P = D_V^-1 B W D_E^-1 G^T with incidence matrix B, edge weights W, and
+    node-in-edge weights G.
+
+    Parameters
+    ----------
+    H : CompactHypergraph
+
+    edge_weight : None or str
+        Edge attribute used as w(e); uniform if None.
+
+    node_weights : None or np.ndarray
+        Node-in-edge weights aligned with `H.indices`, see
+        `node_in_edge_weights`; uniform if None.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        (nodes x nodes) matrix whose rows sum to one, except for rows of
+        nodes whose hyperedges all have zero weight (or zero total node
+        weight), which sum to less.
+    """
+    n_nodes, n_edges = H.shape
+    B = H.incidence_matrix()
+    G = B
+    if node_weights is not None:
+        G = sp.csr_matrix(
+            (np.asarray(node_weights, dtype=float), (H.indices, H.incidence_edges())),
+            shape=(n_nodes, n_edges),
+        )
+    edge_weights = H._edge_values(edge_weight).astype(float)
+    node_degrees = B @ edge_weights
+    edge_totals = np.asarray(G.sum(axis=0)).ravel()
+    inverse_node_degrees = np.divide(
+        1.0, node_degrees, out=np.zeros(n_nodes), where=node_degrees > 0
+    )
+    edge_factors = np.divide(
+        edge_weights, edge_totals, out=np.zeros(n_edges), where=edge_totals > 0
+    )
+    return (sp.diags(inverse_node_degrees) @ B @ sp.diags(edge_factors) @ G.T).tocsr()
+
+
+def batch_pagerank(transitions, alpha=0.85, tol=1e-10, max_iter=1000):
+    """PageRank for many random walks at once.
+
+    The transition matrices are stacked into one block-diagonal sparse
+    matrix, so that every iteration is a single sparse matrix-vector
+    product for all of them. Teleportation, as well as the probability
+    mass lost from rows summing to less than one, is redistributed
+    uniformly within each block.
+
+    Parameters
+    ----------
+    transitions : list
+        Row-(sub)stochastic sparse transition matrices.
+
+    alpha : float
+        Damping parameter.
+
+    Returns
+    -------
+    list
+        One PageRank vector (summing to one) per transition matrix.
+    """
+    sizes = np.array([P.shape[0] for P in transitions], dtype=np.int64)
+    if not len(sizes):
+        return []
+    blocks = np.repeat(np.arange(len(sizes)), sizes)
+    block_sizes = np.maximum(sizes, 1)[blocks].astype(float)
+    P = sp.block_diag(transitions, format="csr")
+    PT = P.T.tocsr()
+    leak = np.clip(1.0 - np.asarray(P.sum(axis=1)).ravel(), 0.0, None)
+    x = 1.0 / block_sizes
+    for _ in range(max_iter):
+        leaked = np.bincount(blocks, weights=x * leak, minlength=len(sizes))
+        x_next = alpha * (PT @ x + leaked[blocks] / block_sizes)
+        x_next += (1 - alpha) / block_sizes
+        change = np.bincount(blocks, weights=np.abs(x_next - x), minlength=len(sizes))
+        x = x_next
+        if np.all(change < np.maximum(sizes, 1) * tol):
+            return np.split(x, np.cumsum(sizes)[:-1])
+    raise RuntimeError(f"PageRank did not converge in {max_iter} iterations!")
+
+
+def batch_hypergraph_pagerank(
+    hypergraphs,
+    edge_weight="n_lines",
+    node_weight="n_lines_speaker",
+    alpha=0.85,
+    **kwargs,
+):
+    """Random-walk PageRank of many hypergraphs, e.g., of all plays.
+
+    Parameters
+    ----------
+    hypergraphs : dict
+        Dictionary mapping names (e.g., plays) to CompactHypergraph
+        objects, or to (CompactHypergraph, node weights table) pairs, in
+        which case the `node_weight` column of the table provides the
+        node-in-edge weights (see `node_in_edge_weights`).
+
+    edge_weight : None or str
+        Edge attribute used as hyperedge weight.
+
+    node_weight : str
+        Column of the node weights tables to use, see `node_in_edge_weights`.
+
+    alpha : float
+        Damping parameter.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping the names to pd.Series of PageRank values
+        indexed by node.
+    """
+    transitions = []
+    node_ids = []
+    for value in hypergraphs.values():
+        H, node_weights = value if isinstance(value, tuple) else (value, None)
+        if node_weights is not None:
+            node_weights = node_in_edge_weights(H, node_weights, weight=node_weight)
+        transitions.append(hypergraph_transition_matrix(H, edge_weight, node_weights))
+        node_ids.append(H.node_ids)
+    values = batch_pagerank(transitions, alpha=alpha, **kwargs)
+    return {
+        name: pd.Series(x, index=pd.Index(nodes, name="node"))
+        for name, x, nodes in zip(hypergraphs, values, node_ids)
+    }
+
+
+def hypergraph_pagerank(H, edge_weight="n_lines", node_weights=None, **kwargs):
+    """Random-walk PageRank of a single hypergraph, see
+    `batch_hypergraph_pagerank`."""
+    value = H if node_weights is None else (H, node_weights)
+    return batch_hypergraph_pagerank({0: value}, edge_weight, **kwargs)[0].to_dict()
+
+
+def get_hypergraph_pageranks(
+    plays,
+    representation="hg-group-mw",
+    edge_weight="n_lines",
+    node_weight="n_lines_speaker",
+    **kwargs,
+):
+    """Random-walk PageRank of one hypergraph representation for many plays,
+    loaded from the edge and node weight tables in GRAPHDATA_PATH and
+    computed in one batch.
+
+    Parameters
+    ----------
+    plays : list
+        Play identifiers, e.g. ['romeo-and-juliet'].
+
+    representation : str
+        "hg-scene-mw" or "hg-group-mw".
+
+    edge_weight : None or str
+        Edge attribute used as hyperedge weight.
+
+    node_weight : None or str
+        Column of the node weight tables used as node-in-edge weights;
+        uniform if None.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping plays to pd.Series of PageRank values indexed by
+        character.
+    """
+    hypergraphs = OrderedDict()
+    for play in plays:
+        H = load_hypergraph(play, representation, compact=True)
+        if node_weight is None:
+            hypergraphs[play] = H
+        else:
+            hypergraphs[play] = (H, load_node_weights(play, representation))
+    return batch_hypergraph_pagerank(
+        hypergraphs, edge_weight=edge_weight, node_weight=node_weight, **kwargs
+    )
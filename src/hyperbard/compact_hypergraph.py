@@ -0,0 +1,444 @@
+"""Compact array-backed hypergraphs.
+
+`hnx.Hypergraph` objects hold one Python object per node and per edge,
+which makes them expensive to build and to query. For analysis tasks
+that only need memberships, edge sizes, and edge attributes (such as
+degree rankings), `CompactHypergraph` stores the incidence structure in
+compressed sparse row (CSR) arrays over interned node identifiers and
+keeps edge attributes as columns. It can be converted to a
+`hnx.Hypergraph` whenever a hypergraph needs to be drawn.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class EdgeView:
+    """Lightweight view on a single edge of a `CompactHypergraph`.
+
+    Edge attributes are looked up in the attribute columns of the
+    hypergraph, so `getattr(H.edges[e], "n_lines")` works as it does
+    for `hnx.Hypergraph` edges.
+    """
+
+    __slots__ = ("_hypergraph", "_position")
+
+    def __init__(self, hypergraph, position):
+        self._hypergraph = hypergraph
+        self._position = position
+
+    @property
+    def uid(self):
+        return self._hypergraph.edge_ids[self._position]
+
+    @property
+    def elements(self):
+        return self._hypergraph.members(self.uid)
+
+    def __getattr__(self, name):
+        columns = self._hypergraph.edge_attributes
+        if name in columns:
+            return columns[name][self._position]
+        raise AttributeError(f"Edge {self.uid} has no attribute '{name}'")
+
+    def __len__(self):
+        indptr = self._hypergraph.indptr
+        return int(indptr[self._position + 1] - indptr[self._position])
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __repr__(self):
+        return f"EdgeView({self.uid}, {self.elements})"
+
+
+class EdgeCollection:
+    """Mapping-like access to the edges of a `CompactHypergraph`."""
+
+    __slots__ = ("_hypergraph",)
+
+    def __init__(self, hypergraph):
+        self._hypergraph = hypergraph
+
+    def __getitem__(self, edge_id):
+        return EdgeView(self._hypergraph, self._hypergraph.edge_position(edge_id))
+
+    def __iter__(self):
+        return iter(self._hypergraph.edge_ids)
+
+    def __len__(self):
+        return len(self._hypergraph.edge_ids)
+
+    def __contains__(self, edge_id):
+        return edge_id in self._hypergraph._edge_index
+
+
+class CompactHypergraph:
+    """Hypergraph stored as CSR incidence arrays over interned node IDs.
+
+    Parameters
+    ----------
+    node_ids : array-like
+        Node identifiers; the position of a node in this array is its
+        interned integer ID.
+
+    edge_ids : list
+        Edge identifiers, one per edge.
+
+    indptr : np.ndarray
+        CSR row pointer of length `len(edge_ids) + 1`; the members of
+        edge `i` are `indices[indptr[i]:indptr[i + 1]]`.
+
+    indices : np.ndarray
+        Interned node IDs of the edge members.
+
+    edge_attributes : None or dict
+        Dictionary mapping attribute names to arrays with one entry
+        per edge.
+    """
+
+    __slots__ = (
+        "node_ids",
+        "edge_ids",
+        "indptr",
+        "indices",
+        "edge_attributes",
+        "_node_index",
+        "_edge_index",
+    )
+
+    def __init__(self, node_ids, edge_ids, indptr, indices, edge_attributes=None):
+        self.node_ids = np.asarray(node_ids, dtype=object)
+        self.edge_ids = list(edge_ids)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.edge_attributes = {
+            k: np.asarray(v) for k, v in (edge_attributes or {}).items()
+        }
+        assert len(self.indptr) == len(self.edge_ids) + 1, RuntimeError(
+            f"Expected {len(self.edge_ids) + 1} row pointers, got {len(self.indptr)}!"
+        )
+        for k, v in self.edge_attributes.items():
+            assert len(v) == len(self.edge_ids), RuntimeError(
+                f"Edge attribute '{k}' has {len(v)} values, expected {len(self.edge_ids)}!"
+            )
+        self._node_index = {n: i for i, n in enumerate(self.node_ids)}
+        self._edge_index = {e: i for i, e in enumerate(self.edge_ids)}
+
+    @classmethod
+    def from_setsystem(cls, setsystem, edge_attributes=None):
+        """Build a compact hypergraph from a set system.
+
+        Parameters
+        ----------
+        setsystem : dict
+            Dictionary with edge identifiers as keys and iterables of
+            node identifiers (or whitespace-separated strings thereof)
+            as values.
+
+        edge_attributes : None or dict
+            Optional dictionary mapping attribute names to array-like
+            columns, aligned with the iteration order of `setsystem`.
+
+        Returns
+        -------
+        CompactHypergraph
+        """
+        edge_ids = list(setsystem.keys())
+        members = [
+            sorted(set(m.split() if isinstance(m, str) else m))
+            for m in setsystem.values()
+        ]
+        sizes = np.fromiter(
+            (len(m) for m in members), dtype=np.int64, count=len(members)
+        )
+        indptr = np.concatenate([[0], np.cumsum(sizes)])
+        flat = np.empty(int(sizes.sum()), dtype=object)
+        flat[:] = [node for m in members for node in m]
+        node_ids, indices = (
+            np.unique(flat, return_inverse=True)
+            if len(flat)
+            else (np.array([], dtype=object), np.array([], dtype=np.int64))
+        )
+        return cls(node_ids, edge_ids, indptr, indices, edge_attributes)
+
+    @classmethod
+    def from_edges(cls, edges, member_column="onstage"):
+        """Build a compact hypergraph from a hyperedge table.
+
+        Parameters
+        ----------
+        edges : pd.DataFrame
+            Table with one row per hyperedge, e.g., as loaded from an
+            `hg-*.edges.csv` file. The index provides the edge identifiers.
+
+        member_column : str
+            Column holding the members of each hyperedge, either as lists
+            or as whitespace-separated strings. All other columns are
+            kept as edge attributes.
+
+        Returns
+        -------
+        CompactHypergraph
+        """
+        setsystem = dict(zip(edges.index, edges[member_column]))
+        edge_attributes = {
+            column: edges[column].values
+            for column in edges.columns
+            if column != member_column
+        }
+        return cls.from_setsystem(setsystem, edge_attributes)
+
+    @classmethod
+    def from_hnx(cls, H):
+        """Build a compact hypergraph from a `hnx.Hypergraph`, keeping all
+        edge properties shared by every edge as edge attributes.
+        """
+        edge_ids = list(H.edges)
+        properties = [H.edges[e].properties for e in edge_ids]
+        shared = set.intersection(*(set(p) for p in properties)) if properties else []
+        return cls.from_setsystem(
+            {e: list(H.edges[e]) for e in edge_ids},
+            {k: [p[k] for p in properties] for k in sorted(shared)},
+        )
+
+    @property
+    def shape(self):
+        return len(self.node_ids), len(self.edge_ids)
+
+    @property
+    def nodes(self):
+        return list(self.node_ids)
+
+    @property
+    def edges(self):
+        return EdgeCollection(self)
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return iter(self.node_ids)
+
+    def __contains__(self, node):
+        return node in self._node_index
+
+    def __repr__(self):
+        n_nodes, n_edges = self.shape
+        return f"CompactHypergraph(nodes={n_nodes}, edges={n_edges})"
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.edge_ids)
+
+    def edge_position(self, edge_id):
+        return self._edge_index[edge_id]
+
+    def edge_sizes(self):
+        """Return the cardinality of every edge as an array."""
+        return np.diff(self.indptr)
+
+    def members(self, edge_id):
+        """Return the node identifiers contained in an edge."""
+        i = self._edge_index[edge_id]
+        return list(self.node_ids[self.indices[self.indptr[i] : self.indptr[i + 1]]])
+
+    def memberships(self, node):
+        """Return the identifiers of all edges containing a node."""
+        positions = np.flatnonzero(self.indices == self._node_index[node])
+        edges = np.searchsorted(self.indptr, positions, side="right") - 1
+        return [self.edge_ids[e] for e in edges]
+
+    def incidence_edges(self):
+        """Return, for every incidence, the position of its edge."""
+        return np.repeat(np.arange(len(self.edge_ids)), self.edge_sizes())
+
+    def incidence_matrix(self, weight=None):
+        """Return the (nodes x edges) incidence matrix.
+
+        Parameters
+        ----------
+        weight : None or str
+            If set, use the specified edge attribute as matrix entries
+            instead of ones.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+        """
+        n_nodes, n_edges = self.shape
+        if weight is None:
+            data = np.ones(len(self.indices))
+        else:
+            data = np.repeat(
+                self.edge_attributes[weight].astype(float), self.edge_sizes()
+            )
+        return sp.csr_matrix(
+            (data, (self.indices, self.incidence_edges())), shape=(n_nodes, n_edges)
+        )
+
+    def _edge_values(self, weight=None):
+        if weight is None:
+            return np.ones(len(self.edge_ids), dtype=np.int64)
+        return self.edge_attributes[weight]
+
+    def degree_array(self, weight=None, min_size=None, max_size=None):
+        """Return (weighted) degrees of all nodes as an array.
+
+        Parameters
+        ----------
+        weight : None or str
+            If set, sum the specified edge attribute instead of
+            counting edges.
+
+        min_size, max_size : None or int
+            If set, only consider edges of at least resp. at most this
+            cardinality.
+
+        Returns
+        -------
+        np.ndarray
+            Degrees aligned with `node_ids`.
+        """
+        values = self._edge_values(weight)
+        sizes = self.edge_sizes()
+        mask = np.ones(len(sizes), dtype=bool)
+        if min_size is not None:
+            mask &= sizes >= min_size
+        if max_size is not None:
+            mask &= sizes <= max_size
+        per_incidence = np.repeat(np.where(mask, values, 0), sizes)
+        degrees = np.bincount(
+            self.indices, weights=per_incidence, minlength=len(self.node_ids)
+        )
+        if np.issubdtype(values.dtype, np.integer):
+            return degrees.astype(np.int64)
+        return degrees
+
+    def size_histogram(self, weight=None):
+        """Return (weighted) edge counts per node and edge cardinality.
+
+        Parameters
+        ----------
+        weight : None or str
+            If set, sum the specified edge attribute instead of
+            counting edges.
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape `(number_of_nodes, max_size + 1)` whose entry
+            `[n, k]` aggregates the edges of cardinality `k` containing
+            node `n`; rows are aligned with `node_ids`.
+        """
+        sizes = self.edge_sizes()
+        values = self._edge_values(weight)
+        width = int(sizes.max()) + 1 if len(sizes) else 1
+        histogram = np.bincount(
+            self.indices * width + np.repeat(sizes, sizes),
+            weights=np.repeat(values, sizes),
+            minlength=len(self.node_ids) * width,
+        ).reshape(len(self.node_ids), width)
+        if np.issubdtype(values.dtype, np.integer):
+            return histogram.astype(np.int64)
+        return histogram
+
+    def degree(self, weight=None, min_size=None, max_size=None):
+        """Return (weighted) degrees of all nodes as a dictionary."""
+        return dict(
+            zip(self.node_ids, self.degree_array(weight, min_size, max_size).tolist())
+        )
+
+    def s_degree(self, s=1, weight=None, superlevel=True):
+        """Return degrees restricted to edges of cardinality at least `s`
+        (if `superlevel`) or at most `s` (otherwise).
+        """
+        if superlevel:
+            return self.degree(weight=weight, min_size=s)
+        return self.degree(weight=weight, max_size=s)
+
+    def _from_edge_mask(self, edge_mask, node_mask):
+        sizes = self.edge_sizes()
+        keep_incidence = np.repeat(edge_mask, sizes) & node_mask[self.indices]
+        new_sizes = np.bincount(
+            self.incidence_edges()[keep_incidence], minlength=len(sizes)
+        )[edge_mask]
+        kept_nodes = np.unique(self.indices[keep_incidence])
+        remap = np.full(len(self.node_ids), -1, dtype=np.int64)
+        remap[kept_nodes] = np.arange(len(kept_nodes))
+        edge_positions = np.flatnonzero(edge_mask)
+        return CompactHypergraph(
+            self.node_ids[kept_nodes],
+            [self.edge_ids[e] for e in edge_positions],
+            np.concatenate([[0], np.cumsum(new_sizes)]),
+            remap[self.indices[keep_incidence]],
+            {k: v[edge_positions] for k, v in self.edge_attributes.items()},
+        )
+
+    def restrict_to_edges(self, edge_ids):
+        """Return the sub-hypergraph induced by the given edges."""
+        edge_mask = np.zeros(len(self.edge_ids), dtype=bool)
+        edge_mask[[self._edge_index[e] for e in edge_ids]] = True
+        return self._from_edge_mask(edge_mask, np.ones(len(self.node_ids), dtype=bool))
+
+    def restrict_to_nodes(self, node_ids):
+        """Return the hypergraph with all edges restricted to the given
+        nodes, dropping edges that become empty.
+        """
+        node_mask = np.zeros(len(self.node_ids), dtype=bool)
+        node_mask[[self._node_index[n] for n in node_ids if n in self]] = True
+        edge_mask = (
+            np.bincount(
+                self.incidence_edges(),
+                weights=node_mask[self.indices],
+                minlength=len(self.edge_ids),
+            )
+            > 0
+        )
+        return self._from_edge_mask(edge_mask, node_mask)
+
+    def dual(self):
+        """Return the dual hypergraph, whose edges are the nodes of this
+        hypergraph and whose nodes are the edges of this hypergraph.
+        """
+        order = np.argsort(self.indices, kind="stable")
+        counts = np.bincount(self.indices, minlength=len(self.node_ids))
+        edge_ids = np.empty(len(self.edge_ids), dtype=object)
+        edge_ids[:] = self.edge_ids
+        return CompactHypergraph(
+            edge_ids,
+            list(self.node_ids),
+            np.concatenate([[0], np.cumsum(counts)]),
+            self.incidence_edges()[order],
+        )
+
+    def setsystem(self):
+        """Return the hypergraph as dictionary of edge IDs to member lists."""
+        return {
+            edge_id: list(
+                self.node_ids[self.indices[self.indptr[i] : self.indptr[i + 1]]]
+            )
+            for i, edge_id in enumerate(self.edge_ids)
+        }
+
+    def to_edges(self, member_column="onstage"):
+        """Return the hypergraph as hyperedge table."""
+        edges = pd.DataFrame(dict(self.edge_attributes), index=self.edge_ids)
+        edges[member_column] = [
+            " ".join(members) for members in self.setsystem().values()
+        ]
+        return edges
+
+    def to_hnx(self, name=None):
+        """Convert to a `hnx.Hypergraph`, e.g., for drawing."""
+        # Imported here since hypernetx is expensive to import.
+        from hyperbard.graph_io import hypergraph_from_setsystem
+
+        return hypergraph_from_setsystem(
+            self.setsystem(),
+            {k: v.tolist() for k, v in self.edge_attributes.items()},
+            name=name,
+        )
@@ -0,0 +1,229 @@
+"""Inverted co-presence index over the text units of plays.
+
+For every character, a `CopresenceIndex` stores the text units (settings,
+stagegroups, or scenes) in which it is onstage (or speaks) as a packed
+bitmap, one bit per unit. Questions such as "in which settings are Romeo
+and Tybalt both present" then reduce to bitwise AND/OR/NOT operations on
+a few short arrays and a popcount, instead of string splits over edge
+tables. A `CorpusCopresenceIndex` holds the indices of many plays in
+memory and answers the same queries for all of them at once.
+"""
+
+import numpy as np
+import pandas as pd
+
+from hyperbard.hypergraph_representations import get_membership_table
+from hyperbard.incidence import get_play_incidence
+from hyperbard.utils import get_frame_cache
+
+INDEX_LEVELS = ["setting", "group", "scene"]
+INDEX_ROLES = ["onstage", "speaker"]
+
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+
+def popcount(bitmaps):
+    """Number of set bits along the last axis of packed bitmaps."""
+    return _POPCOUNT[bitmaps].sum(axis=-1)
+
+
+class CopresenceIndex:
+    """Packed bitmaps of the text units of one play, per character and role.
+
+    Attributes
+    ----------
+    level : str
+        Level of the text units, one of INDEX_LEVELS.
+
+    characters : pd.Index
+        Character identifiers, aligned with the rows of the bitmaps.
+
+    units : pd.DataFrame
+        Coordinates (act, scene, and, depending on the level, stagegroup
+        and setting) of the text units, aligned with the bits.
+
+    bitmaps : dict
+        Dictionary mapping roles ("onstage", "speaker") to uint8 arrays of
+        shape (characters, ceil(units / 8)), as returned by `np.packbits`.
+    """
+
+    __slots__ = ("level", "characters", "units", "bitmaps", "_positions")
+
+    def __init__(self, level, characters, units, bitmaps):
+        self.level = level
+        self.characters = characters
+        self.units = units
+        self.bitmaps = bitmaps
+        self._positions = {character: i for i, character in enumerate(characters)}
+
+    def __contains__(self, character):
+        return character in self._positions
+
+    @property
+    def n_units(self):
+        return len(self.units)
+
+    def _empty(self, fill):
+        bits = np.full(self.n_units, fill, dtype=bool)
+        return np.packbits(bits)
+
+    def bitmap(self, character, role="onstage"):
+        """Packed bitmap of the units in which a character has the given role
+        (all zeros for unknown characters)."""
+        if role not in INDEX_ROLES:
+            raise ValueError(f"role={role}, must be in {INDEX_ROLES}!")
+        if character not in self._positions:
+            return self._empty(False)
+        return self.bitmaps[role][self._positions[character]]
+
+    def query(self, all_of=(), any_of=(), none_of=(), role="onstage"):
+        """Packed bitmap of the units in which all characters in `all_of`,
+        at least one character in `any_of` (if given), and none of the
+        characters in `none_of` have the given role."""
+        result = self._empty(True)
+        for character in all_of:
+            result = result & self.bitmap(character, role)
+        if len(any_of):
+            result = result & np.bitwise_or.reduce(
+                [self.bitmap(character, role) for character in any_of]
+            )
+        for character in none_of:
+            result = result & ~self.bitmap(character, role)
+        return result
+
+    def count(self, *args, **kwargs):
+        """Number of units matching a query, see `query`."""
+        return int(popcount(self.query(*args, **kwargs)))
+
+    def select(self, bitmap):
+        """Coordinates of the units set in a packed bitmap."""
+        positions = np.flatnonzero(np.unpackbits(bitmap, count=self.n_units))
+        return self.units.iloc[positions]
+
+    def find(self, *args, **kwargs):
+        """Coordinates of the units matching a query, see `query`."""
+        return self.select(self.query(*args, **kwargs))
+
+    def intersection_counts(self, characters=None, role="onstage"):
+        """Numbers of units shared by all pairs of characters.
+
+        Parameters
+        ----------
+        characters : None or list
+            Characters to consider (default: all).
+
+        role : str
+            One of INDEX_ROLES.
+
+        Returns
+        -------
+        pd.DataFrame
+            Symmetric (characters x characters) data frame whose diagonal
+            holds the number of units per character.
+        """
+        characters = self.characters if characters is None else pd.Index(characters)
+        bitmaps = np.stack([self.bitmap(character, role) for character in characters])
+        counts = popcount(bitmaps[:, np.newaxis, :] & bitmaps[np.newaxis, :, :])
+        return pd.DataFrame(counts, index=characters, columns=characters)
+
+
+def _pack(matrix):
+    """Pack a sparse (characters x units) matrix row-wise into bitmaps."""
+    return np.packbits(matrix.toarray() > 0, axis=1)
+
+
+def _setting_units(df):
+    """Onstage and speaker bitmaps with the rows of the aggregated dataframe
+    (i.e., the settings of the play) as units."""
+    membership = get_membership_table(df)
+    characters = get_play_incidence(df).characters
+    bitmaps = {}
+    for role in INDEX_ROLES:
+        rows = membership[membership.role.values == role]
+        codes = characters.get_indexer(rows.node.values)
+        keep = codes >= 0
+        bits = np.zeros((len(characters), len(df)), dtype=bool)
+        bits[codes[keep], rows.row.values[keep]] = True
+        bitmaps[role] = np.packbits(bits, axis=1)
+    units = df[["act", "scene", "stagegroup", "setting"]].reset_index(drop=True)
+    return characters, units, bitmaps
+
+
+def _copresence_index(df, level):
+    if level == "setting":
+        characters, units, bitmaps = _setting_units(df)
+    else:
+        incidence = get_play_incidence(df)
+        unit_incidence = incidence[level]
+        characters = incidence.characters
+        units = unit_incidence.units.drop(columns=["n_tokens", "n_lines"])
+        bitmaps = {role: _pack(getattr(unit_incidence, role)) for role in INDEX_ROLES}
+    return CopresenceIndex(level, characters, units, bitmaps)
+
+
+def get_copresence_index(df: pd.DataFrame, level: str = "setting") -> CopresenceIndex:
+    """
+    Get the co-presence index of a play, computed once per aggregated dataframe and level and cached.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param level: "setting", "group", or "scene"
+    :return: CopresenceIndex of the play
+    """
+    if level not in INDEX_LEVELS:
+        raise ValueError(f"level={level}, must be in {INDEX_LEVELS}!")
+    cache = get_frame_cache(df)
+    key = ("copresence", level)
+    if key not in cache:
+        cache[key] = _copresence_index(df, level)
+    return cache[key]
+
+
+class CorpusCopresenceIndex:
+    """Co-presence indices of many plays, queried together.
+
+    Parameters
+    ----------
+    dfs : dict
+        Dictionary mapping plays to aggregated dataframes.
+
+    level : str
+        One of INDEX_LEVELS.
+    """
+
+    __slots__ = ("level", "indices")
+
+    def __init__(self, dfs, level="setting"):
+        self.level = level
+        self.indices = {
+            play: get_copresence_index(df, level) for play, df in dfs.items()
+        }
+
+    def _candidates(self, all_of):
+        """Plays in which all required characters occur at all."""
+        return [
+            play
+            for play, index in self.indices.items()
+            if all(character in index for character in all_of)
+        ]
+
+    def count(self, all_of=(), any_of=(), none_of=(), role="onstage"):
+        """Number of matching units per play, see `CopresenceIndex.query`."""
+        return pd.Series(
+            {
+                play: self.indices[play].count(all_of, any_of, none_of, role)
+                for play in self._candidates(all_of)
+            },
+            dtype=int,
+        )
+
+    def find(self, all_of=(), any_of=(), none_of=(), role="onstage"):
+        """Coordinates of the matching units of all plays, with a "play"
+        column."""
+        parts = [
+            self.indices[play].find(all_of, any_of, none_of, role).assign(play=play)
+            for play in self._candidates(all_of)
+        ]
+        if not parts:
+            return pd.DataFrame(columns=["play"])
+        found = pd.concat(parts, ignore_index=True)
+        return found[["play"] + [c for c in found.columns if c != "play"]]
@@ -0,0 +1,262 @@
+"""Batched rank correlations between character rankings.
+
+The rankings of all plays are stacked into one (plays x characters x
+representations) array, padded with NaN, and Pearson, Spearman, and
+Kendall (tau-b) correlations between all pairs of representations are
+computed for all plays at once. Missing values are handled like in
+`pd.DataFrame.corr`, i.e., every pair of columns only uses the rows in
+which both are present.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from hyperbard.statics import RANKINGDATA_PATH
+
+CORRELATION_METHODS = ["pearson", "spearman", "kendall"]
+
+
+def stack_rankings(rankings):
+    """Stack rankings into one NaN-padded array.
+
+    Parameters
+    ----------
+    rankings : dict
+        Dictionary mapping plays to rank data frames (characters x
+        representations) with identical columns.
+
+    Returns
+    -------
+    tuple
+        (array of shape (plays, max. characters, representations), list
+        of plays, list of columns)
+    """
+    plays = list(rankings)
+    columns = list(rankings[plays[0]].columns) if plays else []
+    for play in plays:
+        if list(rankings[play].columns) != columns:
+            raise ValueError(f"Columns of {play} differ from those of {plays[0]}!")
+    n_rows = max((len(rankings[play]) for play in plays), default=0)
+    stacked = np.full((len(plays), n_rows, len(columns)), np.nan)
+    for idx, play in enumerate(plays):
+        values = rankings[play].to_numpy(dtype=float)
+        stacked[idx, : len(values)] = values
+    return stacked, plays, columns
+
+
+def _pairwise_pearson(x, y, mask):
+    """Pearson correlation of x[..., k, i, j] and y[..., k, i, j] over the
+    rows k with mask[..., k, i, j], for all (i, j) at once."""
+    n = mask.sum(axis=-3)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = x.sum(axis=-3) / n
+        mean_y = y.sum(axis=-3) / n
+        dx = np.where(mask, x - mean_x[..., np.newaxis, :, :], 0.0)
+        dy = np.where(mask, y - mean_y[..., np.newaxis, :, :], 0.0)
+        covariance = (dx * dy).sum(axis=-3)
+        variance = (dx * dx).sum(axis=-3) * (dy * dy).sum(axis=-3)
+        correlation = covariance / np.sqrt(variance)
+    correlation[(n < 2) | ~(variance > 0)] = np.nan
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def pearson(stacked):
+    """Pearson correlations of all column pairs of all plays, with pairwise
+    deletion of missing values.
+
+    Parameters
+    ----------
+    stacked : np.ndarray
+        Array of shape (plays, characters, representations), see
+        `stack_rankings`.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (plays, representations, representations).
+    """
+    present = ~np.isnan(stacked)
+    mask = present[..., :, np.newaxis] & present[..., np.newaxis, :]
+    x = np.broadcast_to(stacked[..., :, np.newaxis], mask.shape)
+    y = np.broadcast_to(stacked[..., np.newaxis, :], mask.shape)
+    return _pairwise_pearson(x, y, mask)
+
+
+def _count_within(pairs, weights):
+    """counts[p, k, i, j] = sum over l of pairs[p, k, l, i] * weights[p, l, j]."""
+    return np.swapaxes(pairs, 2, 3).astype(float) @ weights[:, np.newaxis, :, :]
+
+
+def spearman(stacked):
+    """Spearman correlations of all column pairs of all plays.
+
+    As in `pd.DataFrame.corr`, every pair of columns is re-ranked (with
+    average ranks for ties) on the rows where both are present. The
+    restricted ranks are obtained for all pairs at once from the pairwise
+    comparisons of the values of every column.
+    """
+    present = ~np.isnan(stacked)
+    values = np.where(present, stacked, 0.0)
+    both = present[:, :, np.newaxis, :] & present[:, np.newaxis, :, :]
+    # less[p, k, l, i]: value of row l is smaller than value of row k in column i
+    less = both & (values[:, np.newaxis, :, :] < values[:, :, np.newaxis, :])
+    equal = both & (values[:, np.newaxis, :, :] == values[:, :, np.newaxis, :])
+    weights = present.astype(float)
+    # ranks[p, k, i, j]: rank of row k in column i among the rows present in j
+    n_less = _count_within(less, weights)
+    n_equal = _count_within(equal, weights)
+    ranks = n_less + (n_equal + 1) / 2
+    mask = present[:, :, :, np.newaxis] & present[:, :, np.newaxis, :]
+    return _pairwise_pearson(ranks, np.swapaxes(ranks, -1, -2), mask)
+
+
+def kendall(stacked):
+    """Kendall tau-b correlations of all column pairs of all plays.
+
+    The tie-corrected tau-b is (P - Q) / sqrt((n0 - n1) (n0 - n2)) for P
+    concordant and Q discordant pairs among n0 pairs of rows present in
+    both columns, n1 (n2) of which are tied in the first (second) column.
+    All counts are obtained for all plays and column pairs at once from
+    the signs of the pairwise differences of every column. For the few
+    dozen characters per play, this batched quadratic formulation is
+    faster than sorting-based O(n log n) counting one pair at a time.
+    """
+    present = ~np.isnan(stacked)
+    values = np.where(present, stacked, 0.0)
+    both = present[:, :, np.newaxis, :] & present[:, np.newaxis, :, :]
+    # signs[p, k, l, i]: sign of the difference of rows k and l in column i
+    signs = np.where(
+        both, np.sign(values[:, :, np.newaxis, :] - values[:, np.newaxis, :, :]), 0.0
+    )
+    ties = (both & (signs == 0)).astype(float)
+    weights = present.astype(float)
+    n_pairs = signs.shape[1] * signs.shape[2]
+    flat_signs = signs.reshape(len(signs), n_pairs, -1)
+    difference = np.swapaxes(flat_signs, 1, 2) @ flat_signs / 2
+    n_joint = np.swapaxes(weights, 1, 2) @ weights
+    n0 = (n_joint * n_joint - n_joint) / 2
+    # Tied pairs (including the diagonal k == l) within the joint rows.
+    tied_rows = _count_within(ties, weights)
+    tied = ((tied_rows * weights[:, :, np.newaxis, :]).sum(axis=1) - n_joint) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = difference / np.sqrt(
+            (n0 - tied) * (n0 - np.swapaxes(tied, -1, -2))
+        )
+    correlation[~((n0 - tied) * (n0 - np.swapaxes(tied, -1, -2)) > 0)] = np.nan
+    diagonal = np.arange(stacked.shape[-1])
+    correlation[:, diagonal, diagonal] = 1.0
+    return np.clip(correlation, -1.0, 1.0)
+
+
+CORRELATION_FUNCTIONS = {
+    "pearson": pearson,
+    "spearman": spearman,
+    "kendall": kendall,
+}
+
+
+def correlate(stacked, method="pearson"):
+    """Compute correlations of all column pairs of all plays with one of
+    CORRELATION_METHODS."""
+    if method not in CORRELATION_FUNCTIONS:
+        raise ValueError(f"method={method}, must be in {CORRELATION_METHODS}!")
+    return CORRELATION_FUNCTIONS[method](stacked)
+
+
+def _correlation_frames(correlations, plays, columns):
+    return {
+        play: pd.DataFrame(correlation, index=columns, columns=columns)
+        for play, correlation in zip(plays, correlations)
+    }
+
+
+def get_correlations(rankings, method="pearson"):
+    """Correlate the representations of every ranking, as `DataFrame.corr`
+    would, but for all rankings at once.
+
+    Parameters
+    ----------
+    rankings : dict
+        Dictionary mapping plays to rank data frames with identical
+        columns.
+
+    method : str
+        One of CORRELATION_METHODS.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping plays to correlation data frames.
+    """
+    stacked, plays, columns = stack_rankings(rankings)
+    return _correlation_frames(correlate(stacked, method), plays, columns)
+
+
+def _cache_key(ranking_files, method):
+    return json.dumps(
+        {
+            "method": method,
+            "files": [
+                [os.path.abspath(file), os.path.getmtime(file)]
+                for file in ranking_files
+            ],
+        }
+    )
+
+
+def get_file_correlations(ranking_files, method="pearson", cache_path=RANKINGDATA_PATH):
+    """Correlate the rankings stored in `{play}_ranking.csv` files.
+
+    The result is cached in `cache_path` together with the paths and
+    modification times of the ranking files, and reused as long as these
+    do not change.
+
+    Parameters
+    ----------
+    ranking_files : list
+        Paths of ranking files, as written by `plot_graph_rankings`.
+
+    method : str
+        One of CORRELATION_METHODS.
+
+    cache_path : None or str
+        Directory of the cache file; caching is disabled if None.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping plays to correlation data frames.
+    """
+    key = _cache_key(ranking_files, method)
+    cache_file = None
+    if cache_path is not None:
+        cache_file = os.path.join(cache_path, f"rank-correlations_{method}.npz")
+        if os.path.exists(cache_file):
+            with np.load(cache_file, allow_pickle=False) as cached:
+                if str(cached["key"]) == key:
+                    return _correlation_frames(
+                        cached["correlations"],
+                        list(cached["plays"]),
+                        list(cached["columns"]),
+                    )
+    rankings = {
+        os.path.basename(file).split("_")[0]: pd.read_csv(file, index_col=0)
+        for file in ranking_files
+    }
+    stacked, plays, columns = stack_rankings(rankings)
+    correlations = correlate(stacked, method)
+    if cache_file is not None:
+        os.makedirs(cache_path, exist_ok=True)
+        np.savez(
+            cache_file,
+            key=key,
+            plays=np.array(plays, dtype=str),
+            columns=np.array(columns, dtype=str),
+            correlations=correlations,
+        )
+    return _correlation_frames(correlations, plays, columns)
@@ -1,18 +1,37 @@
+import argparse
 import os
 from collections import OrderedDict
 from glob import glob
 
 import networkx as nx
 import pandas as pd
-from statics import DATA_PATH, GRAPHDATA_PATH
 
+from hyperbard.delta import (
+    DELTA_GROUPBY,
+    format_units,
+    get_baseline_file,
+    get_changed_units,
+    in_units,
+    project_units,
+    read_tables,
+    splice,
+    unit_ordinals,
+    update_baseline,
+    write_if_changed,
+)
 from hyperbard.graph_representations import (
     get_bipartite_graph,
     get_count_weighted_graph,
     get_weighted_bipartite_graph,
     get_weighted_multigraph,
 )
-from hyperbard.track_time import timeit
+from hyperbard.statics import DATA_PATH, GRAPHDATA_PATH
+from hyperbard.track_time import (
+    add_profiler_arguments,
+    configure_profiler,
+    span,
+    timeit,
+)
 from hyperbard.utils import get_filename_base
 
 
@@ -81,7 +100,7 @@ def edge_dataframe(G):
         raise NotImplementedError(f"Currently no transformation for {type(G)}!")
 
 
-def save_graph(G, representation, path):
+def graph_tables(G, representation):
     if representation.startswith("ce"):  # clique expansions
         representation_for_nodes = representation.split("-")[0]
         nodes = node_dataframe(G)
@@ -100,67 +119,324 @@ def save_graph(G, representation, path):
                 f"Unknown graph type for given representation: {representation}, {type(G)}"
             )
     elif representation.startswith("hg"):  # TODO hgs
-        return
+        return OrderedDict()
     else:
         raise NotImplementedError(f"Unknown representation: {representation}")
-    nodes.to_csv(f"{path}_{representation_for_nodes}.nodes.csv", index=False)
-    edges.to_csv(f"{path}_{representation}.edges.csv", index=False)
+    return OrderedDict(
+        {
+            f"{representation_for_nodes}.nodes": nodes,
+            f"{representation}.edges": edges,
+        }
+    )
 
 
-def handle_file(file):
-    file_base = get_filename_base(file, full=True).split(".")[0]
-    print(file_base)
-    df = pd.read_csv(file)
+def save_graph(G, representation, path):
+    for suffix, table in graph_tables(G, representation).items():
+        table.to_csv(f"{path}_{suffix}.csv", index=False)
+
+
+GRAPH_EXPANSIONS = OrderedDict(
+    {
+        "ce-scene-mw": {
+            "groupby": ["act", "scene"],
+            "constructor": get_weighted_multigraph,
+        },
+        "ce-group-mw": {
+            "groupby": ["act", "scene", "stagegroup"],
+            "constructor": get_weighted_multigraph,
+        },
+        "ce-scene-w": {
+            "groupby": ["act", "scene"],
+            "constructor": get_count_weighted_graph,
+        },
+        "ce-group-w": {
+            "groupby": ["act", "scene", "stagegroup"],
+            "constructor": get_count_weighted_graph,
+        },
+        "se-scene-w": {
+            "groupby": ["act", "scene"],
+            "constructor": get_bipartite_graph,
+        },
+        "se-group-w": {
+            "groupby": ["act", "scene", "stagegroup"],
+            "constructor": get_bipartite_graph,
+        },
+        "se-speech-mwd": {
+            "groupby": ["act", "scene", "stagegroup", "setting", "speaker"],
+            "constructor": get_bipartite_graph,
+        },
+        "se-speech-wd": {
+            "groupby": ["act", "scene", "stagegroup", "setting", "speaker"],
+            "constructor": get_weighted_bipartite_graph,
+        },
+    }
+)
+GRAPH_TABLES = list(
+    OrderedDict.fromkeys(
+        suffix
+        for representation in GRAPH_EXPANSIONS
+        for suffix in [
+            f"{representation.split('-')[0]}.nodes"
+            if representation.startswith("ce")
+            else f"{'-'.join(representation.split('-')[:-1])}.nodes",
+            f"{representation}.edges",
+        ]
+    )
+)
+# Text unit nodes are formatted strings such as "1.01", which must not be
+# parsed as numbers when reading existing tables.
+NODE_DTYPES = {column: str for column in ["node", "node1", "node2", "source", "target"]}
+
+
+def get_graph_tables(df):
+    """
+    Build all graph representation tables of a play.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :return: OrderedDict mapping file suffixes (e.g., "ce-scene-mw.edges") to tables
+    """
+    tables = OrderedDict()
+    for representation, parameters in GRAPH_EXPANSIONS.items():
+        with span(representation):
+            G = parameters["constructor"](df, parameters["groupby"])
+            tables.update(graph_tables(G, representation))
+    return tables
+
+
+def _edge_rows(df, representation):
+    """Edge table of a representation for the given rows of a play only."""
+    parameters = GRAPH_EXPANSIONS[representation]
+    if not len(df):
+        return pd.DataFrame()
+    G = parameters["constructor"](df, parameters["groupby"])
+    if not G.number_of_edges():
+        return pd.DataFrame()
+    return graph_tables(G, representation)[f"{representation}.edges"]
+
+
+def _pair_keys(edges, first, second):
+    pairs = pd.DataFrame(
+        {
+            "a": edges[[first, second]].min(axis=1),
+            "b": edges[[first, second]].max(axis=1),
+        }
+    )
+    return pairs.groupby(["a", "b"]).cumcount()
+
+
+def _patch_multigraph_edges(table, new_df, units, groupby, representation):
+    new_rows = _edge_rows(new_df[in_units(new_df, units).values], representation)
+    edges = splice(table, in_units(table, units), new_rows)
+    ordinals = unit_ordinals(new_df, groupby)
+    edges["edge_index"] = [
+        ordinals[key] for key in zip(*(edges[c].values for c in groupby))
+    ]
+    edges = edges.sort_values(["edge_index", "node1", "node2"]).reset_index(drop=True)
+    edges["key"] = _pair_keys(edges, "node1", "node2").values
+    # networkx reports every edge starting from the endpoint added first,
+    # i.e., the one appearing first in the play (ties broken by name).
+    first = (
+        pd.concat(
+            [
+                edges[[c, "edge_index"]].rename(columns={c: "node"})
+                for c in ["node1", "node2"]
+            ]
+        )
+        .groupby("node")
+        .edge_index.min()
+    )
+    order = {
+        node: rank
+        for rank, node in enumerate(sorted(first.index, key=lambda n: (first[n], n)))
+    }
+    swap = [order[u] > order[v] for u, v in zip(edges.node1, edges.node2)]
+    edges.loc[swap, ["node1", "node2"]] = edges.loc[swap, ["node2", "node1"]].values
+    return edges.sort_values(["edge_index", "node1", "node2", "key"]).reset_index(
+        drop=True
+    )
+
 
-    expansions = OrderedDict(
+def _count_graph_edges(multi_edges, columns):
+    """Count-weighted clique expansion edges derived from the multigraph edges,
+    oriented as get_count_weighted_graph would orient them."""
+    pairs = pd.DataFrame(
+        {
+            "a": multi_edges[["node1", "node2"]].min(axis=1),
+            "b": multi_edges[["node1", "node2"]].max(axis=1),
+            "edge_index": multi_edges.edge_index,
+        }
+    )
+    counts = pairs.groupby(["a", "b"]).edge_index.agg(["size", "min"]).reset_index()
+    # Node order and adjacency order of the multigraph: nodes by first
+    # appearance, neighbours by first co-appearance (ties broken by name).
+    first = {}
+    adjacency = {}
+    for a, b, first_index in zip(counts.a, counts.b, counts["min"]):
+        first[a] = min(first.get(a, first_index), first_index)
+        first[b] = min(first.get(b, first_index), first_index)
+        adjacency.setdefault(a, []).append((first_index, b))
+        adjacency.setdefault(b, []).append((first_index, a))
+    order = sorted(first, key=lambda n: (first[n], n))
+    rank = {node: idx for idx, node in enumerate(order)}
+    # Node order of the count-weighted graph, as built by iterating over
+    # the edges of the multigraph.
+    count_order = {}
+    for u in order:
+        for _, v in sorted(adjacency[u]):
+            if rank[v] > rank[u]:
+                count_order.setdefault(u, len(count_order))
+                count_order.setdefault(v, len(count_order))
+    swap = [count_order[a] > count_order[b] for a, b in zip(counts.a, counts.b)]
+    edges = pd.DataFrame(
         {
-            "ce-scene-mw": {
-                "groupby": ["act", "scene"],
-                "constructor": get_weighted_multigraph,
-            },
-            "ce-group-mw": {
-                "groupby": ["act", "scene", "stagegroup"],
-                "constructor": get_weighted_multigraph,
-            },
-            "ce-scene-w": {
-                "groupby": ["act", "scene"],
-                "constructor": get_count_weighted_graph,
-            },
-            "ce-group-w": {
-                "groupby": ["act", "scene", "stagegroup"],
-                "constructor": get_count_weighted_graph,
-            },
-            "se-scene-w": {
-                "groupby": ["act", "scene"],
-                "constructor": get_bipartite_graph,
-            },
-            "se-group-w": {
-                "groupby": ["act", "scene", "stagegroup"],
-                "constructor": get_bipartite_graph,
-            },
-            "se-speech-mwd": {
-                "groupby": ["act", "scene", "stagegroup", "setting", "speaker"],
-                "constructor": get_bipartite_graph,
-            },
-            "se-speech-wd": {
-                "groupby": ["act", "scene", "stagegroup", "setting", "speaker"],
-                "constructor": get_weighted_bipartite_graph,
-            },
+            "node1": counts.a.where(~pd.Series(swap), counts.b),
+            "node2": counts.b.where(~pd.Series(swap), counts.a),
+            "count": counts["size"],
         }
     )
-    for representation, parameters in expansions.items():
-        G = parameters["constructor"](df, parameters["groupby"])
-        save_graph(G, representation, f"{GRAPHDATA_PATH}/{file_base}")
+    return edges.sort_values(
+        ["node1", "node2", "count"], ascending=[True, True, False]
+    ).reset_index(drop=True)[columns]
+
+
+def _unit_node(edges):
+    return edges.source.where(edges.edge_type != "active", edges.target)
+
+
+def _patch_speech_edges(table, old_df, new_df, units, representation):
+    groupby = GRAPH_EXPANSIONS[representation]["groupby"]
+    sub = new_df[in_units(new_df, units).values]
+    new_rows = _edge_rows(sub, representation)
+    drop = _unit_node(table).isin(format_units(units))
+    if "edge_index" not in table:
+        return splice(table, drop, new_rows, ["source", "target"])
+    # Renumber the edges of both the kept and the new text units by the
+    # positions of their speech acts in the changed play.
+    ordinals = unit_ordinals(new_df, groupby)
+    kept = table[~drop.values].copy()
+    for rows, df in [(kept, old_df), (new_rows, sub)]:
+        if len(rows):
+            keys = {idx: key for key, idx in unit_ordinals(df, groupby).items()}
+            rows["edge_index"] = [ordinals[keys[idx]] for idx in rows.edge_index]
+    edges = splice(
+        kept,
+        pd.Series(False, index=kept.index),
+        new_rows,
+        ["edge_index", "source", "target"],
+    )
+    edges["key"] = edges.groupby(["source", "target"]).cumcount().values
+    return edges
+
+
+def _bipartite_nodes(df, groupby, edges):
+    units = df.groupby(groupby).size().index.to_frame(index=False)[groupby[:3]]
+    keyed = df.dropna(subset=groupby)
+    characters = set(" ".join(keyed.onstage.dropna()).split())
+    text_units = format_units(units)
+    endpoints = set(edges.iloc[:, 0]) | set(edges.iloc[:, 1])
+    nodes = sorted(characters | text_units | endpoints)
+    node_types = [
+        "text_unit"
+        if node in text_units
+        else "character"
+        if node in characters
+        else None
+        for node in nodes
+    ]
+    return pd.DataFrame({"node": nodes, "node_type": node_types})
+
+
+def patch_graph_tables(tables, old_df, new_df, changed=None):
+    """
+    Update the graph representation tables of a play for changes to its aggregated dataframe,
+    recomputing only the rows of the text units that changed.
+
+    :param tables: dictionary as returned by get_graph_tables for old_df (or read from disk)
+    :param old_df: pd.DataFrame the tables were built from
+    :param new_df: pd.DataFrame as loaded from the changed .agg.csv file
+    :param changed: optional pd.DataFrame as returned by get_changed_units
+    :return: OrderedDict with the same keys as get_graph_tables
+    """
+    if changed is None:
+        changed = get_changed_units(old_df, new_df)
+    if not len(changed):
+        return OrderedDict((suffix, tables[suffix]) for suffix in GRAPH_TABLES)
+    patched = OrderedDict((suffix, None) for suffix in GRAPH_TABLES)
+    groups = project_units(changed, DELTA_GROUPBY)
+    for representation, parameters in GRAPH_EXPANSIONS.items():
+        groupby = parameters["groupby"]
+        units = project_units(changed, groupby[:3])
+        suffix = f"{representation}.edges"
+        table = tables[suffix]
+        if representation.startswith("ce") and representation.endswith("-mw"):
+            patched[suffix] = _patch_multigraph_edges(
+                table, new_df, units, groupby, representation
+            )
+        elif representation.startswith("ce"):
+            multi_edges = patched[suffix.replace("-w.", "-mw.")]
+            patched[suffix] = _count_graph_edges(multi_edges, list(table.columns))
+        elif "speech" in representation:
+            patched[suffix] = _patch_speech_edges(
+                table, old_df, new_df, groups, representation
+            )
+        else:
+            patched[suffix] = splice(
+                table,
+                table.node2.isin(format_units(units)),
+                _edge_rows(new_df[in_units(new_df, units).values], representation),
+                ["node2", "node1"],
+            )
+        if representation.startswith("se"):
+            patched[
+                f"{'-'.join(representation.split('-')[:-1])}.nodes"
+            ] = _bipartite_nodes(new_df, groupby, patched[suffix])
+    ce_nodes = patched["ce-group-mw.edges"][["node1", "node2"]].values.ravel()
+    patched["ce.nodes"] = pd.DataFrame({"node": sorted(set(ce_nodes))})
+    return patched
+
+
+def handle_file(file, delta=False):
+    file_base = get_filename_base(file, full=True).split(".")[0]
+    print(file_base)
+    with span("play", play=file_base):
+        df = pd.read_csv(file)
+        path = f"{GRAPHDATA_PATH}/{file_base}"
+        baseline_file = get_baseline_file(path, "graph")
+        tables = None
+        if delta and os.path.exists(baseline_file):
+            old_df = pd.read_csv(baseline_file)
+            old_tables = read_tables(path, GRAPH_TABLES, dtype=NODE_DTYPES)
+            if old_tables is not None:
+                with span("patch"):
+                    tables = patch_graph_tables(old_tables, old_df, df)
+        if tables is None:
+            tables = get_graph_tables(df)
+        with span("write"):
+            for suffix, table in tables.items():
+                write_if_changed(table, f"{path}_{suffix}.csv")
+        update_baseline(file, path, "graph")
 
 
 @timeit
-def create_graph_representations():
+def create_graph_representations(delta=False):
     for file in files:
-        handle_file(file)
+        handle_file(file, delta=delta)
 
 
 if __name__ == "__main__":
     files = sorted(glob(f"{DATA_PATH}/*.agg.csv"))
     print(f"Found {len(files)} files to process.")
     os.makedirs(GRAPHDATA_PATH, exist_ok=True)
-    create_graph_representations()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--delta",
+        action="store_true",
+        help="If set, only updates the text units changed since the last run",
+    )
+    add_profiler_arguments(parser)
+    args = parser.parse_args()
+    configure_profiler(args)
+
+    create_graph_representations(delta=args.delta)
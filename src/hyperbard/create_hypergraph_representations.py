@@ -1,73 +1,207 @@
+import argparse
 import os
-import time
 from collections import OrderedDict
 from glob import glob
 
 import pandas as pd
 
+from hyperbard.delta import (
+    DELTA_GROUPBY,
+    get_baseline_file,
+    get_changed_units,
+    in_units,
+    project_units,
+    read_tables,
+    splice,
+    update_baseline,
+    write_if_changed,
+)
 from hyperbard.hypergraph_representations import (
     get_hypergraph_edges,
     get_hypergraph_nodes,
     get_multi_directed_hypergraph_edges,
     get_weighted_directed_hypergraph_edges,
 )
-from hyperbard.statics import DATA_PATH, GRAPHDATA_PATH, RESOURCE_USAGE_PATH
+from hyperbard.statics import DATA_PATH, GRAPHDATA_PATH
+from hyperbard.track_time import (
+    add_profiler_arguments,
+    configure_profiler,
+    span,
+    timeit,
+)
 from hyperbard.utils import get_filename_base
 
+UNDIRECTED_EXPANSIONS = OrderedDict(
+    {
+        "hg-scene-mw": {
+            "groupby": ["act", "scene"],
+            "constructor": get_hypergraph_edges,
+        },
+        "hg-group-mw": {
+            "groupby": ["act", "scene", "stagegroup"],
+            "constructor": get_hypergraph_edges,
+        },
+    }
+)
+DIRECTED_EXPANSIONS = OrderedDict(
+    {
+        "hg-speech-mwd": {
+            "constructor": get_multi_directed_hypergraph_edges,
+            "sort_by": ["act", "scene", "stagegroup", "setting", "speaker"],
+        },
+        "hg-speech-wd": {
+            "constructor": get_weighted_directed_hypergraph_edges,
+            "sort_by": ["act", "scene", "stagegroup", "speaker", "onstage"],
+        },
+    }
+)
+
 
-def handle_file(file):
-    file_base = get_filename_base(file, full=True).split(".")[0]
-    print(file_base)
-    df = pd.read_csv(file)
-    undirected_expansions = OrderedDict(
-        {
-            "hg-scene-mw": {
-                "groupby": ["act", "scene"],
-                "constructor": get_hypergraph_edges,
-            },
-            "hg-group-mw": {
-                "groupby": ["act", "scene", "stagegroup"],
-                "constructor": get_hypergraph_edges,
-            },
-        }
-    )
-    directed_expansions = OrderedDict(
-        {
-            "hg-speech-mwd": {
-                "constructor": get_multi_directed_hypergraph_edges,
-            },
-            "hg-speech-wd": {
-                "constructor": get_weighted_directed_hypergraph_edges,
-            },
-        }
+HYPERGRAPH_TABLES = (
+    ["hg.nodes"]
+    + [
+        f"{representation}.{suffix}"
+        for representation in UNDIRECTED_EXPANSIONS
+        for suffix in ["edges", "node-weights"]
+    ]
+    + [f"{representation}.edges" for representation in DIRECTED_EXPANSIONS]
+)
+
+
+def get_hypergraph_tables(df):
+    """
+    Build all hypergraph representation tables of a play.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :return: OrderedDict mapping file suffixes (e.g., "hg-scene-mw.edges") to tables
+    """
+    tables = OrderedDict({"hg.nodes": get_hypergraph_nodes(df)})
+    for representation, parameters in UNDIRECTED_EXPANSIONS.items():
+        with span(representation):
+            edges, edge_specific_node_weights = parameters["constructor"](
+                df, parameters["groupby"]
+            )
+        tables[f"{representation}.edges"] = edges
+        tables[f"{representation}.node-weights"] = edge_specific_node_weights
+    for representation, parameters in DIRECTED_EXPANSIONS.items():
+        with span(representation):
+            tables[f"{representation}.edges"] = parameters["constructor"](df)
+    return tables
+
+
+def _sort_node_weights(node_weights, groupby):
+    """Order edge-specific node weights like get_hypergraph_edges does, i.e.,
+    the rows of characters speaking in an edge first, followed by those of
+    characters who are only onstage."""
+    silent = (node_weights.n_lines_speaker == 0) & (node_weights.n_tokens_speaker == 0)
+    order = node_weights.assign(_silent=silent).sort_values(
+        ["_silent"] + groupby + ["node"]
     )
-    path = f"{GRAPHDATA_PATH}/{file_base}"
-    representation_for_nodes = "hg"
-    nodes = get_hypergraph_nodes(df)
-    nodes.to_csv(f"{path}_{representation_for_nodes}.nodes.csv", index=False)
-    for representation, parameters in undirected_expansions.items():
-        edges, edge_specific_node_weights = parameters["constructor"](
-            df, parameters["groupby"]
+    return node_weights.loc[order.index].reset_index(drop=True)
+
+
+def _patched_nodes(group_edges, group_node_weights, columns):
+    onstage = {node for members in group_edges.onstage for node in members.split()}
+    nodes = group_node_weights.groupby("node")[columns[1:]].sum().reset_index()
+    return nodes[nodes.node.isin(onstage)].reset_index(drop=True)[columns]
+
+
+def patch_hypergraph_tables(tables, old_df, new_df, changed=None):
+    """
+    Update the hypergraph representation tables of a play for changes to its aggregated dataframe,
+    recomputing only the rows of the text units that changed.
+
+    :param tables: dictionary as returned by get_hypergraph_tables for old_df
+    :param old_df: pd.DataFrame the tables were built from
+    :param new_df: pd.DataFrame as loaded from the changed .agg.csv file
+    :param changed: optional pd.DataFrame as returned by get_changed_units
+    :return: OrderedDict with the same keys as get_hypergraph_tables
+    """
+    if changed is None:
+        changed = get_changed_units(old_df, new_df)
+    if not len(changed):
+        return OrderedDict((suffix, tables[suffix]) for suffix in HYPERGRAPH_TABLES)
+    patched = OrderedDict({"hg.nodes": None})
+    groups = project_units(changed, DELTA_GROUPBY)
+    affected_rows = new_df[in_units(new_df, groups).values]
+    for representation, parameters in UNDIRECTED_EXPANSIONS.items():
+        groupby = parameters["groupby"]
+        units = project_units(changed, groupby)
+        unit_rows = new_df[in_units(new_df, units).values]
+        edges, edge_specific_node_weights = (
+            parameters["constructor"](unit_rows, groupby)
+            if len(unit_rows)
+            else (pd.DataFrame(), pd.DataFrame())
+        )
+        table = tables[f"{representation}.edges"]
+        patched[f"{representation}.edges"] = splice(
+            table, in_units(table, units), edges, groupby
         )
-        edges.to_csv(f"{path}_{representation}.edges.csv", index=False)
-        edge_specific_node_weights.to_csv(
-            f"{path}_{representation}.node-weights.csv", index=False
+        table = tables[f"{representation}.node-weights"]
+        patched[f"{representation}.node-weights"] = _sort_node_weights(
+            splice(table, in_units(table, units), edge_specific_node_weights),
+            groupby,
         )
-    for representation, parameters in directed_expansions.items():
-        edges = parameters["constructor"](df)
-        edges.to_csv(f"{path}_{representation}.edges.csv", index=False)
+    for representation, parameters in DIRECTED_EXPANSIONS.items():
+        table = tables[f"{representation}.edges"]
+        patched[f"{representation}.edges"] = splice(
+            table,
+            in_units(table, groups),
+            parameters["constructor"](affected_rows)
+            if len(affected_rows)
+            else pd.DataFrame(),
+            parameters["sort_by"],
+        )
+    patched["hg.nodes"] = _patched_nodes(
+        patched["hg-group-mw.edges"],
+        patched["hg-group-mw.node-weights"],
+        list(tables["hg.nodes"].columns),
+    )
+    return patched
+
+
+def handle_file(file, delta=False):
+    file_base = get_filename_base(file, full=True).split(".")[0]
+    print(file_base)
+    with span("play", play=file_base):
+        df = pd.read_csv(file)
+        path = f"{GRAPHDATA_PATH}/{file_base}"
+        baseline_file = get_baseline_file(path, "hypergraph")
+        tables = None
+        if delta and os.path.exists(baseline_file):
+            old_df = pd.read_csv(baseline_file)
+            old_tables = read_tables(path, HYPERGRAPH_TABLES)
+            if old_tables is not None:
+                with span("patch"):
+                    tables = patch_hypergraph_tables(old_tables, old_df, df)
+        if tables is None:
+            tables = get_hypergraph_tables(df)
+        with span("write"):
+            for suffix, table in tables.items():
+                write_if_changed(table, f"{path}_{suffix}.csv")
+        update_baseline(file, path, "hypergraph")
+
+
+@timeit
+def create_hypergraph_representations(delta=False):
+    for file in files:
+        handle_file(file, delta=delta)
 
 
 if __name__ == "__main__":
     files = sorted(glob(f"{DATA_PATH}/*.agg.csv"))
     print(f"Found {len(files)} files to process.")
     os.makedirs(GRAPHDATA_PATH, exist_ok=True)
-    os.makedirs(RESOURCE_USAGE_PATH, exist_ok=True)
-    timefile = f"{RESOURCE_USAGE_PATH}/{__file__[:-2].split('/')[-1]}.txt"
 
-    start = time.time()
-    for file in files:
-        handle_file(file)
-    finish = time.time()
-    with open(timefile, "w") as f:
-        f.write(f"{os.path.basename(__file__)}, {finish - start}")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--delta",
+        action="store_true",
+        help="If set, only updates the text units changed since the last run",
+    )
+    add_profiler_arguments(parser)
+    args = parser.parse_args()
+    configure_profiler(args)
+
+    create_hypergraph_representations(delta=args.delta)
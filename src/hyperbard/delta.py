@@ -0,0 +1,197 @@
+"""Incremental updates of the graph and hypergraph representations.
+
+Editorial fixes usually touch only a few text units of a play. Instead of
+regenerating all representations from the whole .agg.csv file, the
+representation scripts can diff the aggregated dataframe they were last
+run on (kept next to the graph data as a baseline) against the current
+one at the stagegroup level, replace only the rows of the affected text
+units in the existing tables, and rewrite only the files whose contents
+change.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from hyperbard.graph_representations import format_text_unit_node
+
+DELTA_GROUPBY = ["act", "scene", "stagegroup"]
+
+
+def _unit_hashes(df: pd.DataFrame, columns: list, groupby: list) -> pd.DataFrame:
+    """Hash every text unit from the hashes of its rows and their positions
+    within the unit, so that reordering rows also counts as a change."""
+    grouped = df.groupby(groupby)
+    positions = grouped.cumcount().values.astype(np.uint64)
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).values
+    mixed = pd.util.hash_array(row_hashes ^ (positions * np.uint64(0x9E3779B97F4A7C15)))
+    return (
+        pd.DataFrame({"hash": mixed, "size": 1}, index=df.index)
+        .groupby([df[c] for c in groupby])
+        .sum()
+    )
+
+
+def get_changed_units(
+    old_df: pd.DataFrame, new_df: pd.DataFrame, groupby: list = DELTA_GROUPBY
+) -> pd.DataFrame:
+    """
+    Diff two versions of an aggregated dataframe at the level given by the groupby argument.
+
+    :param old_df: pd.DataFrame as loaded from an .agg.csv file, before the changes
+    :param new_df: pd.DataFrame as loaded from an .agg.csv file, after the changes
+    :param groupby: columns identifying a text unit
+    :return: pd.DataFrame with the groupby columns of all units that were added, removed, or changed
+    """
+    if list(old_df.columns) != list(new_df.columns):
+        changed = pd.concat([old_df[groupby], new_df[groupby]])
+        return (
+            changed.dropna()
+            .drop_duplicates()
+            .sort_values(groupby)
+            .reset_index(drop=True)
+        )
+    columns = list(new_df.columns)
+    hashes = _unit_hashes(old_df, columns, groupby).join(
+        _unit_hashes(new_df, columns, groupby),
+        how="outer",
+        lsuffix="_old",
+        rsuffix="_new",
+    )
+    changed = (hashes.hash_old != hashes.hash_new) | (
+        hashes.size_old != hashes.size_new
+    )
+    return hashes.index[changed.values].to_frame(index=False)
+
+
+def project_units(units: pd.DataFrame, groupby: list) -> pd.DataFrame:
+    """
+    Coarsen text units to the level given by the groupby argument (e.g., stagegroups to scenes).
+
+    :param units: pd.DataFrame as returned by get_changed_units
+    :param groupby: prefix of the columns of units
+    :return: pd.DataFrame with one row per distinct unit at the coarser level
+    """
+    return units[groupby].drop_duplicates().reset_index(drop=True)
+
+
+def in_units(table: pd.DataFrame, units: pd.DataFrame) -> pd.Series:
+    """
+    Flag the rows of a table that belong to one of the given text units.
+
+    :param table: pd.DataFrame holding the columns of units
+    :param units: pd.DataFrame of text units, e.g., as returned by project_units
+    :return: boolean pd.Series aligned with table
+    """
+    columns = list(units.columns)
+    keys = pd.util.hash_pandas_object(
+        table[columns].astype(units.dtypes.to_dict()), index=False
+    )
+    return keys.isin(pd.util.hash_pandas_object(units, index=False))
+
+
+def format_units(units: pd.DataFrame) -> set:
+    """
+    Format text units as the text unit nodes of the star expansions.
+
+    :param units: pd.DataFrame of text units with (a prefix of) the columns act, scene, and stagegroup
+    :return: set of text unit node identifiers
+    """
+    return {
+        format_text_unit_node(tuple(key))
+        for key in units.itertuples(index=False, name=None)
+    }
+
+
+def unit_ordinals(df: pd.DataFrame, groupby: list) -> dict:
+    """
+    Map every text unit to its (1-based) position, as used for the edge_index of graph edges.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param groupby: columns identifying a text unit
+    :return: dictionary mapping tuples of groupby values to positions
+    """
+    keys = df.groupby(groupby).size().index
+    if len(groupby) == 1:
+        keys = [(key,) for key in keys]
+    return {tuple(key): idx + 1 for idx, key in enumerate(keys)}
+
+
+def splice(
+    table: pd.DataFrame,
+    drop: pd.Series,
+    new_rows: pd.DataFrame,
+    sort_by: list = None,
+    ascending=True,
+) -> pd.DataFrame:
+    """
+    Replace the rows of a table flagged in drop by new rows.
+
+    :param table: existing table
+    :param drop: boolean pd.Series flagging the rows to remove
+    :param new_rows: rows to insert, with (at least) the columns of table
+    :param sort_by: optional columns to sort the result by
+    :param ascending: sort order, as for pd.DataFrame.sort_values
+    :return: pd.DataFrame with the columns of table
+    """
+    parts = [table[~drop.values]]
+    if len(new_rows):
+        parts.append(new_rows[list(table.columns)])
+    spliced = pd.concat(parts, ignore_index=True)
+    for column in table.columns:
+        if spliced[column].dtype != table[column].dtype and len(table):
+            spliced[column] = spliced[column].astype(table[column].dtype)
+    if sort_by is not None:
+        spliced = spliced.sort_values(sort_by, ascending=ascending)
+    return spliced.reset_index(drop=True)
+
+
+def get_baseline_file(path: str, kind: str) -> str:
+    """
+    Get the file in which the aggregated dataframe last used to build the representations is kept.
+
+    :param path: graph data path prefix of a play, i.e., f"{GRAPHDATA_PATH}/{file_base}"
+    :param kind: "graph" or "hypergraph"
+    :return: path of the baseline .agg.csv file
+    """
+    return f"{path}_{kind}.agg.csv"
+
+
+def update_baseline(file: str, path: str, kind: str):
+    """Keep a copy of the aggregated dataframe the representations were built from."""
+    shutil.copyfile(file, get_baseline_file(path, kind))
+
+
+def read_tables(path: str, suffixes: list, dtype: dict = None):
+    """
+    Read the existing representation tables of a play.
+
+    :param path: graph data path prefix of a play, i.e., f"{GRAPHDATA_PATH}/{file_base}"
+    :param suffixes: file suffixes, e.g., "ce-scene-mw.edges"
+    :param dtype: optional column types, as for pd.read_csv
+    :return: dictionary mapping suffixes to pd.DataFrame objects, or None if a file is missing
+    """
+    files = {suffix: f"{path}_{suffix}.csv" for suffix in suffixes}
+    if not all(os.path.exists(file) for file in files.values()):
+        return None
+    return {suffix: pd.read_csv(file, dtype=dtype) for suffix, file in files.items()}
+
+
+def write_if_changed(table: pd.DataFrame, file: str) -> bool:
+    """
+    Write a table as csv unless the file already holds exactly this content.
+
+    :param table: pd.DataFrame to write
+    :param file: path of the csv file
+    :return: True if the file was (re)written
+    """
+    content = table.to_csv(index=False)
+    if os.path.exists(file):
+        with open(file) as f:
+            if f.read() == content:
+                return False
+    with open(file, "w") as f:
+        f.write(content)
+    return True
@@ -0,0 +1,192 @@
+"""Compact event logs of plays.
+
+The .raw.csv files repeat the full onstage string on every token. An
+`EventLog` records only the state transitions of the spoken text in
+document order: act and scene starts, stagegroup changes, entrances and
+exits (with integer character identifiers), speech starts, and lines with
+their token counts. Consecutive identical events are run-length encoded,
+so that, e.g., ten lines of eight tokens each are a single event.
+
+Replaying the log yields exactly the aggregated dataframe of the play (as
+in the .agg.csv files), from which all graph and hypergraph
+representations are built. Event logs are stored as compressed .npz
+archives next to the .raw.csv files.
+"""
+
+import numpy as np
+import pandas as pd
+
+from hyperbard.preprocessing import get_aggregated, get_grouped_df, set_setting
+from hyperbard.utils import sort_join_strings
+
+EVENT_KINDS = ["act", "scene", "group", "exit", "enter", "speech", "lines"]
+ACT, SCENE, GROUP, EXIT, ENTER, SPEECH, LINES = range(len(EVENT_KINDS))
+
+
+def _run_length_encode(events):
+    """Merge consecutive events of the same kind and value, adding their counts."""
+    events = np.asarray(events, dtype=np.int64).reshape(-1, 3)
+    if not len(events):
+        return events
+    keys = events[:, :2]
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+    counts = np.add.reduceat(events[:, 2], starts)
+    return np.column_stack([keys[starts], counts])
+
+
+class EventLog:
+    """Run-length encoded state transitions of the spoken text of a play.
+
+    Attributes
+    ----------
+    events : np.ndarray
+        Integer array of shape (events, 3) holding the kind (position in
+        EVENT_KINDS), value, and count of every event. Values are act
+        numbers, scene numbers, stagegroup increments, character
+        identifiers (exit, enter), speaker identifiers (speech), or
+        numbers of tokens per line (lines, with the number of lines as
+        count); counts of the other kinds are 1.
+
+    characters : np.ndarray
+        Character identifiers, e.g., "#Romeo_RJ", indexed by the values
+        of entrances and exits.
+
+    speakers : np.ndarray
+        Speaker strings (one or more characters), indexed by the values of
+        speech events.
+    """
+
+    __slots__ = ("events", "characters", "speakers")
+
+    def __init__(self, events, characters, speakers):
+        self.events = np.asarray(events, dtype=np.int64).reshape(-1, 3)
+        self.characters = np.asarray(characters, dtype=str)
+        self.speakers = np.asarray(speakers, dtype=str)
+
+    def __len__(self):
+        return len(self.events)
+
+    def to_frame(self):
+        """Events as data frame with columns kind, value, and count."""
+        return pd.DataFrame(
+            {
+                "kind": np.array(EVENT_KINDS)[self.events[:, 0]],
+                "value": self.events[:, 1],
+                "count": self.events[:, 2],
+            }
+        )
+
+    def get_lines(self):
+        """
+        Replay the log into one row per spoken line.
+
+        Returns
+        -------
+        pd.DataFrame
+            Data frame with columns act, scene, stagegroup_raw, onstage,
+            speaker, n (running line number), and n_tokens, in the order of
+            `get_aggregated`.
+        """
+        act = scene = group = 0
+        onstage = set()
+        onstage_string = ""
+        speaker = ""
+        states, tokens, counts = [], [], []
+        for kind, value, count in self.events:
+            if kind == ACT:
+                act = value
+            elif kind == SCENE:
+                scene = value
+            elif kind == GROUP:
+                group += value
+            elif kind == EXIT:
+                onstage.discard(self.characters[value])
+                onstage_string = sort_join_strings(onstage)
+            elif kind == ENTER:
+                onstage.add(self.characters[value])
+                onstage_string = sort_join_strings(onstage)
+            elif kind == SPEECH:
+                speaker = self.speakers[value]
+            else:
+                states.append((act, scene, group, onstage_string, speaker))
+                tokens.append(value)
+                counts.append(count)
+        lines = pd.DataFrame(
+            np.repeat(np.array(states, dtype=object).reshape(-1, 5), counts, axis=0),
+            columns=["act", "scene", "stagegroup_raw", "onstage", "speaker"],
+        ).astype({"act": int, "scene": int, "stagegroup_raw": int})
+        lines["n"] = np.arange(len(lines))
+        lines["n_tokens"] = np.repeat(np.array(tokens, dtype=np.int64), counts)
+        return lines
+
+    def replay(self):
+        """Aggregated dataframe of the play, as in the .agg.csv files."""
+        lines = self.get_lines()
+        set_setting(lines)
+        return get_grouped_df(lines)
+
+    def save(self, file):
+        """Save the log as compressed .npz archive."""
+        np.savez_compressed(
+            file,
+            events=self.events.astype(np.int32),
+            characters=self.characters,
+            speakers=self.speakers,
+        )
+
+    @classmethod
+    def load(cls, file):
+        """Load a log saved with `save`."""
+        with np.load(file, allow_pickle=False) as archive:
+            return cls(archive["events"], archive["characters"], archive["speakers"])
+
+
+def _event_log(lines):
+    """Event log from spoken lines in document order (as from get_aggregated)."""
+    characters = sorted({c for onstage in lines.onstage for c in onstage.split()})
+    character_ids = {character: idx for idx, character in enumerate(characters)}
+    speakers, speaker_ids = np.unique(
+        lines.speaker.values.astype(str), return_inverse=True
+    )
+    events = []
+    act = scene = group = speaker = None
+    onstage = set()
+    for row, speaker_id in zip(
+        lines[["act", "scene", "stagegroup_raw", "onstage", "n_tokens"]].itertuples(
+            index=False, name=None
+        ),
+        speaker_ids,
+    ):
+        row_act, row_scene, row_group, row_onstage, n_tokens = row
+        if row_act != act:
+            events.append((ACT, row_act, 1))
+        if row_act != act or row_scene != scene:
+            events.append((SCENE, row_scene, 1))
+        if row_group != group:
+            events.append((GROUP, row_group - (group or 0), 1))
+        row_onstage = set(row_onstage.split())
+        for character in sorted(onstage - row_onstage):
+            events.append((EXIT, character_ids[character], 1))
+        for character in sorted(row_onstage - onstage):
+            events.append((ENTER, character_ids[character], 1))
+        if speaker_id != speaker:
+            events.append((SPEECH, speaker_id, 1))
+        events.append((LINES, n_tokens, 1))
+        act, scene, group, onstage, speaker = (
+            row_act,
+            row_scene,
+            row_group,
+            row_onstage,
+            speaker_id,
+        )
+    return EventLog(_run_length_encode(events), characters, speakers)
+
+
+def get_event_log(df: pd.DataFrame) -> EventLog:
+    """
+    Build the event log of a play from its token-level dataframe.
+
+    :param df: pd.DataFrame as returned by get_raw_xml_df (or loaded from a .raw.csv file)
+    :return: EventLog whose replay equals get_agg_xml_df(df)
+    """
+    return _event_log(get_aggregated(df))
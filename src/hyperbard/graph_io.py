@@ -3,10 +3,11 @@
 import os
 import re
 
-import hypernetx as hnx
 import networkx as nx
+import numpy as np
 import pandas as pd
 
+from hyperbard.compact_hypergraph import CompactHypergraph
 from hyperbard.statics import GRAPHDATA_PATH
 from hyperbard.utils import remove_uppercase_prefixes
 
@@ -22,7 +23,11 @@ def rename_directed_columns(edges):
 
 
 def load_graph(
-    play, representation, edge_weights=None, restrict_to_named_characters=True
+    play,
+    representation,
+    edge_weights=None,
+    restrict_to_named_characters=True,
+    path=GRAPHDATA_PATH,
 ):
     """Load graph for a specific representation of a play.
 
@@ -37,6 +42,9 @@ def load_graph(
     edge_weights : None or str
         Optional attribute to use for assigning edge weights.
 
+    path : str
+        Directory holding the graph data (default: GRAPHDATA_PATH).
+
     Returns
     -------
     nx.Graph
@@ -56,11 +64,11 @@ def load_graph(
     )
 
     if graph_type == "ce":
-        nodes_file = os.path.join(GRAPHDATA_PATH, f"{play}_{graph_type}.nodes.csv")
+        nodes_file = os.path.join(path, f"{play}_{graph_type}.nodes.csv")
     else:  # i.e., graph_type == "se":
         nodes_repr = "-".join(representation.split("-")[:2])
-        nodes_file = os.path.join(GRAPHDATA_PATH, f"{play}_{nodes_repr}.nodes.csv")
-    edges_file = os.path.join(GRAPHDATA_PATH, f"{play}_{representation}.edges.csv")
+        nodes_file = os.path.join(path, f"{play}_{nodes_repr}.nodes.csv")
+    edges_file = os.path.join(path, f"{play}_{representation}.edges.csv")
 
     nodes = pd.read_csv(nodes_file)
     edges = pd.read_csv(edges_file)
@@ -134,7 +142,13 @@ def find_key_columns(G):
     return key_columns
 
 
-def load_hypergraph(play, representation, restrict_to_named_characters=True):
+def load_hypergraph(
+    play,
+    representation,
+    restrict_to_named_characters=True,
+    compact=False,
+    path=GRAPHDATA_PATH,
+):
     """Load specific hypergraph representation for a play.
 
     Parameters
@@ -145,12 +159,19 @@ def load_hypergraph(play, representation, restrict_to_named_characters=True):
     representation : str
         Hypergraph representation identifier, e.g. 'hg-group-mw'.
 
-    edge_weights : None or str
-        Optional attribute to use for assigning edge weights.
+    restrict_to_named_characters : bool
+        If set, drop characters whose identifiers are all uppercase.
+
+    compact : bool
+        If set, return a `CompactHypergraph`, which is much cheaper to
+        build and query but cannot be drawn directly.
+
+    path : str
+        Directory holding the graph data (default: GRAPHDATA_PATH).
 
     Returns
     -------
-    hnx.Hypergraph
+    hnx.Hypergraph or CompactHypergraph
         Hypergraph corresponding to the specified play and representation.
     """
     assert len(representation.split("-")) == 3, RuntimeError(
@@ -161,7 +182,7 @@ def load_hypergraph(play, representation, restrict_to_named_characters=True):
 
     assert hypergraph_type == "hg", RuntimeError("Expecting hypergraph representation")
 
-    edges_file = os.path.join(GRAPHDATA_PATH, f"{play}_{representation}.edges.csv")
+    edges_file = os.path.join(path, f"{play}_{representation}.edges.csv")
     edges = pd.read_csv(edges_file)
 
     edges.onstage = edges.onstage.map(lambda x: x.split()).map(
@@ -179,14 +200,185 @@ def load_hypergraph(play, representation, restrict_to_named_characters=True):
             lambda characters: [elem for elem in characters if elem in named_characters]
         )
 
-    H = hnx.Hypergraph()
-    for idx, row in edges.iterrows():
-        H.add_edge(
-            hnx.Entity(
-                idx,
-                row["onstage"],
-                **{k: v for k, v in row.items() if k != "onstage"},
+    if compact:
+        return CompactHypergraph.from_edges(edges)
+    return hypergraph_from_edges(edges)
+
+
+def load_node_weights(play, representation):
+    """Load the edge-specific node weights of a hypergraph representation.
+
+    Parameters
+    ----------
+    play : str
+        Identifier of the play, e.g. 'romeo-and-juliet'.
+
+    representation : str
+        Undirected hypergraph representation identifier, i.e.,
+        'hg-scene-mw' or 'hg-group-mw'.
+
+    Returns
+    -------
+    pd.DataFrame
+        Table with one row per pair of node and hyperedge, as written by
+        `create_hypergraph_representations`.
+    """
+    node_weights_file = os.path.join(
+        GRAPHDATA_PATH, f"{play}_{representation}.node-weights.csv"
+    )
+    return pd.read_csv(node_weights_file)
+
+
+def _split_members(members):
+    """Return hyperedge members as list, splitting whitespace-joined strings."""
+    if isinstance(members, str):
+        return members.split()
+    return list(members)
+
+
+def hypergraph_from_setsystem(setsystem, edge_attributes=None, name=None):
+    """Build a hypergraph from a set system in a single pass.
+
+    Adding edges one by one to a `hnx.Hypergraph` checks every new edge
+    against the registry of all existing entities, which makes the
+    construction quadratic in the number of edges. Here, node and edge
+    entities are created once and wired together directly, yielding
+    the same object structure as the dynamic `hnx.Hypergraph`
+    constructor in time linear in the number of incidences.
+
+    Wiring the entities relies on private attributes of hypernetx, which
+    is therefore pinned to an exact version; tests compare the result to
+    `hnx.Hypergraph(setsystem)`.
+
+    Parameters
+    ----------
+    setsystem : dict
+        Dictionary with edge identifiers as keys and iterables of node
+        identifiers (or whitespace-separated strings thereof) as values.
+
+    edge_attributes : None or dict
+        Optional dictionary mapping attribute names to array-like
+        columns, aligned with the iteration order of `setsystem`.
+
+    name : None or str
+        Optional name of the hypergraph.
+
+    Returns
+    -------
+    hnx.Hypergraph
+        Hypergraph with edge attributes set as entity properties.
+    """
+    # Imported here since hypernetx is expensive to import and not needed
+    # for loading graphs or compact hypergraphs.
+    import hypernetx as hnx
+
+    edge_attributes = edge_attributes or {}
+    edge_ids = list(setsystem.keys())
+    columns = {k: list(v) for k, v in edge_attributes.items()}
+    for k, v in columns.items():
+        if len(v) != len(edge_ids):
+            raise ValueError(
+                f"Edge attribute '{k}' has {len(v)} values, expected {len(edge_ids)}!"
             )
-        )
 
+    H = hnx.Hypergraph(name=name)
+    edge_set = hnx.EntitySet(f"{H.name}:Edges")
+    node_set = hnx.EntitySet(f"{H.name}:Nodes")
+
+    nodes = {}
+    for idx, edge_id in enumerate(edge_ids):
+        edge = hnx.Entity(edge_id, **{k: v[idx] for k, v in columns.items()})
+        for node_id in _split_members(setsystem[edge_id]):
+            if node_id not in nodes:
+                node = hnx.Entity(node_id)
+                node._memberships[node_set.uid] = node_set
+                node_set._elements[node_id] = node
+                nodes[node_id] = node
+            edge._elements[node_id] = nodes[node_id]
+            nodes[node_id]._memberships[edge_id] = edge
+        edge._memberships[edge_set.uid] = edge_set
+        edge_set._elements[edge_id] = edge
+
+    H._edges = edge_set
+    H._nodes = node_set
     return H
+
+
+def hypergraph_from_incidence_matrix(
+    incidence, node_ids, edge_ids=None, edge_attributes=None, name=None
+):
+    """Build a hypergraph from a (nodes x edges) incidence matrix.
+
+    Parameters
+    ----------
+    incidence : array-like or scipy.sparse matrix
+        Matrix whose nonzero entries mark node-edge incidences.
+
+    node_ids : list
+        Node identifiers, one per row of `incidence`.
+
+    edge_ids : None or list
+        Edge identifiers, one per column of `incidence`. Defaults to
+        the column positions.
+
+    edge_attributes : None or dict
+        Optional dictionary mapping attribute names to array-like
+        columns, one entry per column of `incidence`.
+
+    name : None or str
+        Optional name of the hypergraph.
+
+    Returns
+    -------
+    hnx.Hypergraph
+        Hypergraph with edge attributes set as entity properties.
+    """
+    if hasattr(incidence, "tocsc"):
+        incidence = incidence.tocsc()
+        n_edges = incidence.shape[1]
+        columns = [
+            incidence.indices[incidence.indptr[j] : incidence.indptr[j + 1]]
+            for j in range(n_edges)
+        ]
+    else:
+        incidence = np.asarray(incidence)
+        n_edges = incidence.shape[1]
+        columns = [np.flatnonzero(incidence[:, j]) for j in range(n_edges)]
+    if edge_ids is None:
+        edge_ids = list(range(n_edges))
+    node_ids = np.asarray(node_ids, dtype=object)
+    setsystem = {
+        edge_id: node_ids[rows].tolist() for edge_id, rows in zip(edge_ids, columns)
+    }
+    return hypergraph_from_setsystem(setsystem, edge_attributes, name=name)
+
+
+def hypergraph_from_edges(edges, member_column="onstage", name=None):
+    """Build a hypergraph from a hyperedge table.
+
+    Parameters
+    ----------
+    edges : pd.DataFrame
+        Table with one row per hyperedge, e.g., as loaded from an
+        `hg-*.edges.csv` file. The index provides the edge identifiers.
+
+    member_column : str
+        Column holding the members of each hyperedge, either as lists
+        or as whitespace-separated strings. All other columns are
+        attached as edge attributes.
+
+    name : None or str
+        Optional name of the hypergraph.
+
+    Returns
+    -------
+    hnx.Hypergraph
+        Hypergraph with one edge per row of `edges`.
+    """
+    setsystem = dict(zip(edges.index, edges[member_column]))
+    edge_attributes = {
+        column: edges[column].tolist()
+        for column in edges.columns
+        if column != member_column
+    }
+    return hypergraph_from_setsystem(setsystem, edge_attributes, name=name)
@@ -1,17 +1,97 @@
+import numpy as np
 import pandas as pd
-from utils import character_string_to_sorted_list, sort_join_strings, string_to_set
 
+from hyperbard.utils import get_frame_cache
 
-def _explode_df(df, explode_column):
+MEMBERSHIP_ROLES = ["onstage", "speaker"]
+MEMBERSHIP_KEY_COLUMNS = ["act", "scene", "stagegroup", "setting"]
+MEMBERSHIP_WEIGHT_COLUMNS = ["n_tokens", "n_lines"]
+
+
+def _membership_table(df: pd.DataFrame) -> pd.DataFrame:
     """
+    Tokenise the onstage and speaker columns of an aggregated dataframe once,
+    producing one row per (row of df, character, role).
 
-    :param df:
-    :param explode_column:
-    :return:
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :return: pd.DataFrame with columns row, node, role, and the key and weight columns of df
+    """
+    carried_columns = [
+        c for c in MEMBERSHIP_KEY_COLUMNS + MEMBERSHIP_WEIGHT_COLUMNS if c in df
+    ]
+    parts = []
+    for role in MEMBERSHIP_ROLES:
+        tokens = df[role].str.split()
+        lengths = tokens.str.len().fillna(0).astype(int).values
+        rows = np.repeat(np.arange(len(df)), lengths)
+        part = pd.DataFrame(
+            {
+                "row": rows,
+                "node": [t for ts in tokens.dropna() for t in ts],
+                "role": role,
+            }
+        )
+        for column in carried_columns:
+            part[column] = df[column].values[rows]
+        parts.append(part.drop_duplicates(["row", "node"]))
+    return (
+        pd.concat(parts, ignore_index=True)
+        .sort_values(["row", "role", "node"])
+        .reset_index(drop=True)
+    )
+
+
+def get_membership_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get the long-format membership table of an aggregated dataframe, with one row per
+    (row of df, character, role), where role is "onstage" or "speaker", carrying the
+    act, scene, stagegroup, setting, n_tokens, and n_lines of the row.
+    All hypergraph builders aggregate over this table, which is computed once per
+    dataframe and cached; callers must treat it as read-only.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :return: pd.DataFrame with columns row, node, role, and the key and weight columns of df
+    """
+    cache = get_frame_cache(df)
+    if "membership" not in cache:
+        cache["membership"] = _membership_table(df)
+    return cache["membership"]
+
+
+def _role_rows(membership: pd.DataFrame, role: str) -> pd.DataFrame:
+    return membership[membership.role.values == role]
+
+
+def _joined_members(
+    membership: pd.DataFrame, role: str, group_ids: np.ndarray, n_groups: int
+) -> list:
     """
-    df_exploded = df.copy()
-    df_exploded[explode_column] = df_exploded[explode_column].map(string_to_set)
-    return df_exploded.explode(explode_column)
+    Collect the sorted, deduplicated members with the given role per group of rows.
+
+    :param membership: pd.DataFrame as returned by get_membership_table
+    :param role: "onstage" or "speaker"
+    :param group_ids: Group number for every row of the underlying dataframe (NaN or negative if ungrouped)
+    :param n_groups: Number of groups
+    :return: List of whitespace-joined member strings, one per group
+    """
+    # groupby().ngroup() yields NaN for rows with missing keys
+    group_ids = np.nan_to_num(group_ids, nan=-1).astype(np.int64)
+    rows = _role_rows(membership, role)
+    pairs = (
+        pd.DataFrame({"group": group_ids[rows.row.values], "node": rows.node.values})
+        .query("group >= 0")
+        .drop_duplicates()
+        .sort_values(["group", "node"])
+    )
+    groups = pairs.group.values
+    boundaries = np.flatnonzero(np.diff(groups)) + 1
+    joined = [""] * n_groups
+    for group, nodes in zip(
+        groups[np.concatenate([[0], boundaries])] if len(groups) else [],
+        np.split(pairs.node.values, boundaries),
+    ):
+        joined[group] = " ".join(nodes)
+    return joined
 
 
 def get_hypergraph_edges(
@@ -27,39 +107,16 @@ def get_hypergraph_edges(
     :param groupby: ["act", "scene"] -> one edge per act and scene, ["act", "scene", "stagegroup"] -> one edge per act, scene, and stagegroup
     :return: tuple of pd.DataFrame objects corresponding to (edges, edge_specific_node_weights)
     """
-    agg = {
-        "n_tokens": "sum",
-        "n_lines": "sum",
-        "onstage": sort_join_strings,
-    }
-    df_grouped = df.groupby(groupby).agg(agg).reset_index()
-    df_grouped["onstage"] = df_grouped["onstage"].map(character_string_to_sorted_list)
-    # for node weights <- lines of speech
-    df_speaker_exploded = _explode_df(df, "speaker")
-    speaker_weights = (
-        df_speaker_exploded.groupby(groupby + ["speaker"])
-        .agg({"n_tokens": "sum", "n_lines": "sum"})
-        .reset_index()
-        .rename(
-            dict(
-                speaker="node", n_lines="n_lines_speaker", n_tokens="n_tokens_speaker"
-            ),
-            axis=1,
-        )
+    membership = get_membership_table(df)
+    grouped = df.groupby(groupby)
+    df_grouped = grouped[["n_tokens", "n_lines"]].sum().reset_index()
+    df_grouped["onstage"] = _joined_members(
+        membership, "onstage", grouped.ngroup().values, len(df_grouped)
     )
+    # for node weights <- lines of speech
+    speaker_weights = _sum_weights(membership, "speaker", groupby)
     # for node weights <- lines onstage
-    df_onstage_exploded = _explode_df(df, "onstage")
-    onstage_weights = (
-        df_onstage_exploded.groupby(groupby + ["onstage"])
-        .agg({"n_tokens": "sum", "n_lines": "sum"})
-        .reset_index()
-        .rename(
-            dict(
-                onstage="node", n_lines="n_lines_onstage", n_tokens="n_tokens_onstage"
-            ),
-            axis=1,
-        )
-    )
+    onstage_weights = _sum_weights(membership, "onstage", groupby)
     merge_columns = ["node"] + groupby
     edge_specific_node_weights = speaker_weights.merge(
         onstage_weights, left_on=merge_columns, right_on=merge_columns, how="outer"
@@ -74,7 +131,6 @@ def get_hypergraph_edges(
         edge_specific_node_weights[column] = edge_specific_node_weights[column].astype(
             int
         )
-    df_grouped.onstage = df_grouped.onstage.map(sort_join_strings)
     return df_grouped, edge_specific_node_weights
 
 
@@ -87,16 +143,12 @@ def get_multi_directed_hypergraph_edges(df: pd.DataFrame) -> pd.DataFrame:
     :return:
     """
     groupby = ["act", "scene", "stagegroup", "setting", "speaker"]
-    agg = {
-        "n_tokens": "sum",
-        "n_lines": "sum",
-        "onstage": sort_join_strings,
-    }
-    df_grouped = df.groupby(groupby).agg(agg).reset_index()
-    df_grouped["onstage"] = df_grouped["onstage"].map(character_string_to_sorted_list)
-    df_grouped["speaker"] = df_grouped["speaker"].map(character_string_to_sorted_list)
-    df_grouped.onstage = df_grouped.onstage.map(sort_join_strings)
-    df_grouped.speaker = df_grouped.speaker.map(sort_join_strings)
+    membership = get_membership_table(df)
+    grouped = df.groupby(groupby)
+    df_grouped = grouped[["n_tokens", "n_lines"]].sum().reset_index()
+    group_ids = grouped.ngroup().values
+    for role in MEMBERSHIP_ROLES:
+        df_grouped[role] = _joined_members(membership, role, group_ids, len(df_grouped))
     column_order = [
         "act",
         "scene",
@@ -125,29 +177,40 @@ def get_weighted_directed_hypergraph_edges(df: pd.DataFrame) -> pd.DataFrame:
     return df_mwd
 
 
-def _hypergraph_node_dataframe(
-    df_exploded_onstage: pd.DataFrame, df_exploded_speaker: pd.DataFrame
+def _sum_weights(
+    membership: pd.DataFrame, role: str, groupby: list = None
 ) -> pd.DataFrame:
     """
+    Sum n_tokens and n_lines of the membership table per character with the given role,
+    optionally resolved at the level given by the groupby argument.
 
-    :param df_exploded_onstage:
-    :param df_exploded_speaker:
-    :return:
+    :param membership: pd.DataFrame as returned by get_membership_table
+    :param role: "onstage" or "speaker"
+    :param groupby: Optional list of additional columns to group by
+    :return: pd.DataFrame with a "node" column and n_tokens_{role} and n_lines_{role}
     """
-    nodes = pd.DataFrame()
-    nodes["node"] = sorted(df_exploded_onstage.onstage.unique())
-    nodes["n_lines_onstage"] = nodes.node.map(
-        lambda node: df_exploded_onstage.query("onstage == @node").n_lines.sum()
-    )
-    nodes["n_tokens_onstage"] = nodes.node.map(
-        lambda node: df_exploded_onstage.query("onstage == @node").n_tokens.sum()
-    )
-    nodes["n_lines_speaker"] = nodes.node.map(
-        lambda node: df_exploded_speaker.query("speaker == @node").n_lines.sum()
+    return (
+        _role_rows(membership, role)
+        .groupby((groupby or []) + ["node"])[MEMBERSHIP_WEIGHT_COLUMNS]
+        .sum()
+        .add_suffix(f"_{role}")
+        .reset_index()
     )
-    nodes["n_tokens_speaker"] = nodes.node.map(
-        lambda node: df_exploded_speaker.query("speaker == @node").n_tokens.sum()
+
+
+def _hypergraph_node_dataframe(membership: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute global node weights with one grouped aggregation per role.
+    Every character onstage is a node; characters who never speak get speaker weights of 0.
+
+    :param membership: pd.DataFrame as returned by get_membership_table
+    :return: pd.DataFrame of hypergraph nodes with {tokens,lines} {onstage,speaker}
+    """
+    nodes = _sum_weights(membership, "onstage").merge(
+        _sum_weights(membership, "speaker"), on="node", how="left"
     )
+    for column in ["n_tokens_speaker", "n_lines_speaker"]:
+        nodes[column] = nodes[column].fillna(0).astype(int)
     column_order = [
         "node",
         "n_tokens_onstage",
@@ -164,7 +227,4 @@ def get_hypergraph_nodes(df: pd.DataFrame) -> pd.DataFrame:
     :param df: pd.DataFrame as loaded from an .agg.csv file
     :return: pd.DataFrame of hypergraph nodes with {tokens,lines} {spoken,heard} as potential global node weights
     """
-    df_exploded_onstage = _explode_df(df, "onstage")
-    df_exploded_speaker = _explode_df(df, "speaker")
-    nodes = _hypergraph_node_dataframe(df_exploded_onstage, df_exploded_speaker)
-    return nodes
+    return _hypergraph_node_dataframe(get_membership_table(df))
@@ -0,0 +1,155 @@
+"""Canonical character-by-text-unit incidence of a play.
+
+All representations of a play (clique expansions, star expansions, and
+hypergraphs) are derived from which characters are onstage, and who
+speaks, in which text units. This module computes these incidences once
+per aggregated dataframe, as sparse (characters x text units) matrices,
+so that degree-based statistics for all representations can be obtained
+via a few sparse matrix products instead of one graph traversal per
+representation.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from hyperbard.hypergraph_representations import get_membership_table
+from hyperbard.utils import get_frame_cache
+
+LEVEL_GROUPBY = {
+    "scene": ["act", "scene"],
+    "group": ["act", "scene", "stagegroup"],
+    "speech": ["act", "scene", "stagegroup", "setting", "speaker"],
+}
+
+
+class UnitIncidence:
+    """Incidence between the characters of a play and its text units at
+    one level of aggregation.
+
+    Attributes
+    ----------
+    level : str
+        "scene", "group", or "speech" (see `LEVEL_GROUPBY`).
+
+    units : pd.DataFrame
+        One row per text unit, holding the groupby keys of the level and
+        the summed n_tokens and n_lines of the unit.
+
+    row_units : np.ndarray
+        For every row of the aggregated dataframe, the position of its
+        text unit (-1 if the row does not belong to any unit).
+
+    onstage : scipy.sparse.csr_matrix
+        Binary (characters x units) matrix of characters onstage.
+
+    speaker : scipy.sparse.csr_matrix
+        Binary (characters x units) matrix of characters speaking.
+    """
+
+    __slots__ = ("level", "units", "row_units", "onstage", "speaker")
+
+    def __init__(self, level, units, row_units, onstage, speaker):
+        self.level = level
+        self.units = units
+        self.row_units = row_units
+        self.onstage = onstage
+        self.speaker = speaker
+
+    @property
+    def listener(self):
+        """Binary (characters x units) matrix of characters onstage but not
+        speaking."""
+        return (self.onstage - self.onstage.multiply(self.speaker)).tocsr()
+
+    @property
+    def sizes(self):
+        """Number of characters onstage per text unit."""
+        return np.asarray(self.onstage.sum(axis=0)).ravel()
+
+    def weights(self, weight=None):
+        """Per-unit weights: ones if `weight` is None, else the unit sums of
+        the given column (e.g., "n_lines")."""
+        if weight is None:
+            return np.ones(len(self.units))
+        return self.units[weight].values.astype(float)
+
+
+class PlayIncidence:
+    """Incidences of the characters of a play with its text units at the
+    scene, stagegroup, and speech act level.
+
+    Attributes
+    ----------
+    characters : pd.Index
+        Sorted identifiers of all characters onstage at some point; the
+        rows of all incidence matrices are aligned with this index.
+
+    levels : dict
+        Dictionary mapping "scene", "group", and "speech" to
+        `UnitIncidence` objects.
+    """
+
+    __slots__ = ("characters", "levels")
+
+    def __init__(self, characters, levels):
+        self.characters = characters
+        self.levels = levels
+
+    def __getitem__(self, level):
+        return self.levels[level]
+
+
+def _role_matrix(membership, role, characters, row_units, n_units):
+    rows = membership[membership.role.values == role]
+    character_codes = characters.get_indexer(rows.node.values)
+    unit_codes = row_units[rows.row.values]
+    keep = (character_codes >= 0) & (unit_codes >= 0)
+    matrix = sp.csr_matrix(
+        (
+            np.ones(keep.sum()),
+            (character_codes[keep], unit_codes[keep]),
+        ),
+        shape=(len(characters), n_units),
+    )
+    # Duplicate (character, unit) pairs are summed on construction.
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def _unit_incidence(df, membership, characters, level):
+    groupby = LEVEL_GROUPBY[level]
+    grouped = df.groupby(groupby)
+    units = grouped[["n_tokens", "n_lines"]].sum().reset_index()
+    row_units = grouped.ngroup().fillna(-1).values.astype(np.int64)
+    onstage, speaker = (
+        _role_matrix(membership, role, characters, row_units, len(units))
+        for role in ["onstage", "speaker"]
+    )
+    return UnitIncidence(level, units, row_units, onstage, speaker)
+
+
+def _play_incidence(df):
+    membership = get_membership_table(df)
+    characters = pd.Index(
+        np.unique(membership[membership.role.values == "onstage"].node.values),
+        name="node",
+    )
+    levels = {
+        level: _unit_incidence(df, membership, characters, level)
+        for level in LEVEL_GROUPBY
+    }
+    return PlayIncidence(characters, levels)
+
+
+def get_play_incidence(df: pd.DataFrame) -> PlayIncidence:
+    """
+    Get the canonical incidence of a play, computed once per aggregated dataframe and cached.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :return: PlayIncidence with scene, group, and speech level incidences
+    """
+    cache = get_frame_cache(df)
+    if "incidence" not in cache:
+        cache["incidence"] = _play_incidence(df)
+    return cache["incidence"]
@@ -0,0 +1,248 @@
+"""Interval index of who is onstage at every token of a play.
+
+The onstage column computed by `set_onstage` is constant over long runs
+of consecutive tokens. An `OnstageIntervalIndex` stores only these runs,
+as sorted arrays of (first token, last token, onstage set) triples, plus
+a table of the numeric parts of the token xml:ids (e.g., 330 for
+"fs-mnd-0000330") to resolve xml:ids to positions in document order.
+Looking up who is onstage at a token or line, or during a range of
+tokens, is then a binary search, and the token-level .raw.csv file does
+not need to be loaded. Indices are stored as .npz archives next to the
+.raw.csv files.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+TOKEN_ID_PATTERN = r"^(?P<prefix>.*?)(?P<number>\d+)$"
+
+
+def _split_token_ids(xml_ids):
+    """Split xml:ids such as "fs-mnd-0000330" into prefix and number."""
+    return pd.Series(xml_ids, dtype=object).str.extract(TOKEN_ID_PATTERN)
+
+
+class OnstageIntervalIndex:
+    """Runs of tokens with the same characters onstage.
+
+    Token positions count the tokens of a play in document order. Token
+    numbers are the numeric parts of their xml:ids, which mostly, but not
+    always, increase in document order.
+
+    Attributes
+    ----------
+    prefix : str
+        Common prefix of the token xml:ids, e.g., "fs-mnd-".
+
+    digits : int
+        Number of digits of the token xml:ids (after the prefix).
+
+    tokens : np.ndarray
+        Token numbers in document order.
+
+    starts, ends : np.ndarray
+        Positions of the first and last token of every run, sorted.
+
+    set_ids : np.ndarray
+        For every run, the position of its onstage set in `sets`.
+
+    sets : np.ndarray
+        Distinct onstage sets, as whitespace-separated identifiers.
+
+    lines : np.ndarray
+        Line references (the n attribute, e.g., "3.5.42") in document
+        order.
+
+    line_starts, line_ends : np.ndarray
+        Positions of the first and last token of every line.
+    """
+
+    __slots__ = (
+        "prefix",
+        "digits",
+        "tokens",
+        "starts",
+        "ends",
+        "set_ids",
+        "sets",
+        "lines",
+        "line_starts",
+        "line_ends",
+        "_order",
+        "_sorted_tokens",
+        "_line_positions",
+    )
+
+    def __init__(
+        self,
+        prefix,
+        digits,
+        tokens,
+        starts,
+        ends,
+        set_ids,
+        sets,
+        lines,
+        line_starts,
+        line_ends,
+    ):
+        self.prefix = str(prefix)
+        self.digits = int(digits)
+        self.tokens = np.asarray(tokens, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.set_ids = np.asarray(set_ids, dtype=np.int64)
+        self.sets = np.asarray(sets, dtype=str)
+        self.lines = np.asarray(lines, dtype=str)
+        self.line_starts = np.asarray(line_starts, dtype=np.int64)
+        self.line_ends = np.asarray(line_ends, dtype=np.int64)
+        self._order = np.argsort(self.tokens, kind="stable")
+        self._sorted_tokens = self.tokens[self._order]
+        self._line_positions = {line: idx for idx, line in enumerate(self.lines)}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def position(self, xml_id):
+        """Position of a token in document order, given its xml:id."""
+        match = re.match(TOKEN_ID_PATTERN, str(xml_id))
+        if match is not None and match.group("prefix") == self.prefix:
+            number = int(match.group("number"))
+            candidate = np.searchsorted(self._sorted_tokens, number)
+            if (
+                candidate < len(self._sorted_tokens)
+                and self._sorted_tokens[candidate] == number
+            ):
+                return int(self._order[candidate])
+        raise ValueError(f"xml_id={xml_id}, must be a token of the play!")
+
+    def xml_id(self, position):
+        """xml:id of the token at a position."""
+        return f"{self.prefix}{self.tokens[position]:0{self.digits}d}"
+
+    def _run(self, position):
+        """Position of the run containing a token position."""
+        return int(np.searchsorted(self.starts, position, side="right")) - 1
+
+    def onstage_at(self, xml_id):
+        """Characters onstage at a token, given its xml:id."""
+        return self.sets[self.set_ids[self._run(self.position(xml_id))]].split()
+
+    def line_range(self, line):
+        """xml:ids of the first and last token of a line."""
+        if line not in self._line_positions:
+            raise ValueError(f"line={line} not found!")
+        position = self._line_positions[line]
+        return (
+            self.xml_id(self.line_starts[position]),
+            self.xml_id(self.line_ends[position]),
+        )
+
+    def onstage_at_line(self, line):
+        """Characters onstage at the first token of a line, e.g., "3.5.42"."""
+        return self.onstage_at(self.line_range(line)[0])
+
+    def runs_between(self, start, end):
+        """Runs overlapping the tokens from start to end (xml:ids, inclusive,
+        in document order), clipped to this range.
+
+        Returns
+        -------
+        pd.DataFrame
+            Data frame with columns start, end (xml:ids), and onstage.
+        """
+        first, last = self.position(start), self.position(end)
+        if first > last:
+            raise ValueError(f"start={start}, must not come after end={end}!")
+        runs = slice(self._run(first), self._run(last) + 1)
+        return pd.DataFrame(
+            {
+                "start": [
+                    self.xml_id(position)
+                    for position in np.maximum(self.starts[runs], first)
+                ],
+                "end": [
+                    self.xml_id(position)
+                    for position in np.minimum(self.ends[runs], last)
+                ],
+                "onstage": self.sets[self.set_ids[runs]],
+            }
+        )
+
+    def onstage_between(self, start, end):
+        """Sorted characters onstage at some token from start to end."""
+        return sorted(
+            {
+                character
+                for onstage in self.runs_between(start, end).onstage
+                for character in onstage.split()
+            }
+        )
+
+    def save(self, file):
+        """Save the index as .npz archive."""
+        np.savez(
+            file,
+            prefix=np.array(self.prefix),
+            digits=np.array(self.digits),
+            tokens=self.tokens,
+            starts=self.starts,
+            ends=self.ends,
+            set_ids=self.set_ids,
+            sets=self.sets,
+            lines=self.lines,
+            line_starts=self.line_starts,
+            line_ends=self.line_ends,
+        )
+
+    @classmethod
+    def load(cls, file):
+        """Load an index saved with `save`."""
+        with np.load(file, allow_pickle=False) as archive:
+            return cls(
+                archive["prefix"].item(),
+                archive["digits"].item(),
+                archive["tokens"],
+                archive["starts"],
+                archive["ends"],
+                archive["set_ids"],
+                archive["sets"],
+                archive["lines"],
+                archive["line_starts"],
+                archive["line_ends"],
+            )
+
+
+def get_onstage_interval_index(df: pd.DataFrame) -> OnstageIntervalIndex:
+    """
+    Build the onstage interval index of a play from its token-level dataframe.
+
+    :param df: pd.DataFrame as returned by get_raw_xml_df (or loaded from a .raw.csv file)
+    :return: OnstageIntervalIndex over the tokens whose xml:ids share the prefix of the words
+    """
+    parts = _split_token_ids(df["xml:id"].values)
+    prefix = parts.prefix[df.tag.values == "w"].mode().iloc[0]
+    is_token = (parts.prefix == prefix).values
+    numbers = parts.number[is_token]
+    tokens = df[is_token].assign(
+        position=np.arange(is_token.sum()), number=numbers.astype(np.int64).values
+    )
+    onstage = tokens.onstage.fillna("").astype(str).values
+    starts = np.flatnonzero(np.r_[True, onstage[1:] != onstage[:-1]])
+    sets, set_ids = np.unique(onstage[starts], return_inverse=True)
+    line_groups = tokens[tokens.n.notna()].groupby("n", sort=False).position
+    line_starts = line_groups.min()
+    return OnstageIntervalIndex(
+        prefix,
+        numbers.str.len().max(),
+        tokens.number.values,
+        starts,
+        np.r_[starts[1:] - 1, len(tokens) - 1],
+        set_ids,
+        sets,
+        line_starts.index.values,
+        line_starts.values,
+        line_groups.max().values,
+    )
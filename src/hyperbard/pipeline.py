@@ -0,0 +1,587 @@
+"""Command line entry point running the pipeline as a DAG of stages.
+
+Every stage declares the stages it requires, the files it reads and
+writes, and whether it runs once per play (preprocess, representations,
+hypergraph_representations, rankings) or once for the corpus
+(statistics, plots). Selecting stages and plays yields a DAG of tasks,
+which are run on a single worker pool as soon as the tasks they depend
+on are done.
+
+A task is stale if one of its outputs is missing, or if its inputs
+changed since it last ran, as recorded by their modification times and
+sizes in STATE_FILE. Tasks that never ran through the pipeline are
+stale unless all their outputs are newer than their inputs, so that
+outputs of earlier runs of the individual scripts are kept. Since the
+representation scripts only rewrite tables whose content changed, an
+upstream task rerun without effect does not make its dependents stale.
+
+Usage::
+
+    hyperbard run                             # all stale tasks
+    hyperbard run -p hamlet -s rankings       # rankings of Hamlet, and upstream
+    hyperbard run -s plots --only -j 1        # plots only, in-process
+    hyperbard status -s representations       # show what is stale, and why
+    hyperbard stages                          # show the DAG
+"""
+
+import argparse
+import json
+import os
+import runpy
+import sys
+import traceback
+from collections import OrderedDict
+from glob import glob
+from multiprocessing import Pool, cpu_count
+from queue import Queue
+
+from hyperbard.create_graph_representations import GRAPH_TABLES
+from hyperbard.create_hypergraph_representations import HYPERGRAPH_TABLES
+from hyperbard.statics import (
+    DATA_PATH,
+    GRAPHDATA_PATH,
+    GRAPHICS_PATH,
+    META_PATH,
+    PAPERGRAPHICS_PATH,
+    RANKINGDATA_PATH,
+    RAWDATA_PATH,
+)
+from hyperbard.track_time import add_profiler_arguments, configure_profiler, run, span
+from hyperbard.utils import get_filename_base
+
+STATE_FILE = f"{DATA_PATH}/pipeline_state.json"
+RAW_SUFFIX = "_TEIsimple_FolgerShakespeare.xml"
+PREPROCESSED_SUFFIXES = ["cast.csv", "raw.csv", "onstage.npz", "events.npz", "agg.csv"]
+PLOT_FILES = [
+    "romeo-and-juliet_rank-correlations.pdf",
+    "toy_drama_ce.pdf",
+    "toy_drama_hg.pdf",
+    "toy_drama_se.pdf",
+    "romeo_and_juliet_ce-scene-b.pdf",
+    "romeo_and_juliet_ce-scene-mb.pdf",
+    "romeo_and_juliet_ce-scene-mw.pdf",
+    "romeo_and_juliet_ce-scene-mw-3.pdf",
+    "romeo_and_juliet_ce-group-mw-3.pdf",
+    "romeo_and_juliet_ce-3-differences.pdf",
+    "romeo_and_juliet_se-scene_act-3.pdf",
+    "romeo_and_juliet_se-group_act-3.pdf",
+    "romeo_and_juliet_se-speech_3.pdf",
+    "romeo_and_juliet_hg-speech-over-time.pdf",
+] + [f"romeo_and_juliet_hg-group_3-{scene}.pdf" for scene in range(1, 6)]
+
+RAN, FRESH, FAILED, BLOCKED = "ran", "fresh", "failed", "blocked"
+
+
+class Stage:
+    """A step of the pipeline.
+
+    Parameters
+    ----------
+    name : str
+        Stage name, e.g., "representations".
+
+    requires : list
+        Names of the stages whose outputs this stage reads.
+
+    action : callable
+        Module-level function (so that it can be sent to worker processes)
+        taking the play (None for corpus stages) and the force flag.
+
+    inputs, outputs : callable
+        Functions mapping the play (None for corpus stages) to lists of
+        files read or written by the action.
+
+    per_play : bool
+        Whether the stage runs once per play or once for the corpus.
+    """
+
+    __slots__ = ("name", "requires", "action", "inputs", "outputs", "per_play")
+
+    def __init__(self, name, requires, action, inputs, outputs, per_play=True):
+        self.name = name
+        self.requires = list(requires)
+        self.action = action
+        self.inputs = inputs
+        self.outputs = outputs
+        self.per_play = per_play
+
+
+def _fingerprint(files):
+    stats = {file: os.stat(file) for file in sorted(files)}
+    return {file: [stat.st_mtime_ns, stat.st_size] for file, stat in stats.items()}
+
+
+def _task_key(task):
+    stage, play = task
+    return stage if play is None else f"{stage}/{play}"
+
+
+def _run_task(action, stage, play, force):
+    """Run the action of a task, profiled as a span of the pipeline run."""
+    with span(stage, **({} if play is None else {"play": play})):
+        action(play, force)
+
+
+class Pipeline:
+    """Incremental runner of a DAG of stages.
+
+    Parameters
+    ----------
+    stages : list
+        Stage objects; every stage must come after the stages it requires.
+
+    state_file : str
+        JSON file recording the input fingerprints of the tasks that ran.
+    """
+
+    __slots__ = ("stages", "state_file", "state")
+
+    def __init__(self, stages, state_file=STATE_FILE):
+        self.stages = OrderedDict()
+        for stage in stages:
+            unknown = [name for name in stage.requires if name not in self.stages]
+            if unknown:
+                raise ValueError(
+                    f"requires={unknown} of {stage.name}, must be earlier stages!"
+                )
+            self.stages[stage.name] = stage
+        self.state_file = state_file
+        self.state = {}
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                self.state = json.load(f)
+
+    def get_stages(self, stages=None, upstream=True):
+        """Names of the selected stages (and of the stages they require) in
+        DAG order."""
+        if stages is None:
+            return list(self.stages)
+        unknown = [name for name in stages if name not in self.stages]
+        if unknown:
+            raise ValueError(f"stages={unknown}, must be in {list(self.stages)}!")
+        selected = set(stages)
+        if upstream:
+            for name in reversed(self.stages):
+                if name in selected:
+                    selected.update(self.stages[name].requires)
+        return [name for name in self.stages if name in selected]
+
+    def get_tasks(self, plays, stages=None, upstream=True):
+        """Build the task DAG for the given plays and stages.
+
+        Parameters
+        ----------
+        plays : list
+            Names of the plays to run the per-play stages for.
+
+        stages : None or list
+            Names of the stages to run (default: all).
+
+        upstream : bool
+            Whether to also run the stages required by the selected ones.
+
+        Returns
+        -------
+        OrderedDict
+            Dictionary mapping (stage, play) tasks in DAG order to the
+            tasks they depend on; play is None for corpus stages.
+        """
+        tasks = OrderedDict()
+        by_stage = {}
+        for name in self.get_stages(stages, upstream):
+            stage = self.stages[name]
+            by_stage[name] = (
+                [(name, play) for play in plays] if stage.per_play else [(name, None)]
+            )
+            for task in by_stage[name]:
+                tasks[task] = [
+                    dependency
+                    for required in stage.requires
+                    if required in by_stage
+                    for dependency in by_stage[required]
+                    if task[1] is None
+                    or dependency[1] is None
+                    or dependency[1] == task[1]
+                ]
+        return tasks
+
+    def missing_inputs(self, task):
+        """Inputs of a task that do not exist."""
+        stage, play = task
+        return [
+            file for file in self.stages[stage].inputs(play) if not os.path.exists(file)
+        ]
+
+    def get_staleness(self, task):
+        """Reason why a task is stale, or None if it is fresh."""
+        stage, play = task
+        outputs = self.stages[stage].outputs(play)
+        missing = [file for file in outputs if not os.path.exists(file)]
+        if missing:
+            return f"missing {os.path.relpath(missing[0])}"
+        inputs = [
+            file for file in self.stages[stage].inputs(play) if os.path.exists(file)
+        ]
+        recorded = self.state.get(_task_key(task))
+        if recorded is not None:
+            return None if recorded == _fingerprint(inputs) else "changed inputs"
+        if not outputs:
+            return "never ran"
+        if inputs and max(map(os.path.getmtime, inputs)) > min(
+            map(os.path.getmtime, outputs)
+        ):
+            return "outputs older than inputs"
+        return None
+
+    def keeps_outputs(self, task, tasks):
+        """Whether the outputs of a task read by its dependents in `tasks`
+        (all outputs if none) exist, so that the task can be skipped if its
+        inputs are missing, e.g., for plays with only preprocessed data."""
+        stage, play = task
+        outputs = self.stages[stage].outputs(play)
+        read = {
+            file
+            for other, dependencies in tasks.items()
+            if task in dependencies
+            for file in self.stages[other[0]].inputs(other[1])
+        }
+        if read:
+            outputs = [file for file in outputs if file in read]
+        return bool(outputs) and all(map(os.path.exists, outputs))
+
+    def _record(self, task):
+        stage, play = task
+        inputs = self.stages[stage].inputs(play)
+        self.state[_task_key(task)] = _fingerprint(inputs)
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, "w") as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+
+    def get_status(self, plays, stages=None, upstream=True, force=False):
+        """Predict which tasks a run would execute, without running any.
+
+        Returns an OrderedDict mapping the tasks of `get_tasks` to the
+        reason they would run, or None if they are fresh.
+        """
+        status = OrderedDict()
+        tasks = self.get_tasks(plays, stages, upstream)
+        for task, dependencies in tasks.items():
+            missing = self.missing_inputs(task)
+            if missing:
+                reason = (
+                    None
+                    if self.keeps_outputs(task, tasks)
+                    else f"missing input {os.path.relpath(missing[0])}"
+                )
+            else:
+                reason = "forced" if force else self.get_staleness(task)
+            if reason is None and any(
+                status[dependency] for dependency in dependencies
+            ):
+                reason = "stale dependencies"
+            status[task] = reason
+        return status
+
+    def run(self, plays, stages=None, upstream=True, processes=1, force=False):
+        """Run the stale tasks of the DAG, in parallel where dependencies permit.
+
+        A task starts once all its dependencies are done; whether it is
+        stale is decided at that point, i.e., after its upstream tasks
+        have (re)written their outputs. Tasks depending on failed tasks
+        are not run. Tasks with missing inputs fail, unless their outputs
+        can be used as they are (see `keeps_outputs`), in which case they
+        count as fresh, even if forced.
+
+        Parameters
+        ----------
+        plays, stages, upstream
+            As for `get_tasks`.
+
+        processes : int
+            Number of worker processes shared by all stages; tasks run
+            in-process if 1.
+
+        force : bool
+            Whether to run fresh tasks too.
+
+        Returns
+        -------
+        OrderedDict
+            Dictionary mapping tasks to RAN, FRESH, FAILED, or BLOCKED.
+        """
+        tasks = self.get_tasks(plays, stages, upstream)
+        status = OrderedDict((task, None) for task in tasks)
+        done = Queue()
+        pool = Pool(processes) if processes > 1 else None
+        n_running = 0
+        try:
+            while True:
+                for task, dependencies in tasks.items():
+                    if status[task] is not None or any(
+                        status[dependency] in [None, "running"]
+                        for dependency in dependencies
+                    ):
+                        continue
+                    if any(
+                        status[dependency] in [FAILED, BLOCKED]
+                        for dependency in dependencies
+                    ):
+                        status[task] = BLOCKED
+                        print(f"[{_task_key(task)}] blocked by failed dependencies")
+                        continue
+                    missing = self.missing_inputs(task)
+                    if missing:
+                        if self.keeps_outputs(task, tasks):
+                            status[task] = FRESH
+                            print(
+                                f"[{_task_key(task)}] missing input {missing[0]}, "
+                                "keeping its outputs"
+                            )
+                        else:
+                            status[task] = FAILED
+                            print(f"[{_task_key(task)}] missing input {missing[0]}")
+                        continue
+                    reason = "forced" if force else self.get_staleness(task)
+                    if reason is None:
+                        status[task] = FRESH
+                        continue
+                    print(f"[{_task_key(task)}] running ({reason})")
+                    status[task] = "running"
+                    arguments = (self.stages[task[0]].action, *task, force)
+                    if pool is None:
+                        try:
+                            _run_task(*arguments)
+                            done.put((task, None))
+                        except Exception:
+                            done.put((task, traceback.format_exc()))
+                    else:
+                        pool.apply_async(
+                            _run_task,
+                            arguments,
+                            callback=lambda _, task=task: done.put((task, None)),
+                            error_callback=lambda e, task=task: done.put(
+                                (task, f"{type(e).__name__}: {e}")
+                            ),
+                        )
+                    n_running += 1
+                if not n_running:
+                    break
+                task, error = done.get()
+                n_running -= 1
+                if error is None:
+                    status[task] = RAN
+                    self._record(task)
+                else:
+                    status[task] = FAILED
+                    print(f"[{_task_key(task)}] failed\n{error}")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return status
+
+
+def get_plays():
+    """Names of the plays in the raw data or the preprocessed data."""
+    raw = [
+        get_filename_base(file, full=False) for file in glob(f"{RAWDATA_PATH}/*.xml")
+    ]
+    preprocessed = [
+        get_filename_base(file, full=True).split(".")[0]
+        for file in glob(f"{DATA_PATH}/*.agg.csv")
+    ]
+    return sorted(set(raw) | set(preprocessed))
+
+
+def _preprocessed(play, suffixes=PREPROCESSED_SUFFIXES):
+    return [f"{DATA_PATH}/{play}.{suffix}" for suffix in suffixes]
+
+
+def _graph_files(play, suffixes):
+    return [f"{GRAPHDATA_PATH}/{play}_{suffix}.csv" for suffix in suffixes]
+
+
+# The actions import the scripts they run on demand, which keeps the command
+# line interface light.
+def preprocess(play, force=False):
+    from hyperbard.run_preprocessing import handle_file
+
+    os.makedirs(DATA_PATH, exist_ok=True)
+    handle_file(f"{RAWDATA_PATH}/{play}{RAW_SUFFIX}", force=True)
+
+
+def representations(play, force=False):
+    from hyperbard.create_graph_representations import handle_file
+
+    os.makedirs(GRAPHDATA_PATH, exist_ok=True)
+    handle_file(f"{DATA_PATH}/{play}.agg.csv", delta=not force)
+
+
+def hypergraph_representations(play, force=False):
+    from hyperbard.create_hypergraph_representations import handle_file
+
+    os.makedirs(GRAPHDATA_PATH, exist_ok=True)
+    handle_file(f"{DATA_PATH}/{play}.agg.csv", delta=not force)
+
+
+def rankings(play, force=False):
+    from hyperbard import plot_graph_rankings, plot_hypergraph_rankings
+    from hyperbard.plotting_utils import set_rcParams
+
+    os.makedirs(GRAPHICS_PATH, exist_ok=True)
+    os.makedirs(RANKINGDATA_PATH, exist_ok=True)
+    set_rcParams(29)
+    plot_graph_rankings.handle_play(play)
+    set_rcParams()
+    plot_hypergraph_rankings.handle_play(play)
+
+
+def statistics(play=None, force=False):
+    from hyperbard.raw_summary_statistics import create_raw_summary_statistics
+
+    create_raw_summary_statistics()
+
+
+def plots(play=None, force=False):
+    from hyperbard.plot_rank_correlations import plot_rank_correlations
+    from hyperbard.plotting_utils import set_rcParams
+
+    os.makedirs(PAPERGRAPHICS_PATH, exist_ok=True)
+    set_rcParams(26)
+    plot_rank_correlations()
+    for module in ["hyperbard.plot_toy", "hyperbard.plot_romeo"]:
+        runpy.run_module(module, run_name="__main__")
+
+
+STAGES = [
+    Stage(
+        "preprocess",
+        [],
+        preprocess,
+        lambda play: [f"{RAWDATA_PATH}/{play}{RAW_SUFFIX}"],
+        _preprocessed,
+    ),
+    Stage(
+        "representations",
+        ["preprocess"],
+        representations,
+        lambda play: _preprocessed(play, ["agg.csv"]),
+        lambda play: _graph_files(play, GRAPH_TABLES),
+    ),
+    Stage(
+        "hypergraph_representations",
+        ["preprocess"],
+        hypergraph_representations,
+        lambda play: _preprocessed(play, ["agg.csv"]),
+        lambda play: _graph_files(play, HYPERGRAPH_TABLES),
+    ),
+    Stage(
+        "rankings",
+        ["representations", "hypergraph_representations"],
+        rankings,
+        lambda play: _graph_files(play, GRAPH_TABLES + HYPERGRAPH_TABLES),
+        lambda play: [
+            f"{RANKINGDATA_PATH}/{play}_ranking.csv",
+            f"{GRAPHICS_PATH}/{play}_ranking_parallel_coordinates.pdf",
+            f"{GRAPHICS_PATH}/{play}_hg_ranking_parallel_coordinates.pdf",
+        ],
+    ),
+    Stage(
+        "statistics",
+        ["preprocess"],
+        statistics,
+        lambda play: sorted(glob(f"{DATA_PATH}/*.agg.csv"))
+        + [f"{META_PATH}/playtypes.csv"],
+        lambda play: [f"{META_PATH}/summary_statistics_raw.csv"],
+        per_play=False,
+    ),
+    Stage(
+        "plots",
+        ["representations", "hypergraph_representations", "rankings"],
+        plots,
+        lambda play: sorted(glob(f"{RANKINGDATA_PATH}/*_ranking.csv"))
+        + _preprocessed("romeo-and-juliet", ["agg.csv"])
+        + _graph_files("romeo-and-juliet", GRAPH_TABLES + HYPERGRAPH_TABLES),
+        lambda play: [f"{PAPERGRAPHICS_PATH}/{file}" for file in PLOT_FILES],
+        per_play=False,
+    ),
+]
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="hyperbard", description="Run the hyperbard pipeline."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help in [
+        ("run", "Run the stale tasks of the selected stages and plays"),
+        ("status", "Show which tasks are stale, without running them"),
+    ]:
+        subparser = subparsers.add_parser(command, help=help)
+        subparser.add_argument(
+            "-s",
+            "--stages",
+            nargs="+",
+            choices=[stage.name for stage in STAGES],
+            help="Stages to run, together with the stages they require (default: all)",
+        )
+        subparser.add_argument(
+            "-p", "--plays", nargs="+", help="Plays to run (default: all)"
+        )
+        subparser.add_argument(
+            "--only",
+            action="store_true",
+            help="If set, does not run the stages required by the selected stages",
+        )
+        subparser.add_argument(
+            "-f", "--force", action="store_true", help="If set, runs fresh tasks too"
+        )
+    run_parser = subparsers.choices["run"]
+    run_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=max(1, cpu_count() - 3),
+        help="Number of worker processes shared by all stages",
+    )
+    add_profiler_arguments(run_parser)
+    subparsers.add_parser("stages", help="Show the stages and their requirements")
+    return parser
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    pipeline = Pipeline(STAGES)
+    if args.command == "stages":
+        for stage in pipeline.stages.values():
+            scope = "per play" if stage.per_play else "corpus"
+            print(f"{stage.name} ({scope}) <- {', '.join(stage.requires) or '-'}")
+        return
+    plays = get_plays()
+    if args.plays is not None:
+        unknown = sorted(set(args.plays) - set(plays))
+        if unknown:
+            parser.error(f"unknown plays {unknown}, choose from {plays}")
+        plays = args.plays
+    if args.command == "status":
+        status = pipeline.get_status(plays, args.stages, not args.only, args.force)
+        for task, reason in status.items():
+            print(f"{_task_key(task)}: {reason or 'fresh'}")
+        return
+    configure_profiler(args)
+    with run("pipeline", stages=args.stages, plays=args.plays):
+        status = pipeline.run(
+            plays, args.stages, not args.only, processes=args.jobs, force=args.force
+        )
+    counts = {
+        outcome: sum(value == outcome for value in status.values())
+        for outcome in [RAN, FRESH, FAILED, BLOCKED]
+    }
+    print(", ".join(f"{count} {outcome}" for outcome, count in counts.items()))
+    if counts[FAILED] or counts[BLOCKED]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,11 @@ import pandas as pd
 import seaborn as sns
 from cycler import cycler
 from matplotlib import cm
-from statics import DATA_PATH, GRAPHICS_PATH, RANKINGDATA_PATH
 
 from hyperbard.graph_io import load_graph
 from hyperbard.plotting_utils import set_rcParams
 from hyperbard.ranking import get_character_ranking
+from hyperbard.statics import DATA_PATH, GRAPHICS_PATH, RANKINGDATA_PATH
 from hyperbard.track_time import timeit
 from hyperbard.utils import get_filename_base, remove_uppercase_prefixes
 
@@ -143,6 +143,20 @@ def compute_ranking_df(play):
     return df_ranking
 
 
+def handle_play(play):
+    df_ranking = compute_ranking_df(play)
+    plot_character_rankings(
+        df_ranking,
+        save_path=os.path.join(
+            f"{GRAPHICS_PATH}", f"{play}_ranking_parallel_coordinates.pdf"
+        ),
+    )
+
+    df_ranking.to_csv(
+        os.path.join(f"{RANKINGDATA_PATH}", f"{play}_ranking.csv"), index=False
+    )
+
+
 @timeit
 def plot_graph_rankings():
     plays = [
@@ -151,17 +165,7 @@ def plot_graph_rankings():
     ]
 
     for play in plays:
-        df_ranking = compute_ranking_df(play)
-        plot_character_rankings(
-            df_ranking,
-            save_path=os.path.join(
-                f"{GRAPHICS_PATH}", f"{play}_ranking_parallel_coordinates.pdf"
-            ),
-        )
-
-        df_ranking.to_csv(
-            os.path.join(f"{RANKINGDATA_PATH}", f"{play}_ranking.csv"), index=False
-        )
+        handle_play(play)
 
 
 if __name__ == "__main__":
@@ -4,12 +4,12 @@ import os
 from glob import glob
 
 import matplotlib.pyplot as plt
-from statics import DATA_PATH, GRAPHICS_PATH
 
 from hyperbard.graph_io import load_hypergraph
 from hyperbard.plot_graph_rankings import plot_character_rankings
 from hyperbard.plotting_utils import set_rcParams
 from hyperbard.ranking import get_character_ranking
+from hyperbard.statics import DATA_PATH, GRAPHICS_PATH
 from hyperbard.track_time import timeit
 from hyperbard.utils import get_filename_base, remove_uppercase_prefixes
 
@@ -17,7 +17,7 @@ from hyperbard.utils import get_filename_base, remove_uppercase_prefixes
 def compute_hypergraph_ranking_df(play):
     print(play)
 
-    hg_group_mw = load_hypergraph(play, "hg-group-mw")
+    hg_group_mw = load_hypergraph(play, "hg-group-mw", compact=True)
 
     sublevel = [
         {
@@ -6,19 +6,14 @@ import pandas as pd
 import seaborn as sns
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 
+from hyperbard.correlation import get_file_correlations
 from hyperbard.plotting_utils import set_rcParams
 from hyperbard.statics import PAPERGRAPHICS_PATH, RANKINGDATA_PATH
 from hyperbard.track_time import timeit
 
 
-def get_correlation_dfs(ranking_files):
-    dfs = dict()
-    corrs = dict()
-    for file in ranking_files:
-        filename = file.split("/")[-1].split("_")[0]
-        dfs[filename] = pd.read_csv(file, index_col=0)
-        corrs[filename] = dfs[filename].corr()
-    return corrs
+def get_correlation_dfs(ranking_files, method="pearson"):
+    return get_file_correlations(ranking_files, method=method)
 
 
 def get_average_correlation(corrs):
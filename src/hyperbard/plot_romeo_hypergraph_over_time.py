@@ -4,55 +4,50 @@ import pandas as pd
 import seaborn as sns
 
 from hyperbard.plotting_utils import get_character_color, save_pgf_fig
-from hyperbard.statics import GRAPHDATA_PATH, PAPERGRAPHICS_PATH
+from hyperbard.statics import DATA_PATH, PAPERGRAPHICS_PATH
+from hyperbard.temporal import get_prefix_sum_index
 from hyperbard.utils import get_name_from_identifier
 
 
-def plot_romeo_hypergraph_over_time(selected_labels, font_size):
-    hg_speech_mwd = pd.read_csv(
-        f"{GRAPHDATA_PATH}/romeo-and-juliet_hg-speech-mwd.edges.csv"
-    )
-    hg_speech_mwd.speaker = hg_speech_mwd.speaker.map(
-        lambda x: [
-            y
-            for y in map(get_name_from_identifier, x.split())
-            if not y.isupper() and not y.startswith("SERVANT")
-        ]
-    )
-    hg_speech_mwd.onstage = hg_speech_mwd.onstage.map(
-        lambda x: [
-            y
-            for y in map(get_name_from_identifier, x.split())
-            if not y.isupper() and not y.startswith("SERVANT")
-        ]
-    )
-    hg_speech_mwd["n_lines_cumulative"] = hg_speech_mwd.n_lines.cumsum()
-    hg_speech_mwd_exploded_speaker = hg_speech_mwd.explode("speaker")
-    speaker_df = pd.DataFrame(
-        index=sorted({elem for sublist in hg_speech_mwd.speaker for elem in sublist}),
-        columns=hg_speech_mwd.n_lines_cumulative,
-    )
-    for line in hg_speech_mwd.n_lines_cumulative:
-        queried = (
-            hg_speech_mwd_exploded_speaker.query("n_lines_cumulative <= @line")
-            .groupby("speaker")
-            .agg(dict(n_lines=sum))
-        )
-        for idx, n_lines in queried.n_lines.items():
-            speaker_df.at[idx, line] = n_lines / line
-    transformed_df = speaker_df.T[
-        [x for x in speaker_df.index if x != "Chorus"]
-    ].fillna(0)
+def get_speaking_fractions(df, excluded_labels=()):
+    """
+    Compute the fraction of lines spoken by each named character after every row of a play.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param excluded_labels: character names to leave out
+    :return: pd.DataFrame indexed by the cumulative number of lines, with one column per name
+    """
+    index = get_prefix_sum_index(df)
+    n_lines = index.totals.n_lines.values[1:]
+    spoken = index.trajectory("n_lines_speaker")
+    spoken.index = n_lines
+    names = spoken.columns.map(get_name_from_identifier)
+    keep = [
+        not name.isupper()
+        and not name.startswith("SERVANT")
+        and name not in excluded_labels
+        for name in names
+    ]
+    spoken = spoken.loc[:, keep].groupby(names[keep], axis=1).sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fractions = spoken.div(n_lines, axis=0)
+    return fractions[n_lines > 0]
+
+
+def plot_hypergraph_over_time(
+    play, selected_labels, font_size, excluded_labels=(), ymax=0.25
+):
+    df = pd.read_csv(f"{DATA_PATH}/{play}.agg.csv")
+    transformed_df = get_speaking_fractions(df, excluded_labels)
+    index = get_prefix_sum_index(df)
+    act_ends = np.flatnonzero(np.diff(index.rows.act.values)) + 1
 
     fig, ax = plt.subplots(1, 1, figsize=(16, 7))
     ax.vlines(
-        x=[
-            hg_speech_mwd.query("act == @act").n_lines_cumulative.max()
-            for act in range(0, 5)
-        ],
+        x=index.totals.n_lines.values[act_ends],
         lw=1,
         ymin=0,
-        ymax=0.25,
+        ymax=ymax,
         colors="k",
         linestyles="--",
     )
@@ -74,13 +69,13 @@ def plot_romeo_hypergraph_over_time(selected_labels, font_size):
     sns.despine(offset=0, trim=True)
     handles, labels = ax.get_legend_handles_labels()
     plt.xticks(
-        range(0, hg_speech_mwd.n_lines_cumulative.max(), 500),
+        range(0, int(index.totals.n_lines.max()), 500),
         fontsize=font_size,
     )
-    plt.yticks(np.arange(0, 0.26, 0.05), fontsize=font_size)
+    plt.yticks(np.arange(0, ymax + 0.01, 0.05), fontsize=font_size)
     legend = ax.legend(
-        handles=handles[-5:],
-        labels=labels[-5:],
+        handles=handles[-len(selected_labels) :],
+        labels=labels[-len(selected_labels) :],
         loc=(1.001, 0.535),
         fontsize=font_size,
     )
@@ -91,7 +86,16 @@ def plot_romeo_hypergraph_over_time(selected_labels, font_size):
     plt.xlabel("Number of lines spoken", fontsize=font_size, labelpad=9)
     plt.ylabel("Fraction of lines spoken", fontsize=font_size, labelpad=15)
     save_pgf_fig(
-        f"{PAPERGRAPHICS_PATH}/romeo_and_juliet_hg-speech-over-time.pdf",
+        f"{PAPERGRAPHICS_PATH}/{play.replace('-', '_')}_hg-speech-over-time.pdf",
         axis_off=False,
         tight=True,
     )
+
+
+def plot_romeo_hypergraph_over_time(selected_labels, font_size):
+    plot_hypergraph_over_time(
+        "romeo-and-juliet",
+        selected_labels,
+        font_size,
+        excluded_labels=("Chorus",),
+    )
@@ -2,11 +2,11 @@ import hypernetx as hnx
 import matplotlib.patheffects as PathEffects
 import networkx as nx
 import pandas as pd
-from graph_io import load_hypergraph
 from matplotlib import cm
 from matplotlib import pyplot as plt
 from matplotlib.text import Annotation
 
+from hyperbard.graph_io import load_hypergraph
 from hyperbard.plotting_utils import save_pgf_fig
 from hyperbard.statics import GRAPHDATA_PATH, PAPERGRAPHICS_PATH
 from hyperbard.utils import get_name_from_identifier
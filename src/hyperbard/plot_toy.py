@@ -6,8 +6,8 @@ import matplotlib.pyplot as plt
 import networkx as nx
 from matplotlib import cm
 from matplotlib.text import Annotation
-from plotting_utils import save_pgf_fig, set_rcParams
 
+from hyperbard.plotting_utils import save_pgf_fig, set_rcParams
 from hyperbard.statics import PAPERGRAPHICS_PATH
 
 
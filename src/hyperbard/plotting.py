@@ -7,6 +7,8 @@ import numpy as np
 import seaborn as sns
 from cycler import cycler
 
+from hyperbard.correlation import get_correlations
+from hyperbard.graph_io import hypergraph_from_edges
 from hyperbard.ranking import get_character_ranking_df
 from hyperbard.utils import (
     character_string_to_sorted_list,
@@ -24,16 +26,7 @@ from hyperbard.statics import DATA_PATH, GRAPHICS_PATH
 
 
 def get_hypergraph(df_grouped):
-    H = hnx.Hypergraph()
-    for idx, row in df_grouped.iterrows():
-        H.add_edge(
-            hnx.Entity(
-                idx,
-                row["onstage"],
-                **{k: v for k, v in row.items() if k != "onstage"},
-            )
-        )
-    return H
+    return hypergraph_from_edges(df_grouped)
 
 
 def plot_character_rankings(df, save_path=None):
@@ -74,31 +67,27 @@ def plot_character_rankings(df, save_path=None):
 
 def plot_correlation_matrix(df, save_path=None):
     character_ranking_df = get_character_ranking_df(df)
-    character_ranking_df_indexed = character_ranking_df.set_index("index")
-    vmin = min(
-        character_ranking_df_indexed.corr("spearman").min().min(),
-        character_ranking_df_indexed.corr("kendall").min().min(),
+    kendall, spearman = (
+        get_correlations({"play": character_ranking_df}, method)["play"]
+        for method in ["kendall", "spearman"]
     )
+    vmin = min(spearman.min().min(), kendall.min().min())
     sns.heatmap(
-        character_ranking_df_indexed.corr("kendall"),
+        kendall,
         square=True,
         cmap=cm.Reds,
         cbar_kws=dict(shrink=0.8),
-        mask=np.tril(character_ranking_df_indexed.corr("kendall").values, k=0).astype(
-            bool
-        ),
+        mask=np.tril(kendall.values, k=0).astype(bool),
         vmin=vmin,
         vmax=1.0,
         cbar=False,
     )
     sns.heatmap(
-        character_ranking_df_indexed.corr("spearman"),
+        spearman,
         square=True,
         cmap=cm.Reds,
         cbar_kws=dict(shrink=0.8),
-        mask=np.triu(character_ranking_df_indexed.corr("spearman").values, k=0).astype(
-            bool
-        ),
+        mask=np.triu(spearman.values, k=0).astype(bool),
         vmin=vmin,
         vmax=1.0,
     )
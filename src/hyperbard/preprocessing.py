@@ -1,5 +1,7 @@
+from ast import literal_eval
 from typing import List, Union
 
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 from bs4.element import NavigableString, PageElement, Tag
@@ -10,6 +12,8 @@ from hyperbard.utils import (
     string_to_set,
 )
 
+ONSTAGE_POLICIES = ["scene", "act", "none", "speaker"]
+
 
 def get_soup(file: str, parser: str = "lxml-xml") -> BeautifulSoup:
     """
@@ -218,39 +222,89 @@ def set_onstage(df: pd.DataFrame) -> None:
       but the problematic instances are very rare. We limit the impact of errors introduced
       by this modeling choice by also ensuring that the speaker is always onstage.
 
+    Other flushing policies can be compared with get_onstage_variants.
+
     :param df: pd.DataFrame created with get_xml_df, with act and scene already annotated
     :return: None
     """
     df["who"] = df.who.map(string_to_set)
-    df["onstage"] = [set()] * len(df)
-    for idx, row in df.iterrows():
-        prev_onstage = df.at[idx - 1, "onstage"] if idx > 0 else set()
-        prev_act = df.at[idx - 1, "act"] if idx > 0 else 0
-        prev_scene = df.at[idx - 1, "scene"] if idx > 0 else 0
-        if is_new_act(row, prev_act) or is_new_scene(row, prev_scene):
-            prev_onstage = set()
-        if is_entrance(row) or has_speaker(row):
-            df.at[idx, "onstage"] = prev_onstage | row["who"]
-        elif is_exit(row):
-            df.at[idx, "onstage"] = prev_onstage - row["who"]
-        else:
-            df.at[idx, "onstage"] = prev_onstage
+    df["onstage"] = get_onstage_variants(df, ["scene"])["scene"]
     assert not any(
         pd.isna(x) for x in df["onstage"]
     ), f"Found unexpected nan values in 'onstage' column!"
-    df.onstage = df.onstage.apply(sort_join_strings)
+
+
+def _who_set(who):
+    """Normalize "who" values, which are sets after set_onstage but strings
+    (e.g., "{'#Romeo_RJ'}") when read back from a .raw.csv file."""
+    if isinstance(who, str):
+        return set(literal_eval(who)) if who.startswith("{") else string_to_set(who)
+    return who
+
+
+def get_onstage_variants(
+    df: pd.DataFrame, policies: List[str] = ONSTAGE_POLICIES
+) -> dict:
+    """
+    Compute who is onstage under several policies in a single pass over the elements of a play.
+
+    Policies (see set_onstage for the rationale of flushing):
+
+    - "scene": flush characters when a new act or scene starts (as in set_onstage)
+    - "act": flush characters only when a new act starts
+    - "none": never flush characters, relying on the stage directions only
+    - "speaker": only the speaker(s) of the current speech are onstage
+
+    :param df: pd.DataFrame created with get_xml_df, with act and scene already annotated,
+        or as loaded from a .raw.csv file
+    :param policies: policies to evaluate, subset of ONSTAGE_POLICIES
+    :return: dictionary mapping policies to lists of onstage strings aligned with df
+    """
+    for policy in policies:
+        if policy not in ONSTAGE_POLICIES:
+            raise ValueError(f"policy={policy}, must be in {ONSTAGE_POLICIES}!")
+    states = {policy: set() for policy in policies}
+    strings = {policy: "" for policy in policies}
+    variants = {policy: [] for policy in policies}
+    prev_act, prev_scene = 0, 0
+    for tag, type_, who, act, scene in zip(
+        df.tag.values,
+        df.type.values,
+        df.who.map(_who_set).values,
+        df.act.values,
+        df.scene.values,
+    ):
+        new_act = act != prev_act
+        new_scene = new_act or scene != prev_scene
+        entrance = tag == "stage" and type_ == "entrance"
+        exit_ = tag == "stage" and type_ == "exit"
+        speech = tag == "sp" and not pd.isna(who)
+        for policy in policies:
+            onstage = states[policy]
+            changed = False
+            if (new_act and policy != "none") or (
+                new_scene and policy in ["scene", "speaker"]
+            ):
+                onstage, changed = set(), bool(onstage)
+            if policy == "speaker":
+                if speech:
+                    onstage, changed = set(who), True
+            elif entrance or speech:
+                onstage, changed = onstage | who, True
+            elif exit_:
+                onstage, changed = onstage - who, True
+            if changed:
+                states[policy] = onstage
+                strings[policy] = sort_join_strings(onstage)
+            variants[policy].append(strings[policy])
+        prev_act, prev_scene = act, scene
+    return variants
 
 
 def set_stagegroup(df: pd.DataFrame) -> None:
-    df["stagegroup_raw"] = float("nan")
-    stage_n = 0
-    for idx1, (os1, os2) in enumerate(zip(df.onstage[:-1], df.shift(-1).onstage)):
-        if idx1 == 0:
-            df.at[idx1, "stagegroup_raw"] = stage_n
-        if os1 != os2:
-            stage_n += 1
-        df.at[idx1 + 1, "stagegroup_raw"] = stage_n
-    df.stagegroup_raw = df.stagegroup_raw.astype(int)
+    onstage = df.onstage.values
+    changes = onstage[1:] != onstage[:-1]
+    df["stagegroup_raw"] = np.r_[0, np.cumsum(changes)].astype(int)
 
 
 def get_who_attributes(elem: Tag) -> Union[str, float]:
@@ -270,9 +324,13 @@ def set_speaker(df: pd.DataFrame, body: Tag) -> None:
         map(get_who_attributes, speech_tags),
         map(get_descendants_ids, speech_tags),
     )
-    df["speaker"] = float("nan")
-    for speaker, descendants in speaker_helper:
-        df.loc[df["xml:id"].map(lambda x: x in descendants), "speaker"] = speaker
+    # Later speeches take precedence, as when assigning speech by speech.
+    speakers = {
+        xml_id: speaker
+        for speaker, descendants in speaker_helper
+        for xml_id in descendants
+    }
+    df["speaker"] = df["xml:id"].map(lambda x: speakers.get(x, float("nan")))
     df.loc[df.query("tag == 'sp'").index, "speaker"] = df.query("tag == 'sp'")[
         "who"
     ].map(lambda val: sort_join_strings(val) if not pd.isna(val) else val)
@@ -393,3 +451,21 @@ def get_agg_xml_df(df: pd.DataFrame) -> pd.DataFrame:
     set_setting(aggregated)
     aggregated_grouped = get_grouped_df(aggregated)
     return aggregated_grouped
+
+
+def get_agg_xml_dfs(df: pd.DataFrame, policies: List[str] = ONSTAGE_POLICIES) -> dict:
+    """
+    Produce the aggregated dataframes of a play for several onstage policies,
+    computing all onstage variants in one pass (see get_onstage_variants).
+
+    :param df: pd.DataFrame output by get_raw_xml_df, or as loaded from a .raw.csv file
+    :param policies: policies to evaluate, subset of ONSTAGE_POLICIES
+    :return: dictionary mapping policies to pd.DataFrame objects of the shape of the *.agg.csv files
+    """
+    columns = ["tag", "n", "xml:id", "act", "scene", "speaker"]
+    agg_dfs = {}
+    for policy, onstage in get_onstage_variants(df, policies).items():
+        policy_df = df[columns].assign(onstage=onstage)
+        set_stagegroup(policy_df)
+        agg_dfs[policy] = get_agg_xml_df(policy_df)
+    return agg_dfs
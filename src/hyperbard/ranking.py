@@ -2,16 +2,22 @@
 
 Notice that while other metrics, such as different centrality measures,
 would be possible, we are focusing on *degree* statistics for now since
-they are readily interpretable for both graphs and hypergraphs.
+they are readily interpretable for both graphs and hypergraphs. Spectral
+centralities (see `hyperbard.centrality`) can be requested per
+representation via its "centrality" key in `get_character_ranking`.
 """
 
 from collections import OrderedDict, defaultdict
+from types import MappingProxyType
 
 import hypernetx as hnx
 import networkx as nx
 import numpy as np
 import pandas as pd
 
+from hyperbard.centrality import graph_centrality
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.graph_io import hypergraph_from_edges
 from hyperbard.graph_representations import (
     get_bipartite_graph,
     get_count_weighted_graph,
@@ -19,24 +25,15 @@ from hyperbard.graph_representations import (
 )
 from hyperbard.hypergraph_representations import (
     get_hypergraph_edges,
-    get_hypergraph_nodes,
-    get_multi_directed_hypergraph_edges,
+    get_membership_table,
     get_weighted_directed_hypergraph_edges,
 )
+from hyperbard.incidence import get_play_incidence
+from hyperbard.utils import get_frame_cache
 
 
-# TODO: WIP
 def from_edges(df_grouped):
-    H = hnx.Hypergraph()
-    for idx, row in df_grouped.iterrows():
-        H.add_edge(
-            hnx.Entity(
-                idx,
-                row["onstage"],
-                **{k: v for k, v in row.items() if k != "onstage"},
-            )
-        )
-    return H
+    return hypergraph_from_edges(df_grouped)
 
 
 def s_degree(H, s=1, weight=None, superlevel=True):
@@ -48,7 +45,7 @@ def s_degree(H, s=1, weight=None, superlevel=True):
 
     Parameters
     ----------
-    H : hnx.Hypergraph
+    H : hnx.Hypergraph or CompactHypergraph
         Hypergraph
 
     s : int
@@ -68,22 +65,161 @@ def s_degree(H, s=1, weight=None, superlevel=True):
     dict
         Dictionary with nodes as keys and values as (weighted) degrees.
     """
+    if isinstance(H, CompactHypergraph):
+        return H.s_degree(s=s, weight=weight, superlevel=superlevel)
+
     values = {}
     for node in H.nodes:
-        if weight is not None:
-            # Get all edges of size at least `s` (if `superlevel` is
-            # set) in which the specific node participates.
-            memberships = H.nodes[node].memberships
-            if superlevel:
-                edges = set(e for e in memberships if len(H.edges[e]) >= s)
-            else:
-                edges = set(e for e in memberships if len(H.edges[e]) <= s)
+        # Get all edges of size at least `s` (if `superlevel` is
+        # set) in which the specific node participates.
+        memberships = H.nodes[node].memberships
+        if superlevel:
+            edges = set(e for e in memberships if len(H.edges[e]) >= s)
+        else:
+            edges = set(e for e in memberships if len(H.edges[e]) <= s)
 
+        if weight is not None:
             values[node] = sum(getattr(H.edges[e], weight) for e in edges)
+        else:
+            values[node] = len(edges)
 
     return values
 
 
+def s_degrees(H, weight=None, s_values=None):
+    """Calculate degree values of a hypergraph for many thresholds at once.
+
+    Instead of walking all memberships once per threshold, this function
+    builds a (node x edge cardinality) histogram of edge weights once and
+    derives the degrees for every threshold `s` and both directions via
+    prefix sums (`superlevel=False`) and suffix sums (`superlevel=True`).
+
+    Parameters
+    ----------
+    H : hnx.Hypergraph or CompactHypergraph
+        Hypergraph
+
+    weight : str or `None`
+        If set, queries the specific edge attribute to use as a weight
+        for the degree calculation. Otherwise, edges are counted.
+
+    s_values : None or iterable of int
+        Connectivity thresholds to report. Defaults to all thresholds
+        from 1 up to the maximum edge cardinality.
+
+    Returns
+    -------
+    dict
+        Dictionary with `(s, superlevel)` tuples as keys and dictionaries
+        with nodes as keys and (weighted) degrees as values as values,
+        i.e., `s_degrees(H)[(s, superlevel)] == s_degree(H, s=s,
+        superlevel=superlevel)`.
+    """
+    if not isinstance(H, CompactHypergraph):
+        H = CompactHypergraph.from_hnx(H)
+    histogram = H.size_histogram(weight)
+    max_size = histogram.shape[1] - 1
+    zeros = np.zeros((histogram.shape[0], 1), dtype=histogram.dtype)
+    # sublevel[:, s + 1] sums edges of cardinality <= s,
+    # superlevel[:, s] sums edges of cardinality >= s.
+    sublevel = np.hstack([zeros, np.cumsum(histogram, axis=1)])
+    superlevel = np.hstack([np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1], zeros])
+
+    if s_values is None:
+        s_values = range(1, max_size + 1)
+    degrees = {}
+    for s in s_values:
+        degrees[(s, False)] = dict(
+            zip(H.node_ids, sublevel[:, min(max(s, -1), max_size) + 1].tolist())
+        )
+        degrees[(s, True)] = dict(
+            zip(H.node_ids, superlevel[:, min(max(s, 0), max_size + 1)].tolist())
+        )
+    return degrees
+
+
+def directed_hypergraph_degrees(edges, weight=None):
+    """Calculate in- and out-degrees of a directed hypergraph.
+
+    The directed hypergraph is given by its edge table, as produced by
+    `get_multi_directed_hypergraph_edges` (hg-speech-mwd) or
+    `get_weighted_directed_hypergraph_edges` (hg-speech-wd): each edge
+    points from its speakers (tail) to the other characters onstage
+    (head). Hence, the out-degree of a character counts the edges in
+    which it speaks, and its in-degree counts the edges in which it is
+    onstage without speaking. All degrees are computed in one pass over
+    the membership table of the edges, without building graph objects.
+
+    Parameters
+    ----------
+    edges : pd.DataFrame
+        Edge table with whitespace-separated "speaker" and "onstage"
+        columns.
+
+    weight : None or str
+        If specified, sum the edge attribute named `weight` (e.g.,
+        "n_lines" or "n_tokens") instead of counting edges.
+
+    Returns
+    -------
+    pd.DataFrame
+        Data frame indexed by node with columns "in" and "out".
+    """
+    if weight is not None:
+        assert (
+            weight in edges.columns
+        ), f"Attribute '{weight}' is not an edge attribute! Edge attributes are: {list(edges.columns)}"
+    membership = get_membership_table(edges)
+    codes, nodes = pd.factorize(membership.node, sort=True)
+    keys = membership.row.values * len(nodes) + codes
+    is_speaker = membership.role.values == "speaker"
+    is_listener = ~is_speaker & ~np.isin(keys, keys[is_speaker])
+    if weight is None:
+        values = np.ones(len(membership), dtype=np.int64)
+    else:
+        values = edges[weight].values[membership.row.values]
+    degrees = {
+        degree_type: np.bincount(
+            codes[mask], weights=values[mask], minlength=len(nodes)
+        )
+        for degree_type, mask in [("in", is_listener), ("out", is_speaker)]
+    }
+    if np.issubdtype(values.dtype, np.integer):
+        degrees = {k: v.astype(np.int64) for k, v in degrees.items()}
+    return pd.DataFrame(degrees, index=pd.Index(nodes, name="node"))
+
+
+def directed_hypergraph_degree(edges, weight=None, degree_type=None):
+    """Calculate degree values of a directed hypergraph.
+
+    Parameters
+    ----------
+    edges : pd.DataFrame
+        Edge table of a directed hypergraph, see
+        `directed_hypergraph_degrees`.
+
+    weight : None or str
+        If specified, sum the edge attribute named `weight` instead of
+        counting edges.
+
+    degree_type : None or "in" or "out"
+        If None, return the sum of in- and out-degrees.
+
+    Returns
+    -------
+    dict
+        Dictionary with nodes as key and (weighted) degrees as values.
+    """
+    if degree_type not in [None, "in", "out"]:
+        raise ValueError(
+            f"degree_type={degree_type}, must be in {[None, 'in', 'out']}!"
+        )
+    degrees = directed_hypergraph_degrees(edges, weight=weight)
+    if degree_type is None:
+        return degrees.sum(axis=1).to_dict()
+    return degrees[degree_type].to_dict()
+
+
 def calculate_degree(G, weight=None, degree_type=None):
     """Calculate degree values of a graph.
 
@@ -145,9 +281,18 @@ def calculate_degree(G, weight=None, degree_type=None):
 
 
 def degree_wrapper(G, weight=None, degree_type=None, **kwargs):
-    """Wrapper function for degree calculation of (hyper)graphs."""
-    if isinstance(G, hnx.Hypergraph):
-        # TODO: Incorporate `degree_type` variable.
+    """Wrapper function for degree calculation of (hyper)graphs.
+
+    Directed hypergraphs are passed as edge tables (`pd.DataFrame`), see
+    `directed_hypergraph_degrees`.
+    """
+    if isinstance(G, pd.DataFrame):
+        return directed_hypergraph_degree(G, weight=weight, degree_type=degree_type)
+    elif isinstance(G, (hnx.Hypergraph, CompactHypergraph)):
+        if degree_type is not None:
+            raise ValueError(
+                f"degree_type={degree_type}, but undirected hypergraphs only support degree_type=None!"
+            )
         return s_degree(G, weight=weight, **kwargs)
     else:
         return calculate_degree(G, weight=weight, degree_type=degree_type)
@@ -169,7 +314,15 @@ def degree_ranking_with_equalities(G, weight=None, degree_type=None, **kwargs):
     degree: None or "in" or "out"
     output: list of tuples [({set of characters}, degree), ...], sorted by degree descending
     """
-    ranking_list = degree_ranking(G, weight, degree_type, **kwargs)
+    return ranking_with_equalities(degree_wrapper(G, weight, degree_type, **kwargs))
+
+
+def ranking_with_equalities(degrees):
+    """
+    degrees: dictionary with nodes as keys and degrees as values
+    output: list of tuples [({set of characters}, degree), ...], sorted by degree descending
+    """
+    ranking_list = sorted(degrees.items(), key=lambda tup: tup[-1], reverse=True)
     new_list = []
     for character, degree in ranking_list:
         if new_list and degree == new_list[-1][-1]:
@@ -190,83 +343,350 @@ def character_rank_dictionary(ranking):
     return rank_dict
 
 
-def get_character_ranking_df(df):
-    G = get_count_weighted_graph(df, groupby=["act", "scene"])
-    G2 = get_count_weighted_graph(df, groupby=["act", "scene", "stagegroup"])
-    mG = get_weighted_multigraph(df, groupby=["act", "scene"])
-    mG2 = get_weighted_multigraph(df, groupby=["act", "scene", "stagegroup"])
-    bG = get_bipartite_graph(df, groupby=["act", "scene"])
-    bG2 = get_bipartite_graph(df, groupby=["act", "scene", "stagegroup"])
-    bG3 = get_bipartite_graph(
-        df, groupby=["act", "scene", "stagegroup", "setting", "speaker"]
-    )
+def competition_ranks(values):
+    """Competition ("min") ranks of degrees in descending order along the
+    second to last axis of an array.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of shape (..., characters, representations); NaN marks
+        characters that are not part of a representation.
+
+    Returns
+    -------
+    np.ndarray
+        Float array of ranks of the same shape, NaN where `values` is NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    # Sorting the negated values puts NaN last in every column.
+    order = np.argsort(-values, axis=-2, kind="stable")
+    sorted_values = np.take_along_axis(values, order, axis=-2)
+    is_new_value = np.ones(sorted_values.shape, dtype=bool)
+    is_new_value[..., 1:, :] = sorted_values[..., 1:, :] != sorted_values[..., :-1, :]
+    positions = np.arange(1, values.shape[-2] + 1)[:, np.newaxis]
+    sorted_ranks = np.maximum.accumulate(
+        np.where(is_new_value, positions, 0), axis=-2
+    ).astype(float)
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=-2)
+    ranks[np.isnan(values)] = np.nan
+    return ranks
+
+
+def rank_degree_matrix(degrees):
+    """Rank characters by degree in every column of a degree matrix at once.
+
+    Ranks follow the same competition ("min") semantics as
+    `character_rank_dictionary` applied to `ranking_with_equalities`:
+    the highest degree has rank 1, characters with equal degrees share
+    the smallest rank of their group, and the next distinct degree skips
+    the ranks taken by the group.
+
+    Parameters
+    ----------
+    degrees : pd.DataFrame
+        Data frame indexed by character with one column of degrees per
+        representation; NaN marks characters that are not part of a
+        representation.
+
+    Returns
+    -------
+    pd.DataFrame
+        Data frame of ranks with the same index and columns, NaN where the
+        degree is NaN. Columns without NaN have integer dtype.
+    """
+    ranks = competition_ranks(degrees.to_numpy(dtype=float))
+    rank_df = pd.DataFrame(ranks, index=degrees.index, columns=degrees.columns)
+    complete = rank_df.columns[rank_df.notna().all().values]
+    return rank_df.astype({column: np.int64 for column in complete})
+
+
+CHARACTER_RANKING_COLUMNS = [
+    ("01_se-scene-b", "se-scene-b", None),
+    ("02_se-scene-w", "se-scene-w", None),
+    ("03_se-group-b", "se-group-b", None),
+    ("04_se-group-w", "se-group-w", None),
+    ("05_se-speech-wd_in", "se-speech-wd", "in"),
+    ("06_se-speech-wd_out", "se-speech-wd", "out"),
+    ("07_ce-scene-b", "ce-scene-b", None),
+    ("08_ce-scene-mb", "ce-scene-mb", None),
+    ("09_ce-scene-mw", "ce-scene-mw", None),
+    ("10_ce-group-b", "ce-group-b", None),
+    ("11_ce-group-mb", "ce-group-mb", None),
+    ("12_act_group-mw", "ce-group-mw", None),
+    ("13_hg-scene-mb", "hg-scene-mb", None),
+    ("14_hg-scene-mw", "hg-scene-mw", None),
+    ("15_hg-group-mb", "hg-group-mb", None),
+    ("16_hg-group-mw", "hg-group-mw", None),
+    ("17_hg-speech-wd_in", "hg-speech-wd", "in"),
+    ("18_hg-speech-wd_out", "hg-speech-wd", "out"),
+]
+
+
+def incidence_degrees(incidence, representation, degree_type=None, weight="n_lines"):
+    """Calculate character degrees in a representation from the canonical
+    incidence of a play.
+
+    Degrees are obtained from sparse products of the (characters x text
+    units) incidence matrices, without building the representation:
+
+    - se-{scene,group}-{b,w} and hg-{scene,group}-{mb,mw} count (b, mb)
+      or sum the weights of (w, mw) the text units a character is onstage
+      in;
+    - ce-{scene,group}-b counts the distinct characters a character
+      shares a text unit with;
+    - ce-{scene,group}-{mb,mw} count or sum the weights of the
+      co-occurrences, i.e., every text unit contributes its size minus one;
+    - {se,hg}-speech-wd sum the weights of the speech acts a character
+      listens to (in) or speaks in (out).
+
+    Parameters
+    ----------
+    incidence : PlayIncidence
+        Canonical incidence of a play, as returned by `get_play_incidence`.
+
+    representation : str
+        Representation name, such as "ce-scene-mw" or "hg-speech-wd".
+
+    degree_type : None or "in" or "out"
+        Only used for the speech act representations, where None yields
+        the sum of in- and out-degrees.
+
+    weight : str
+        Text unit attribute used as weight by the weighted representations.
+
+    Returns
+    -------
+    np.ndarray
+        Float array of degrees aligned with `incidence.characters`, NaN for
+        characters that are not nodes of the representation.
+    """
+    expansion, level, variant = representation.split("-")
+    if degree_type not in [None, "in", "out"]:
+        raise ValueError(
+            f"degree_type={degree_type}, must be in {[None, 'in', 'out']}!"
+        )
+    if expansion not in ["ce", "se", "hg"] or level not in incidence.levels:
+        raise ValueError(f"Unknown representation: {representation}!")
+    units = incidence[level]
+    onstage = units.onstage
+    present = np.asarray(onstage.sum(axis=1)).ravel() > 0
+    weights = units.weights(weight if "w" in variant else None)
+
+    if level == "speech":
+        if variant not in ["wd", "mwd"] or expansion == "ce":
+            raise ValueError(f"Unknown representation: {representation}!")
+        matrices = {"in": units.listener, "out": units.speaker}
+        if degree_type is None:
+            degrees = sum(matrices[t] @ weights for t in matrices)
+        else:
+            degrees = matrices[degree_type] @ weights
+    elif expansion == "ce" and variant == "b":
+        co_occurrences = (onstage @ onstage.T).tocsr()
+        co_occurrences.setdiag(0)
+        co_occurrences.eliminate_zeros()
+        degrees = np.diff(co_occurrences.indptr).astype(float)
+        present = degrees > 0
+    elif expansion == "ce" and variant in ["mb", "mw"]:
+        degrees = onstage @ ((units.sizes - 1) * weights)
+        # Characters that never share a text unit are not in the graph.
+        present = onstage @ (units.sizes - 1) > 0
+    elif variant in ["b", "w", "mb", "mw"]:
+        degrees = onstage @ weights
+    else:
+        raise ValueError(f"Unknown representation: {representation}!")
+    return np.where(present, degrees, np.nan)
+
+
+def get_degree_matrix(df, columns=CHARACTER_RANKING_COLUMNS, weight="n_lines"):
+    """Calculate the character degrees of many representations at once.
 
-    # TODO: Does *not* yet use the right weights.
-    hg_scene_mw = from_edges(get_hypergraph_edges(df, groupby=["act", "scene"])[0])
-    hg_group_mw = from_edges(
-        get_hypergraph_edges(df, groupby=["act", "scene", "stagegroup"])[0]
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Aggregated dataframe of a play, as loaded from an .agg.csv file.
+
+    columns : list
+        List of (column name, representation, degree_type) triples, see
+        `CHARACTER_RANKING_COLUMNS` and `incidence_degrees`.
+
+    weight : str
+        Text unit attribute used as weight by the weighted representations.
+
+    Returns
+    -------
+    pd.DataFrame
+        Data frame indexed by character with one column of degrees per
+        requested representation (NaN where a character is not a node).
+    """
+    incidence = get_play_incidence(df)
+    return pd.DataFrame(
+        np.column_stack(
+            [
+                incidence_degrees(incidence, representation, degree_type, weight)
+                for _, representation, degree_type in columns
+            ]
+        ),
+        index=incidence.characters,
+        columns=[name for name, _, _ in columns],
     )
-    hg_speech_mwd = from_edges(get_multi_directed_hypergraph_edges(df))
-    hg_speech_wd = from_edges(get_weighted_directed_hypergraph_edges(df))
-
-    ranks = OrderedDict(
-        {
-            "01_se-scene-b": character_rank_dictionary(
-                degree_ranking_with_equalities(bG)
-            ),
-            "02_se-scene-w": character_rank_dictionary(
-                degree_ranking_with_equalities(bG, weight="n_lines")
-            ),
-            "03_se-group-b": character_rank_dictionary(
-                degree_ranking_with_equalities(bG2)
-            ),
-            "04_se-group-w": character_rank_dictionary(
-                degree_ranking_with_equalities(bG2, weight="n_lines")
-            ),
-            "05_se-speech-wd_in": character_rank_dictionary(
-                degree_ranking_with_equalities(bG3, weight="n_lines", degree_type="in")
-            ),
-            "06_se-speech-wd_out": character_rank_dictionary(
-                degree_ranking_with_equalities(bG3, weight="n_lines", degree_type="out")
-            ),
-            "07_ce-scene-b": character_rank_dictionary(
-                degree_ranking_with_equalities(G)
-            ),
-            "08_ce-scene-mb": character_rank_dictionary(
-                degree_ranking_with_equalities(mG)
-            ),
-            "09_ce-scene-mw": character_rank_dictionary(
-                degree_ranking_with_equalities(mG, weight="n_lines")
-            ),
-            "10_ce-group-b": character_rank_dictionary(
-                degree_ranking_with_equalities(G2)
-            ),
-            "11_ce-group-mb": character_rank_dictionary(
-                degree_ranking_with_equalities(mG2)
-            ),
-            "12_act_group-mw": character_rank_dictionary(
-                degree_ranking_with_equalities(mG2, weight="n_lines")
-            ),
-            # "13_hg-scene-mb": character_rank_dictionary(
-            #    degree_ranking_with_equalities(hg_scene_mw)
-            # ),
-            # "14_hg-scene-mw": character_rank_dictionary(
-            #    degree_ranking_with_equalities(hg_scene_mw, weight="n_lines")
-            # ),
-            # "15_hg-group-mb": character_rank_dictionary(
-            #    degree_ranking_with_equalities(hg_group_mw)
-            # ),
-            # "16_hg-group-mw": character_rank_dictionary(
-            #    degree_ranking_with_equalities(hg_group_mw, weight="n_lines")
-            # ),
-        }
+
+
+def get_batched_character_ranking_df(df, columns=CHARACTER_RANKING_COLUMNS):
+    """Batched counterpart of `get_character_ranking_df`, ranking characters
+    by the degrees of `get_degree_matrix` instead of building every
+    representation."""
+    degrees = get_degree_matrix(df, columns=columns).rename_axis(None)
+    return rank_degree_matrix(degrees).sort_index()
+
+
+REPRESENTATION_BUILDERS = OrderedDict(
+    {
+        "ce-scene-w": lambda df: get_count_weighted_graph(df, groupby=["act", "scene"]),
+        "ce-group-w": lambda df: get_count_weighted_graph(
+            df, groupby=["act", "scene", "stagegroup"]
+        ),
+        "ce-scene-mw": lambda df: get_weighted_multigraph(df, groupby=["act", "scene"]),
+        "ce-group-mw": lambda df: get_weighted_multigraph(
+            df, groupby=["act", "scene", "stagegroup"]
+        ),
+        "se-scene-w": lambda df: get_bipartite_graph(df, groupby=["act", "scene"]),
+        "se-group-w": lambda df: get_bipartite_graph(
+            df, groupby=["act", "scene", "stagegroup"]
+        ),
+        "se-speech-mwd": lambda df: get_bipartite_graph(
+            df, groupby=["act", "scene", "stagegroup", "setting", "speaker"]
+        ),
+        "hg-scene-mw": lambda df: CompactHypergraph.from_edges(
+            get_hypergraph_edges(df, groupby=["act", "scene"])[0]
+        ),
+        "hg-group-mw": lambda df: CompactHypergraph.from_edges(
+            get_hypergraph_edges(df, groupby=["act", "scene", "stagegroup"])[0]
+        ),
+        "hg-speech-wd": get_weighted_directed_hypergraph_edges,
+    }
+)
+
+# Representation (key of REPRESENTATION_BUILDERS) and weight from which the
+# degrees of each representation in CHARACTER_RANKING_COLUMNS are computed.
+DEGREE_SOURCES = {
+    "se-scene-b": ("se-scene-w", None),
+    "se-scene-w": ("se-scene-w", "n_lines"),
+    "se-group-b": ("se-group-w", None),
+    "se-group-w": ("se-group-w", "n_lines"),
+    "se-speech-wd": ("se-speech-mwd", "n_lines"),
+    "ce-scene-b": ("ce-scene-w", None),
+    "ce-scene-mb": ("ce-scene-mw", None),
+    "ce-scene-mw": ("ce-scene-mw", "n_lines"),
+    "ce-group-b": ("ce-group-w", None),
+    "ce-group-mb": ("ce-group-mw", None),
+    "ce-group-mw": ("ce-group-mw", "n_lines"),
+    "hg-scene-mb": ("hg-scene-mw", None),
+    "hg-scene-mw": ("hg-scene-mw", "n_lines"),
+    "hg-group-mb": ("hg-group-mw", None),
+    "hg-group-mw": ("hg-group-mw", "n_lines"),
+    "hg-speech-wd": ("hg-speech-wd", "n_lines"),
+}
+
+
+def get_representation(df, representation):
+    """
+    Get a representation of a play, building it on first access and
+    memoising it for the aggregated dataframe it was built from.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param representation: key of REPRESENTATION_BUILDERS, e.g., "ce-scene-mw"
+    :return: the graph, hypergraph, or edge table of the representation;
+        graphs and hypergraphs are shared between calls and hence read-only
+        (use nx.Graph(G) for a mutable copy), edge tables are copies
+    """
+    if representation not in REPRESENTATION_BUILDERS:
+        raise ValueError(
+            f"representation={representation}, must be in {list(REPRESENTATION_BUILDERS)}!"
+        )
+    representations = get_frame_cache(df).setdefault("representations", {})
+    if representation not in representations:
+        representations[representation] = _freeze(
+            REPRESENTATION_BUILDERS[representation](df)
+        )
+    result = representations[representation]
+    return result.copy() if isinstance(result, pd.DataFrame) else result
+
+
+def _freeze(representation):
+    """Make a memoised graph or hypergraph read-only, so that callers cannot
+    change what later calls get."""
+    if isinstance(representation, nx.Graph):
+        return nx.freeze(representation)
+    if isinstance(representation, CompactHypergraph):
+        arrays = [
+            representation.node_ids,
+            representation.indptr,
+            representation.indices,
+        ]
+        for array in arrays + list(representation.edge_attributes.values()):
+            array.setflags(write=False)
+        representation.edge_ids = tuple(representation.edge_ids)
+        representation.edge_attributes = MappingProxyType(
+            representation.edge_attributes
+        )
+    return representation
+
+
+def get_character_ranking_df(df, columns=None):
+    """
+    Rank the characters of a play in the representations of CHARACTER_RANKING_COLUMNS.
+
+    Only the representations needed for the requested columns are built,
+    and they are memoised per play (see `get_representation`), so repeated
+    calls for the same dataframe reuse them.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param columns: names of the ranking columns to compute (default: all)
+    :return: pd.DataFrame of ranks indexed by character
+    """
+    specification = OrderedDict(
+        (name, (representation, degree_type))
+        for name, representation, degree_type in CHARACTER_RANKING_COLUMNS
     )
-    rank_df = pd.DataFrame.from_records(ranks)  # .reset_index()
-    return rank_df.sort_index()  # .sort_values(by="index")
+    if columns is None:
+        columns = list(specification)
+    unknown = [name for name in columns if name not in specification]
+    if unknown:
+        raise ValueError(f"Unknown ranking columns: {unknown}!")
+    degrees = OrderedDict()
+    for name in columns:
+        representation, degree_type = specification[name]
+        source, weight = DEGREE_SOURCES[representation]
+        degrees[name] = degree_wrapper(
+            get_representation(df, source), weight=weight, degree_type=degree_type
+        )
+    return rank_degree_matrix(pd.DataFrame(degrees)).sort_index()
+
+
+def _hypergraph_s_degrees(representations):
+    """Compute the s-degrees of all hypergraph representations, calling
+    `s_degrees` once per distinct pair of hypergraph and weight."""
+    requested = defaultdict(set)
+    hypergraphs = {}
+    for representation in representations:
+        graph = representation["graph"]
+        if isinstance(graph, (hnx.Hypergraph, CompactHypergraph)) and (
+            representation.get("centrality", None) is None
+        ):
+            key = (id(graph), representation.get("weight", None))
+            requested[key].add(representation.get("s", 1))
+            hypergraphs[key] = graph
+    return {
+        key: s_degrees(hypergraphs[key], weight=key[1], s_values=sorted(s_values))
+        for key, s_values in requested.items()
+    }
 
 
 def get_character_ranking(representations):
-    ranks = OrderedDict()
+    degrees = OrderedDict()
+    hypergraph_degrees = _hypergraph_s_degrees(representations)
 
     for representation in representations:
         name = representation["name"]
@@ -275,20 +695,17 @@ def get_character_ranking(representations):
         degree = representation.get("degree", None)
         s = representation.get("s", 1)
         superlevel = representation.get("superlevel", True)
+        centrality = representation.get("centrality", None)
 
-        ranks[name] = character_rank_dictionary(
-            degree_ranking_with_equalities(
-                graph,
-                weight=weight,
-                degree_type=degree,
-                # Will be ignored for graphs
-                s=s,
-                superlevel=superlevel,
-            )
-        )
+        if centrality is not None:
+            degrees[name] = graph_centrality(graph, centrality, weight=weight)
+        elif (id(graph), weight) in hypergraph_degrees:
+            degrees[name] = hypergraph_degrees[(id(graph), weight)][(s, superlevel)]
+        else:
+            degrees[name] = degree_wrapper(graph, weight=weight, degree_type=degree)
 
     rank_df = (
-        pd.DataFrame.from_records(ranks).rename(
+        rank_degree_matrix(pd.DataFrame(degrees)).rename(
             # Rename columns by dropping the 'XX-' prefix.
             mapper=lambda x: "-".join(x.split("-")[1:]),
             axis="columns",
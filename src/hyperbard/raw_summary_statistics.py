@@ -3,8 +3,8 @@
 from glob import glob
 
 import pandas as pd
-from statics import DATA_PATH, META_PATH
 
+from hyperbard.statics import DATA_PATH, META_PATH
 from hyperbard.utils import get_filename_base, string_to_set
 
 
@@ -39,7 +39,7 @@ def compute_all_raw_statistics(filenames_agg, name_to_type):
     return pd.DataFrame.from_records(rows)
 
 
-if __name__ == "__main__":
+def create_raw_summary_statistics():
     filenames_agg = sorted(glob(f"{DATA_PATH}/*.agg.csv"))
     name_to_type = pd.read_csv(f"{META_PATH}/playtypes.csv", comment="#").set_index(
         "play_name"
@@ -47,3 +47,7 @@ if __name__ == "__main__":
     df = compute_all_raw_statistics(filenames_agg, name_to_type)
     df.to_csv(f"{META_PATH}/summary_statistics_raw.csv", index=False)
     #  print(df.to_csv(index=False))
+
+
+if __name__ == "__main__":
+    create_raw_summary_statistics()
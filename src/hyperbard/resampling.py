@@ -0,0 +1,494 @@
+"""Resampling-based uncertainty estimates for character rankings.
+
+The degrees of all representations are sums of contributions of the
+text units of a play (see `ranking.incidence_degrees`). We precompute the
+contribution of every resampling unit (scene or stagegroup) once, so that
+the degrees of a resampled play are a weighted sum of these contributions,
+with weights given by how often every unit was drawn. The distinct
+neighbour counts of the clique expansions (ce-*-b) are not additive; for
+them, we sum per-unit co-occurrence counts instead and count the nonzero
+entries.
+"""
+
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from hyperbard.correlation import correlate
+from hyperbard.incidence import LEVEL_GROUPBY, get_play_incidence
+from hyperbard.ranking import CHARACTER_RANKING_COLUMNS, competition_ranks
+
+RESAMPLING_LEVELS = ["scene", "group"]
+LEVEL_ORDER = {"scene": 0, "group": 1, "speech": 2}
+
+
+class UnitContributions:
+    """Contributions of the resampling units of a play to the character
+    degrees of several representations.
+
+    Attributes
+    ----------
+    level : str
+        Resampling level, "scene" or "group".
+
+    units : pd.DataFrame
+        One row per resampling unit, holding its groupby keys.
+
+    characters : pd.Index
+        Characters of the play.
+
+    columns : list
+        Names of the degree columns.
+
+    values : np.ndarray
+        Array of shape (units, characters, columns) of additive degree
+        contributions (zero for the ce-*-b columns).
+
+    presence : np.ndarray
+        Array of the same shape whose sum over the drawn units is positive
+        iff a character is a node of the representation.
+
+    cooccurrence : dict
+        Dictionary mapping the positions of the ce-*-b columns to sparse
+        (characters^2 x units) matrices of off-diagonal co-occurrence
+        counts.
+    """
+
+    __slots__ = (
+        "level",
+        "units",
+        "characters",
+        "columns",
+        "values",
+        "presence",
+        "cooccurrence",
+    )
+
+    def __init__(
+        self, level, units, characters, columns, values, presence, cooccurrence
+    ):
+        self.level = level
+        self.units = units
+        self.characters = characters
+        self.columns = columns
+        self.values = values
+        self.presence = presence
+        self.cooccurrence = cooccurrence
+
+    @property
+    def n_units(self):
+        return len(self.units)
+
+    def degrees(self, multiplicities):
+        """Degrees of resampled plays.
+
+        Parameters
+        ----------
+        multiplicities : np.ndarray
+            Array of shape (resamples, units) holding how often every unit
+            is part of every resample.
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape (resamples, characters, columns), NaN where a
+            character is not a node of the resampled representation.
+        """
+        multiplicities = np.atleast_2d(multiplicities).astype(float)
+        degrees = np.tensordot(multiplicities, self.values, axes=(1, 0))
+        present = np.tensordot(multiplicities, self.presence, axes=(1, 0)) > 0
+        n = len(self.characters)
+        for column, cooccurrence in self.cooccurrence.items():
+            counts = np.asarray(cooccurrence @ multiplicities.T).T
+            degrees[:, :, column] = (counts.reshape(-1, n, n) > 0).sum(axis=2)
+        return np.where(present, degrees, np.nan)
+
+
+def _unit_blocks(units, blocks):
+    """Sparse (units x blocks) indicator of the block every unit belongs to,
+    for units at a level at least as fine as that of the blocks."""
+    valid = (units.row_units >= 0) & (blocks.row_units >= 0)
+    positions = np.full(len(units.units), -1)
+    positions[units.row_units[valid]] = blocks.row_units[valid]
+    keep = positions >= 0
+    return sp.csr_matrix(
+        (np.ones(keep.sum()), (np.flatnonzero(keep), positions[keep])),
+        shape=(len(units.units), len(blocks.units)),
+    )
+
+
+def _cooccurrence_counts(onstage):
+    """Sparse (characters^2 x units) matrix of off-diagonal co-occurrences."""
+    n_characters, n_units = onstage.shape
+    onstage = onstage.tocsc()
+    rows, columns = [], []
+    for unit in range(n_units):
+        members = onstage.indices[onstage.indptr[unit] : onstage.indptr[unit + 1]]
+        first, second = np.meshgrid(members, members, indexing="ij")
+        off_diagonal = first != second
+        rows.append((first * n_characters + second)[off_diagonal])
+        columns.append(np.full(off_diagonal.sum(), unit))
+    rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+    columns = np.concatenate(columns) if columns else np.array([], dtype=np.int64)
+    return sp.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)), shape=(n_characters**2, n_units)
+    )
+
+
+def representation_contributions(
+    incidence, representation, degree_type=None, weight="n_lines"
+):
+    """Contributions of the text units of a representation to the degrees of
+    its characters.
+
+    Parameters
+    ----------
+    incidence : PlayIncidence
+        Canonical incidence of a play, see `get_play_incidence`.
+
+    representation : str
+        Representation name, such as "ce-scene-mw", see
+        `ranking.incidence_degrees`.
+
+    degree_type : None or "in" or "out"
+        Only used for the speech act representations.
+
+    weight : str
+        Text unit attribute used as weight by the weighted representations.
+
+    Returns
+    -------
+    tuple
+        Sparse (characters x text units) matrices (contributions,
+        presence): the degrees are the row sums of the contributions
+        (except for ce-*-b, whose contributions are zero), and characters
+        are nodes of the representation iff the row sums of the presence
+        are positive.
+    """
+    expansion, level, variant = representation.split("-")
+    units = incidence[level]
+    onstage = units.onstage
+    weights = units.weights(weight if "w" in variant else None)
+    co_stars = units.sizes - 1
+    if level == "speech":
+        matrices = {"in": units.listener, "out": units.speaker}
+        types = ["in", "out"] if degree_type is None else [degree_type]
+        return sum(matrices[t] for t in types) @ sp.diags(weights), onstage
+    if expansion == "ce":
+        present = onstage @ sp.diags(co_stars)
+        if variant == "b":
+            return 0 * present, present
+        return onstage @ sp.diags(co_stars * weights), present
+    return onstage @ sp.diags(weights), onstage
+
+
+def get_unit_contributions(
+    df, level="scene", columns=CHARACTER_RANKING_COLUMNS, weight="n_lines"
+):
+    """Compute the contributions of the scenes or stagegroups of a play to
+    the degree columns of a character ranking.
+
+    Representations at a coarser level than the resampling level (i.e.,
+    scene-level representations when resampling stagegroups) cannot be
+    decomposed into unit contributions and are left out.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Aggregated dataframe of a play, as loaded from an .agg.csv file.
+
+    level : str
+        Resampling level, one of RESAMPLING_LEVELS.
+
+    columns : list
+        List of (column name, representation, degree_type) triples, see
+        `ranking.CHARACTER_RANKING_COLUMNS`.
+
+    weight : str
+        Text unit attribute used as weight by the weighted representations.
+
+    Returns
+    -------
+    UnitContributions
+    """
+    if level not in RESAMPLING_LEVELS:
+        raise ValueError(f"level={level}, must be in {RESAMPLING_LEVELS}!")
+    incidence = get_play_incidence(df)
+    blocks = incidence[level]
+    keys = LEVEL_GROUPBY[level]
+    columns = [
+        column
+        for column in columns
+        if LEVEL_ORDER[column[1].split("-")[1]] >= LEVEL_ORDER[level]
+    ]
+    n_characters = len(incidence.characters)
+    values = np.zeros((len(blocks.units), n_characters, len(columns)))
+    presence = np.zeros_like(values)
+    cooccurrence = {}
+    for position, (_, representation, degree_type) in enumerate(columns):
+        units = incidence[representation.split("-")[1]]
+        to_blocks = _unit_blocks(units, blocks)
+        contribution, present = representation_contributions(
+            incidence, representation, degree_type, weight
+        )
+        if representation.startswith("ce-") and representation.endswith("-b"):
+            cooccurrence[position] = (
+                _cooccurrence_counts(units.onstage) @ to_blocks
+            ).tocsr()
+        values[:, :, position] = (contribution @ to_blocks).T.toarray()
+        presence[:, :, position] = (present @ to_blocks).T.toarray()
+    return UnitContributions(
+        level,
+        blocks.units[keys],
+        incidence.characters,
+        [name for name, _, _ in columns],
+        values,
+        presence,
+        cooccurrence,
+    )
+
+
+def bootstrap_multiplicities(rng, n_units, n_resamples):
+    """Draw `n_resamples` bootstrap samples of `n_units` units with
+    replacement, returned as (resamples x units) multiplicities."""
+    return rng.multinomial(n_units, np.full(n_units, 1 / n_units), size=n_resamples)
+
+
+def _bootstrap_correlations(arguments):
+    contributions, seed_sequence, n_resamples, method = arguments
+    rng = np.random.default_rng(seed_sequence)
+    multiplicities = bootstrap_multiplicities(rng, contributions.n_units, n_resamples)
+    ranks = competition_ranks(contributions.degrees(multiplicities))
+    return correlate(ranks, method)
+
+
+def _chunk_sizes(n_resamples, chunk_size):
+    return [
+        min(chunk_size, n_resamples - start)
+        for start in range(0, n_resamples, chunk_size)
+    ]
+
+
+def bootstrap_corpus_rank_correlations(
+    dfs,
+    n_resamples=1000,
+    level="scene",
+    method="kendall",
+    confidence=0.95,
+    seed=0,
+    n_jobs=1,
+    chunk_size=100,
+    columns=CHARACTER_RANKING_COLUMNS,
+):
+    """Bootstrap confidence intervals for the rank correlations between
+    representations, for many plays.
+
+    Every resample draws as many scenes (or stagegroups) as the play has,
+    with replacement, recomputes all degrees from the unit contributions,
+    ranks the characters, and correlates the rankings. Resamples are
+    processed in chunks of `chunk_size`, each with its own seed spawned
+    from `seed` via `np.random.SeedSequence`, so that results only depend
+    on `seed` and `chunk_size`, not on `n_jobs`.
+
+    Parameters
+    ----------
+    dfs : dict
+        Dictionary mapping plays to aggregated dataframes.
+
+    n_resamples : int
+        Number of bootstrap resamples per play.
+
+    level : str
+        Resampling level, one of RESAMPLING_LEVELS.
+
+    method : str
+        Correlation method, see `correlation.CORRELATION_METHODS`.
+
+    confidence : float
+        Confidence level of the percentile intervals.
+
+    seed : int
+        Root seed.
+
+    n_jobs : int
+        Number of worker processes.
+
+    chunk_size : int
+        Number of resamples per task.
+
+    columns : list
+        Degree columns to rank, see `get_unit_contributions`.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping plays to dictionaries with data frames
+        "correlation" (observed), "lower", and "upper" (interval bounds).
+    """
+    plays = list(dfs)
+    contributions = {
+        play: get_unit_contributions(dfs[play], level, columns) for play in plays
+    }
+    play_seeds = np.random.SeedSequence(seed).spawn(len(plays))
+    tasks, task_plays = [], []
+    for play, play_seed in zip(plays, play_seeds):
+        sizes = _chunk_sizes(n_resamples, chunk_size)
+        for chunk_seed, size in zip(play_seed.spawn(len(sizes)), sizes):
+            tasks.append((contributions[play], chunk_seed, size, method))
+            task_plays.append(play)
+    if n_jobs == 1:
+        results = list(map(_bootstrap_correlations, tasks))
+    else:
+        with Pool(n_jobs) as pool:
+            results = pool.map(_bootstrap_correlations, tasks)
+
+    alpha = (1 - confidence) / 2
+    intervals = dict()
+    for play in plays:
+        samples = np.concatenate(
+            [result for result, p in zip(results, task_plays) if p == play]
+        )
+        play_contributions = contributions[play]
+        observed = correlate(
+            competition_ranks(
+                play_contributions.degrees(np.ones(play_contributions.n_units))
+            ),
+            method,
+        )[0]
+        with np.errstate(invalid="ignore"):
+            lower, upper = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+        names = play_contributions.columns
+        intervals[play] = {
+            key: pd.DataFrame(value, index=names, columns=names)
+            for key, value in [
+                ("correlation", observed),
+                ("lower", lower),
+                ("upper", upper),
+            ]
+        }
+    return intervals
+
+
+def bootstrap_rank_correlations(df, **kwargs):
+    """Bootstrap confidence intervals for the rank correlations between the
+    representations of one play, see `bootstrap_corpus_rank_correlations`."""
+    return bootstrap_corpus_rank_correlations({None: df}, **kwargs)[None]
+
+
+def permutation_test_rank_correlations(
+    ranking, n_permutations=1000, method="kendall", seed=0, chunk_size=100
+):
+    """Permutation test for the rank correlations between representations.
+
+    Under the null hypothesis that two rankings are independent, the
+    correlation of their columns is distributed like that of randomly
+    permuted columns. Every column is permuted independently among its
+    non-missing entries, so that all pairs are tested at once.
+
+    Parameters
+    ----------
+    ranking : pd.DataFrame
+        Rank data frame (characters x representations).
+
+    n_permutations : int
+        Number of permutations.
+
+    method : str
+        Correlation method, see `correlation.CORRELATION_METHODS`.
+
+    seed : int
+        Seed of the random permutations.
+
+    chunk_size : int
+        Number of permutations correlated at once.
+
+    Returns
+    -------
+    pd.DataFrame
+        Two-sided p-values for every pair of representations.
+    """
+    values = ranking.to_numpy(dtype=float)
+    observed = np.abs(correlate(values[np.newaxis], method)[0])
+    present = ~np.isnan(values)
+    # Rows of the non-missing entries of every column come first.
+    targets = np.argsort(~present, axis=0, kind="stable")
+    rng = np.random.default_rng(seed)
+    exceedances = np.zeros_like(observed)
+    for size in _chunk_sizes(n_permutations, chunk_size):
+        keys = rng.random((size,) + values.shape)
+        keys[:, ~present] = np.inf
+        sources = np.argsort(keys, axis=1)
+        permuted = np.full((size,) + values.shape, np.nan)
+        column_index = np.arange(values.shape[1])
+        permuted[:, targets, column_index] = values[sources, column_index]
+        null = np.abs(correlate(permuted, method))
+        exceedances += (null >= observed - 1e-12).sum(axis=0)
+    p_values = (exceedances + 1) / (n_permutations + 1)
+    p_values[np.isnan(observed)] = np.nan
+    return pd.DataFrame(p_values, index=ranking.columns, columns=ranking.columns)
+
+
+def jackknife_rank_variance(df, level="scene", columns=CHARACTER_RANKING_COLUMNS):
+    """Leave-one-out (jackknife) variance of the character ranks.
+
+    For every scene (or stagegroup), its contribution is subtracted from
+    the degrees of the whole play, and the characters are re-ranked. The
+    jackknife variance of the ranks of every character in every
+    representation is (n - 1) / n times the sum of squared deviations of
+    the n leave-one-out ranks from their mean, where n only counts the
+    omissions after which the character is still part of the
+    representation.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Aggregated dataframe of a play, as loaded from an .agg.csv file.
+
+    level : str
+        Level of the omitted units, one of RESAMPLING_LEVELS.
+
+    columns : list
+        Degree columns to rank, see `get_unit_contributions`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Data frame of rank variances indexed by character, with one column
+        per representation.
+    """
+    contributions = get_unit_contributions(df, level, columns)
+    n_units = contributions.n_units
+    ranks = competition_ranks(
+        contributions.degrees(np.ones((n_units, n_units)) - np.eye(n_units))
+    )
+    n = (~np.isnan(ranks)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(ranks, axis=0) / n
+        variance = (n - 1) / n * np.nansum((ranks - mean) ** 2, axis=0)
+    variance[n == 0] = np.nan
+    return pd.DataFrame(
+        variance, index=contributions.characters, columns=contributions.columns
+    )
+
+
+def jackknife_corpus_rank_variance(
+    dfs, level="scene", columns=CHARACTER_RANKING_COLUMNS, n_jobs=1
+):
+    """Jackknife rank variances for many plays, see
+    `jackknife_rank_variance`, optionally computed in `n_jobs` worker
+    processes.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping plays to data frames of rank variances.
+    """
+    arguments = [(dfs[play], level, columns) for play in dfs]
+    if n_jobs == 1:
+        results = [jackknife_rank_variance(*a) for a in arguments]
+    else:
+        with Pool(n_jobs) as pool:
+            results = pool.starmap(jackknife_rank_variance, arguments)
+    return dict(zip(dfs, results))
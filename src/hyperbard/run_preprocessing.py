@@ -4,47 +4,79 @@ import os
 from glob import glob
 from multiprocessing import Pool, cpu_count
 
-from statics import DATA_PATH, RAWDATA_PATH
+import pandas as pd
 
+from hyperbard.event_log import get_event_log
+from hyperbard.onstage_index import get_onstage_interval_index
 from hyperbard.preprocessing import get_agg_xml_df, get_cast_df, get_raw_xml_df
+from hyperbard.statics import DATA_PATH, RAWDATA_PATH
+from hyperbard.track_time import add_profiler_arguments, configure_profiler, run, span
 from hyperbard.utils import get_filename_base
 
 
-def handle_file(file, args):
+def handle_file(file, force=False, path=DATA_PATH):
     try:
-        print(f"Starting {file}...")
         filename_base = get_filename_base(file, full=False)
-
-        out_file = f"{DATA_PATH}/{filename_base}.cast.csv"
-
-        if os.path.exists(out_file) and not args.force:
-            print(f"{out_file} already exists; will not overwrite")
-        else:
-            #  .cast.csv
-            cast_df = get_cast_df(file)
-            cast_df.to_csv(f"{out_file}", index=False)
-
-        out_file = f"{DATA_PATH}/{filename_base}.raw.csv"
-
-        if os.path.exists(out_file) and not args.force:
-            print(f"{out_file} already exists; will not overwrite")
-        else:
-            #  .raw.csv
-            df = get_raw_xml_df(file)
-            df.to_csv(f"{out_file}", index=False)
-
-        out_file = f"{DATA_PATH}/{filename_base}.agg.csv"
-
-        if os.path.exists(out_file) and not args.force:
-            print(f"{out_file} already exists; will not overwrite")
-        else:
-            aggdf = get_agg_xml_df(df)
-            assert all(
-                [bool(x) for x in aggdf.onstage]
-            ), f"{file}: found nan values in 'onstage' column of aggregated (i.e., speech-only) dataframe!"
-
-            # .agg.csv
-            aggdf.to_csv(f"{out_file}", index=False)
+        with run("play", play=filename_base):
+            print(f"Starting {file}...")
+
+            out_file = f"{path}/{filename_base}.cast.csv"
+
+            if os.path.exists(out_file) and not force:
+                print(f"{out_file} already exists; will not overwrite")
+            else:
+                #  .cast.csv
+                with span("cast"):
+                    cast_df = get_cast_df(file)
+                cast_df.to_csv(f"{out_file}", index=False)
+
+            out_file = f"{path}/{filename_base}.raw.csv"
+
+            if os.path.exists(out_file) and not force:
+                print(f"{out_file} already exists; will not overwrite")
+                # The later files are built from the kept .raw.csv, if needed.
+                if not all(
+                    os.path.exists(f"{path}/{filename_base}{suffix}")
+                    for suffix in [".onstage.npz", ".events.npz", ".agg.csv"]
+                ):
+                    df = pd.read_csv(out_file)
+            else:
+                #  .raw.csv
+                with span("raw"):
+                    df = get_raw_xml_df(file)
+                df.to_csv(f"{out_file}", index=False)
+
+            out_file = f"{path}/{filename_base}.onstage.npz"
+
+            if os.path.exists(out_file) and not force:
+                print(f"{out_file} already exists; will not overwrite")
+            else:
+                #  .onstage.npz
+                with span("onstage_index"):
+                    get_onstage_interval_index(df).save(out_file)
+
+            out_file = f"{path}/{filename_base}.events.npz"
+
+            if os.path.exists(out_file) and not force:
+                print(f"{out_file} already exists; will not overwrite")
+            else:
+                #  .events.npz
+                with span("event_log"):
+                    get_event_log(df).save(out_file)
+
+            out_file = f"{path}/{filename_base}.agg.csv"
+
+            if os.path.exists(out_file) and not force:
+                print(f"{out_file} already exists; will not overwrite")
+            else:
+                with span("agg"):
+                    aggdf = get_agg_xml_df(df)
+                assert all(
+                    [bool(x) for x in aggdf.onstage]
+                ), f"{file}: found nan values in 'onstage' column of aggregated (i.e., speech-only) dataframe!"
+
+                # .agg.csv
+                aggdf.to_csv(f"{out_file}", index=False)
 
     except TypeError as e:
         raise Exception(f"Problem with {file}: {e}")
@@ -60,8 +92,11 @@ if __name__ == "__main__":
         "-f", "--force", action="store_true", help="If set, overwrites files"
     )
 
+    add_profiler_arguments(parser)
+
     args = parser.parse_args()
+    configure_profiler(args)
 
-    with Pool(cpu_count() - 3) as p:
-        file_handler = functools.partial(handle_file, args=args)
+    with run("run_preprocessing"), Pool(cpu_count() - 3) as p:
+        file_handler = functools.partial(handle_file, force=args.force)
         p.map(file_handler, files)
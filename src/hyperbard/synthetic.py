@@ -0,0 +1,232 @@
+"""Seeded generator of synthetic plays in the TEIsimple shape of the Folger
+Shakespeare.
+
+Synthetic plays allow scaling each parameter of the input independently
+(cast size, numbers of acts and scenes, speeches per scene, entrance and
+exit churn, and crowd sizes) to test how the pipeline scales beyond the
+corpus, without network access. The defaults yield a play of roughly the
+size of Hamlet; `scale` multiplies the number of scenes per act.
+
+The output is valid input to `preprocessing.get_raw_xml_df`: acts and
+scenes are div elements, stage directions are stage elements with who and
+type attributes, speeches are sp elements with a speaker and lines (l) of
+words (w), spaces (c), and punctuation (pc), all carrying Folger-style
+xml:id and n attributes.
+"""
+
+import io
+import random
+from xml.sax.saxutils import quoteattr
+
+WORDS = [
+    "the",
+    "and",
+    "my",
+    "lord",
+    "what",
+    "is",
+    "this",
+    "that",
+    "love",
+    "night",
+    "king",
+    "heaven",
+    "speak",
+    "good",
+    "sweet",
+    "death",
+    "come",
+    "hear",
+    "thee",
+    "not",
+]
+PUNCTUATION = [",", ".", ";", "?", "!"]
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<text>
+<front>
+<castList>
+"""
+
+
+class _Writer:
+    """Write Folger-style elements with running xml:id counters."""
+
+    __slots__ = ("out", "play", "rng", "counters")
+
+    def __init__(self, out, play, rng):
+        self.out = out
+        self.play = play
+        self.rng = rng
+        self.counters = {"fs": 0, "stg": 0, "sp": 0, "ftln": 0}
+
+    def next_id(self, kind):
+        self.counters[kind] += 1
+        if kind == "fs":
+            # Token numbers advance by 10 per element, spaces included.
+            return f"fs-{self.play}-{10 * self.counters[kind]:09d}"
+        return f"{kind}-{self.counters[kind]:06d}"
+
+    def tokens(self, n_words, n=None, end=True):
+        """Words separated by spaces, optionally followed by punctuation."""
+        n = "" if n is None else f' n="{n}"'
+        parts = []
+        for idx in range(n_words):
+            if idx:
+                self.counters["fs"] += 1
+                parts.append("<c> </c>")
+            word = self.rng.choice(WORDS)
+            parts.append(
+                f'<w xml:id="{self.next_id("fs")}"{n} lemma="{word}">{word}</w>'
+            )
+        if end:
+            parts.append(
+                f'<pc xml:id="{self.next_id("fs")}"{n}>'
+                f"{self.rng.choice(PUNCTUATION)}</pc>"
+            )
+        return "".join(parts)
+
+    def stage(self, kind, characters, n):
+        who = " ".join(characters)
+        verb = "Enter" if kind == "entrance" else "Exit"
+        self.out.write(
+            f'<stage xml:id="{self.next_id("stg")}" n="{n}" type="{kind}" '
+            f"who={quoteattr(who)}>"
+            f'<w xml:id="{self.next_id("fs")}" n="{n}">{verb}</w>'
+            f"{self.tokens(len(characters), n)}</stage>\n"
+        )
+
+    def speech(self, speaker, lines):
+        """Write a speech given its speaker and (n, number of words) per line."""
+        self.out.write(
+            f'<sp xml:id="{self.next_id("sp")}" who="{speaker}">'
+            f'<speaker xml:id="spk-{self.counters["sp"]:06d}">'
+            f'<w xml:id="{self.next_id("fs")}">{speaker[1:].split("_")[0].upper()}</w>'
+            f"</speaker>\n"
+        )
+        for n, n_words in lines:
+            self.out.write(
+                f'<l xml:id="{self.next_id("ftln")}" n="{n}">'
+                f"{self.tokens(n_words, n)}</l>\n"
+            )
+        self.out.write("</sp>\n")
+
+
+def generate_play(
+    out,
+    seed=0,
+    n_characters=35,
+    n_acts=5,
+    scenes_per_act=4,
+    speeches_per_scene=55,
+    lines_per_speech=(1, 6),
+    words_per_line=(5, 9),
+    churn=0.15,
+    crowd_size=(1, 4),
+    scale=1,
+    play="syn",
+):
+    """Write a synthetic play as TEIsimple XML to a text stream.
+
+    Parameters
+    ----------
+    out : file-like
+        Writable text stream.
+
+    seed : int
+        Seed of the random number generator; equal seeds and parameters
+        yield identical output.
+
+    n_characters : int
+        Cast size. The last tenth of the cast (at least one character)
+        are groups with uppercase identifiers, e.g., "#CROWD1_SYN".
+
+    n_acts, scenes_per_act, speeches_per_scene : int
+        Numbers of acts, scenes per act (times `scale`), and speeches per
+        scene.
+
+    lines_per_speech, words_per_line : tuple
+        Inclusive ranges of the numbers of lines per speech and words per
+        line.
+
+    churn : float
+        Probability of an entrance or exit before each speech.
+
+    crowd_size : tuple
+        Inclusive range of the numbers of characters entering together
+        (also at the start of each scene) or exiting together.
+
+    scale : int
+        Factor multiplying the number of scenes per act.
+
+    play : str
+        Play identifier used in xml:ids and character identifiers.
+    """
+    if n_characters < 2:
+        raise ValueError(f"n_characters={n_characters}, must be at least 2!")
+    if not 0 <= churn <= 1:
+        raise ValueError(f"churn={churn}, must be in [0, 1]!")
+    rng = random.Random(seed)
+    n_groups = max(1, n_characters // 10)
+    suffix = play.upper()
+    cast = [f"Character{idx}_{suffix}" for idx in range(1, n_characters - n_groups + 1)]
+    cast += [f"CROWD{idx}_{suffix}" for idx in range(1, n_groups + 1)]
+    characters = [f"#{name}" for name in cast]
+    named = characters[: n_characters - n_groups]
+
+    out.write(HEADER)
+    out.write("".join(f'<castItem xml:id="{name}"/>\n' for name in cast))
+    out.write("</castList>\n</front>\n<body>\n")
+    writer = _Writer(out, play, rng)
+    for act in range(1, n_acts + 1):
+        out.write(f'<div type="act" n="{act}">\n<head>{writer.tokens(2, end=False)}')
+        out.write("</head>\n")
+        for scene in range(1, scenes_per_act * scale + 1):
+            out.write(f'<div type="scene" n="{scene}">\n')
+            line = 0
+            onstage = sorted(rng.sample(characters, rng.randint(*crowd_size)))
+            writer.stage("entrance", onstage, f"SD {act}.{scene}.0")
+            directions = 0
+            for _ in range(speeches_per_scene):
+                if rng.random() < churn:
+                    directions += 1
+                    n = f"SD {act}.{scene}.{line}.{directions}"
+                    offstage = [c for c in characters if c not in onstage]
+                    if offstage and (len(onstage) < 2 or rng.random() < 0.5):
+                        entering = rng.sample(
+                            offstage, min(len(offstage), rng.randint(*crowd_size))
+                        )
+                        writer.stage("entrance", sorted(entering), n)
+                        onstage = sorted(onstage + entering)
+                    else:
+                        exiting = rng.sample(
+                            onstage, min(len(onstage) - 1, rng.randint(*crowd_size))
+                        )
+                        writer.stage("exit", sorted(exiting), n)
+                        onstage = [c for c in onstage if c not in exiting]
+                speakers = [c for c in onstage if c in named] or onstage
+                lines = []
+                for _ in range(rng.randint(*lines_per_speech)):
+                    line += 1
+                    lines.append(
+                        (f"{act}.{scene}.{line}", rng.randint(*words_per_line))
+                    )
+                writer.speech(rng.choice(speakers), lines)
+            writer.stage("exit", onstage, f"SD {act}.{scene}.{line}.{directions + 1}")
+            out.write("</div>\n")
+        out.write("</div>\n")
+    out.write("</body>\n</text>\n</TEI>\n")
+
+
+def write_synthetic_play(file, **parameters):
+    """Write a synthetic play to a file, see `generate_play` for the parameters."""
+    with open(file, "w") as f:
+        generate_play(f, **parameters)
+
+
+def get_synthetic_play(**parameters):
+    """Synthetic play as string, see `generate_play` for the parameters."""
+    out = io.StringIO()
+    generate_play(out, **parameters)
+    return out.getvalue()
@@ -0,0 +1,509 @@
+"""Time-resolved statistics of plays.
+
+A `PrefixSumIndex` stores, for every row of an aggregated dataframe (i.e.,
+in the order of the settings of a play), the cumulative sums of per-
+character quantities: lines and tokens spoken, lines and tokens onstage,
+the number of rows onstage, and the contributions to the degrees of the
+additive representations. The value of any quantity over any window of
+rows is then the difference of two prefix sums.
+
+For co-presence structure within windows, `iter_snapshots` slides a
+window over the hg-speech-mwd edge table of a play, updating its
+incidence and degree state only for the edges entering and leaving the
+window, and lazily yields compact hypergraphs or statistics per window.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.hypergraph_representations import get_membership_table
+from hyperbard.incidence import get_play_incidence
+from hyperbard.ranking import CHARACTER_RANKING_COLUMNS, competition_ranks
+from hyperbard.resampling import representation_contributions
+from hyperbard.statics import RANKINGDATA_PATH
+from hyperbard.utils import get_filename_base, get_frame_cache
+
+ROW_QUANTITIES = [
+    "n_lines_speaker",
+    "n_tokens_speaker",
+    "n_lines_onstage",
+    "n_tokens_onstage",
+    "n_rows_onstage",
+]
+
+# The distinct neighbour counts of the ce-*-b representations are not
+# additive over text units and hence cannot be windowed via prefix sums.
+ADDITIVE_RANKING_COLUMNS = [
+    column
+    for column in CHARACTER_RANKING_COLUMNS
+    if not (column[1].startswith("ce-") and column[1].endswith("-b"))
+]
+
+
+class PrefixSumIndex:
+    """Prefix sums of per-character quantities over the rows of a play.
+
+    Attributes
+    ----------
+    characters : pd.Index
+        Characters of the play.
+
+    columns : list
+        Names of the quantities: ROW_QUANTITIES followed by the names of
+        the degree columns.
+
+    rows : pd.DataFrame
+        The key columns ("act", "scene", "stagegroup", "setting") of the
+        rows of the play.
+
+    prefix : np.ndarray
+        Array of shape (rows + 1, characters, columns) whose entry t holds
+        the sums over the first t rows.
+
+    totals : pd.DataFrame
+        Cumulative n_lines and n_tokens of the play, with rows + 1 rows.
+    """
+
+    __slots__ = ("characters", "columns", "rows", "prefix", "totals")
+
+    def __init__(self, characters, columns, rows, prefix, totals):
+        self.characters = characters
+        self.columns = columns
+        self.rows = rows
+        self.prefix = prefix
+        self.totals = totals
+
+    def __len__(self):
+        return len(self.rows)
+
+    def row_of_line(self, line):
+        """Number of rows completed once `line` lines have been spoken."""
+        return int(
+            np.searchsorted(self.totals["n_lines"].values, line, side="right") - 1
+        )
+
+    def row_of_setting(self, setting):
+        """Number of rows up to and including setting `setting`."""
+        return int(np.searchsorted(self.rows["setting"].values, setting, side="right"))
+
+    def window_values(self, start=0, stop=None):
+        """Array (characters x columns) of sums over the rows [start, stop)."""
+        stop = len(self) if stop is None else stop
+        return self.prefix[stop] - self.prefix[start]
+
+    def window(self, start=0, stop=None):
+        """Data frame of sums over the rows [start, stop), indexed by
+        character."""
+        return pd.DataFrame(
+            self.window_values(start, stop),
+            index=self.characters,
+            columns=self.columns,
+        )
+
+    def cumulative(self, stop=None):
+        """Data frame of sums over the first `stop` rows."""
+        return self.window(0, stop)
+
+    def ranking(self, start=0, stop=None, columns=None):
+        """Rank the characters by the sums over the rows [start, stop).
+
+        Characters that are not onstage in the window are not ranked. Note
+        that the degree contributions of a scene or stagegroup are
+        attributed to its first row, so that windows should start and stop
+        at unit boundaries to cover units entirely.
+
+        Parameters
+        ----------
+        start, stop : int
+            Window of rows, e.g., from `row_of_line` or `row_of_setting`.
+
+        columns : None or list
+            Quantities to rank by (default: all).
+
+        Returns
+        -------
+        pd.DataFrame
+            Competition ranks indexed by character.
+        """
+        columns = self.columns if columns is None else columns
+        window = self.window(start, stop)
+        values = window.loc[window["n_rows_onstage"] > 0, columns]
+        return pd.DataFrame(
+            competition_ranks(values.values), index=values.index, columns=columns
+        )
+
+    def trajectory(self, column, stops=None):
+        """Cumulative values of one quantity after each of the given numbers
+        of rows (default: after every row).
+
+        Returns
+        -------
+        pd.DataFrame
+            Data frame indexed by the stops, with one column per
+            character.
+        """
+        stops = np.arange(1, len(self) + 1) if stops is None else np.asarray(stops)
+        values = self.prefix[stops, :, self.columns.index(column)]
+        return pd.DataFrame(values, index=stops, columns=self.characters)
+
+
+def _first_rows(units):
+    """Sparse (units x rows) indicator of the first row of every unit."""
+    n_units = len(units.units)
+    rows = np.flatnonzero(units.row_units >= 0)
+    unit_of_rows = units.row_units[rows]
+    first = np.full(n_units, -1)
+    # Assign in reverse, so that the first row of every unit is kept.
+    first[unit_of_rows[::-1]] = rows[::-1]
+    keep = first >= 0
+    return sp.csr_matrix(
+        (np.ones(keep.sum()), (np.flatnonzero(keep), first[keep])),
+        shape=(n_units, len(units.row_units)),
+    )
+
+
+def _row_incidence(membership, role, characters, n_rows):
+    rows = membership[membership.role.values == role]
+    codes = characters.get_indexer(rows.node.values)
+    keep = codes >= 0
+    matrix = sp.csr_matrix(
+        (np.ones(keep.sum()), (codes[keep], rows.row.values[keep])),
+        shape=(len(characters), n_rows),
+    )
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def _prefix_sum_index(df, columns, weight):
+    incidence = get_play_incidence(df)
+    membership = get_membership_table(df)
+    characters = incidence.characters
+    n_rows = len(df)
+    speaker = _row_incidence(membership, "speaker", characters, n_rows)
+    onstage = _row_incidence(membership, "onstage", characters, n_rows)
+    lines = df["n_lines"].values.astype(float)
+    tokens = df["n_tokens"].values.astype(float)
+    per_row = [
+        speaker @ sp.diags(lines),
+        speaker @ sp.diags(tokens),
+        onstage @ sp.diags(lines),
+        onstage @ sp.diags(tokens),
+        onstage,
+    ]
+    for _, representation, degree_type in columns:
+        units = incidence[representation.split("-")[1]]
+        contribution, _ = representation_contributions(
+            incidence, representation, degree_type, weight
+        )
+        per_row.append(contribution @ _first_rows(units))
+    values = np.stack([m.T.toarray() for m in per_row], axis=-1)
+    prefix = np.zeros((n_rows + 1, len(characters), len(per_row)))
+    np.cumsum(values, axis=0, out=prefix[1:])
+    totals = pd.DataFrame(
+        {
+            "n_lines": np.concatenate([[0], np.cumsum(lines)]),
+            "n_tokens": np.concatenate([[0], np.cumsum(tokens)]),
+        }
+    )
+    key_columns = [c for c in ["act", "scene", "stagegroup", "setting"] if c in df]
+    return PrefixSumIndex(
+        characters,
+        ROW_QUANTITIES + [name for name, _, _ in columns],
+        df[key_columns].reset_index(drop=True),
+        prefix,
+        totals,
+    )
+
+
+def get_prefix_sum_index(df, columns=ADDITIVE_RANKING_COLUMNS, weight="n_lines"):
+    """
+    Get the prefix sum index of a play, computed once per dataframe and cached.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param columns: additive degree columns to index, see ADDITIVE_RANKING_COLUMNS
+    :param weight: text unit attribute used as weight by the weighted representations
+    :return: PrefixSumIndex of the play
+    """
+    cache = get_frame_cache(df)
+    key = ("prefix_sum_index", tuple(columns), weight)
+    if key not in cache:
+        cache[key] = _prefix_sum_index(df, columns, weight)
+    return cache[key]
+
+
+def get_ranking_trajectory(df, by=("act", "scene"), columns=None):
+    """
+    Rank the characters of a play cumulatively at the end of every act, scene, etc.
+
+    :param df: pd.DataFrame as loaded from an .agg.csv file
+    :param by: key columns whose changes delimit the steps
+    :param columns: quantities to rank by (default: all)
+    :return: long pd.DataFrame with the keys of each step, the character, and its ranks
+    """
+    by = list(by)
+    index = get_prefix_sum_index(df)
+    keys = index.rows[by]
+    stops = np.flatnonzero((keys.shift(-1) != keys).any(axis=1).values) + 1
+    parts = []
+    for stop in stops:
+        ranking = index.ranking(0, stop, columns).rename_axis("node").reset_index()
+        parts.append(ranking.assign(**keys.iloc[stop - 1].to_dict()))
+    trajectory = pd.concat(parts, ignore_index=True)
+    return trajectory[by + [c for c in trajectory.columns if c not in by]]
+
+
+def export_ranking_trajectories(files, by=("act", "scene"), path=RANKINGDATA_PATH):
+    """
+    Write the cumulative ranking trajectory of every play to {path}/{play}_ranking-trajectory.csv.
+
+    :param files: paths of .agg.csv files
+    :param by: key columns whose changes delimit the steps
+    :param path: output directory
+    :return: list of written files
+    """
+    os.makedirs(path, exist_ok=True)
+    written = []
+    for file in files:
+        play = get_filename_base(file, full=True).split(".")[0]
+        output = os.path.join(path, f"{play}_ranking-trajectory.csv")
+        get_ranking_trajectory(pd.read_csv(file), by=by).to_csv(output, index=False)
+        written.append(output)
+    return written
+
+
+SNAPSHOT_AXES = ["setting", "lines"]
+
+
+class SlidingWindow:
+    """Incrementally maintained state of a window sliding over the edges of
+    a hg-speech-mwd edge table.
+
+    The edges must be in text order. Moving the window only touches the
+    edges entering and leaving it: their incidences are added to resp.
+    subtracted from the per-node degree state and the co-presence counts.
+
+    Attributes
+    ----------
+    hypergraph : CompactHypergraph
+        All edges of the play, with the onstage characters as members.
+
+    speaker : scipy.sparse.csr_matrix
+        Binary (edges x nodes) matrix of the speakers of every edge.
+
+    start, stop : int
+        Positions of the first edge in and the first edge after the
+        window.
+
+    degree : np.ndarray
+        Number of edges in the window containing each node.
+
+    n_lines_onstage, n_lines_speaker : np.ndarray
+        Lines spoken while onstage resp. by each node in the window.
+
+    copresence : np.ndarray
+        Array (nodes x nodes) counting the edges in the window that
+        contain both nodes; the diagonal equals `degree`.
+    """
+
+    __slots__ = (
+        "hypergraph",
+        "speaker",
+        "start",
+        "stop",
+        "degree",
+        "n_lines_onstage",
+        "n_lines_speaker",
+        "copresence",
+    )
+
+    def __init__(self, edges):
+        self.hypergraph = CompactHypergraph.from_edges(
+            edges.reset_index(drop=True).fillna({"onstage": ""}),
+            member_column="onstage",
+        )
+        self.speaker = self._role_incidence(edges["speaker"])
+        self.start = 0
+        self.stop = 0
+        n_nodes = self.hypergraph.number_of_nodes()
+        self.degree = np.zeros(n_nodes, dtype=np.int64)
+        self.n_lines_onstage = np.zeros(n_nodes)
+        self.n_lines_speaker = np.zeros(n_nodes)
+        self.copresence = np.zeros((n_nodes, n_nodes), dtype=np.int64)
+
+    def _role_incidence(self, members):
+        tokens = members.fillna("").str.split()
+        lengths = tokens.str.len().values
+        codes = pd.Index(self.hypergraph.node_ids).get_indexer(
+            [t for ts in tokens for t in ts]
+        )
+        rows = np.repeat(np.arange(len(members)), lengths)
+        keep = codes >= 0
+        matrix = sp.csr_matrix(
+            (np.ones(keep.sum()), (rows[keep], codes[keep])),
+            shape=(len(members), self.hypergraph.number_of_nodes()),
+        )
+        matrix.data[:] = 1.0
+        return matrix
+
+    def _incidence(self, start, stop):
+        """Binary (edges x nodes) incidence of the edges [start, stop)."""
+        H = self.hypergraph
+        indptr = H.indptr[start : stop + 1]
+        return sp.csr_matrix(
+            (
+                np.ones(indptr[-1] - indptr[0]),
+                H.indices[indptr[0] : indptr[-1]],
+                indptr - indptr[0],
+            ),
+            shape=(stop - start, H.number_of_nodes()),
+        )
+
+    def _update(self, start, stop, sign):
+        if stop <= start:
+            return
+        incidence = self._incidence(start, stop)
+        lines = self.hypergraph.edge_attributes["n_lines"][start:stop].astype(float)
+        self.degree += sign * np.asarray(incidence.sum(axis=0), dtype=np.int64).ravel()
+        self.n_lines_onstage += sign * (incidence.T @ lines)
+        self.n_lines_speaker += sign * (self.speaker[start:stop].T @ lines)
+        self.copresence += sign * (incidence.T @ incidence).toarray().astype(np.int64)
+
+    def move(self, start, stop):
+        """Move the window to the edges [start, stop), with start and stop
+        not smaller than before."""
+        if start < self.start or stop < self.stop:
+            raise ValueError(
+                f"Window [{start}, {stop}) lies before [{self.start}, {self.stop})!"
+            )
+        stop = max(start, stop)
+        self._update(self.start, min(start, self.stop), -1)
+        self._update(max(start, self.stop), stop, 1)
+        self.start, self.stop = start, stop
+
+    @property
+    def active(self):
+        """Interned IDs of the nodes in at least one edge of the window."""
+        return np.flatnonzero(self.degree)
+
+    def snapshot(self):
+        """Return the edges of the window as a CompactHypergraph over the
+        active nodes only."""
+        H = self.hypergraph
+        active = self.active
+        remap = np.full(H.number_of_nodes(), -1, dtype=np.int64)
+        remap[active] = np.arange(len(active))
+        indptr = H.indptr[self.start : self.stop + 1]
+        return CompactHypergraph(
+            H.node_ids[active],
+            H.edge_ids[self.start : self.stop],
+            indptr - indptr[0],
+            remap[H.indices[indptr[0] : indptr[-1]]],
+            {k: v[self.start : self.stop] for k, v in H.edge_attributes.items()},
+        )
+
+    def statistics(self):
+        """Return summary statistics of the window as a dictionary."""
+        active = self.active
+        pairs = np.triu(self.copresence[np.ix_(active, active)], k=1)
+        n_nodes = len(active)
+        return {
+            "n_edges": self.stop - self.start,
+            "n_nodes": n_nodes,
+            "n_lines": float(
+                self.hypergraph.edge_attributes["n_lines"][self.start : self.stop].sum()
+            ),
+            "n_copresent_pairs": int((pairs > 0).sum()),
+            "copresence_density": (
+                2 * (pairs > 0).sum() / (n_nodes * (n_nodes - 1))
+                if n_nodes > 1
+                else np.nan
+            ),
+            "mean_degree": self.degree[active].mean() if n_nodes else np.nan,
+            "max_degree": int(self.degree.max()) if n_nodes else 0,
+        }
+
+
+def _edge_coordinates(edges, axis):
+    if axis not in SNAPSHOT_AXES:
+        raise ValueError(f"axis={axis}, must be in {SNAPSHOT_AXES}!")
+    if axis == "setting":
+        coordinates = edges["setting"].values
+    else:
+        coordinates = np.concatenate([[0], np.cumsum(edges["n_lines"].values)[:-1]])
+    if np.any(np.diff(coordinates) < 0):
+        raise ValueError("Edges must be sorted in text order!")
+    return coordinates
+
+
+def iter_snapshots(edges, size, step=None, axis="setting", statistics=False):
+    """Slide a window over a hg-speech-mwd edge table and lazily yield one
+    snapshot per window position.
+
+    Parameters
+    ----------
+    edges : pd.DataFrame
+        Edge table as returned by `get_multi_directed_hypergraph_edges`
+        or loaded from a `hg-speech-mwd.edges.csv` file, in text order.
+
+    size : int
+        Width of the window, in settings or in lines (see `axis`).
+
+    step : None or int
+        Offset between consecutive windows (default: `size`, i.e.,
+        non-overlapping windows).
+
+    axis : str
+        "setting" to place edges by their setting, or "lines" to place
+        them by the number of lines spoken before them; a window
+        [lo, lo + size) contains all edges placed in it.
+
+    statistics : bool
+        If True, yield dictionaries of window statistics (see
+        `SlidingWindow.statistics`) instead of compact hypergraphs.
+
+    Yields
+    ------
+    tuple
+        (lo, hi, snapshot) for every window [lo, hi), where snapshot is
+        a CompactHypergraph or a dictionary of statistics.
+    """
+    step = size if step is None else step
+    if size <= 0 or step <= 0:
+        raise ValueError(f"size={size}, step={step}, must be positive!")
+    coordinates = _edge_coordinates(edges, axis)
+    window = SlidingWindow(edges)
+    if not len(coordinates):
+        return
+    lo = coordinates[0]
+    while lo <= coordinates[-1]:
+        hi = lo + size
+        window.move(
+            int(np.searchsorted(coordinates, lo, side="left")),
+            int(np.searchsorted(coordinates, hi, side="left")),
+        )
+        yield lo, hi, window.statistics() if statistics else window.snapshot()
+        lo += step
+
+
+def get_snapshot_statistics(edges, size, step=None, axis="setting"):
+    """
+    Compute the statistics of all windows of a hg-speech-mwd edge table, see iter_snapshots.
+
+    :param edges: pd.DataFrame as returned by get_multi_directed_hypergraph_edges
+    :param size: width of the window, in settings or in lines
+    :param step: offset between consecutive windows (default: size)
+    :param axis: "setting" or "lines"
+    :return: pd.DataFrame with one row per window, with columns lo, hi, and the statistics
+    """
+    return pd.DataFrame(
+        [
+            {"lo": lo, "hi": hi, **stats}
+            for lo, hi, stats in iter_snapshots(
+                edges, size, step=step, axis=axis, statistics=True
+            )
+        ]
+    )
@@ -1,19 +1,274 @@
+"""Profiling of the stages of the pipeline.
+
+A run (e.g., one invocation of a script) is a tree of nested spans, such
+as run -> play -> representation. For every span, a `Profiler` appends a
+JSON-lines record with the run identifier, the span and parent
+identifiers, the span path, attributes (e.g., the play, which children
+inherit), the wall and CPU time, the net number of allocated memory
+blocks, and the peak resident set size of the process so far. Spans
+opened outside of a run record nothing, so library code can open spans
+freely; spans of worker processes join the run of their parent.
+
+Optionally, spans can be captured with cProfile (stats written next to
+the records) or tracemalloc (peak traced memory and top allocation sites).
+Captures are switched on per stage name (or "all") via the environment
+variables HYPERBARD_CPROFILE and HYPERBARD_TRACEMALLOC (comma-separated),
+or via the command line options added by `add_profiler_arguments`.
+
+`timeit` remains available as decorator for whole functions.
+"""
+
+import cProfile
+import datetime
+import functools
+import inspect
+import json
 import os
+import sys
 import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
 
 from hyperbard.statics import RESOURCE_USAGE_PATH
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+PROFILE_FILE = f"{RESOURCE_USAGE_PATH}/profile.jsonl"
+RUN_ID_VARIABLE = "HYPERBARD_RUN_ID"
+CPROFILE_VARIABLE = "HYPERBARD_CPROFILE"
+TRACEMALLOC_VARIABLE = "HYPERBARD_TRACEMALLOC"
+
+
+def _stages_from_environment(variable):
+    return {stage for stage in os.environ.get(variable, "").split(",") if stage}
+
+
+def _peak_rss_mb():
+    """Peak resident set size of the process so far, in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Profiler:
+    """Record nested spans of a run as JSON lines.
+
+    Parameters
+    ----------
+    file : str
+        JSON-lines file to which the records are appended.
+
+    cprofile, tracemalloc : None or iterable
+        Stage names (or "all") to capture with cProfile or tracemalloc;
+        by default taken from the environment variables HYPERBARD_CPROFILE
+        and HYPERBARD_TRACEMALLOC.
+    """
+
+    __slots__ = ("file", "run_id", "cprofile", "tracemalloc", "_stack", "_profiling")
+
+    def __init__(self, file=PROFILE_FILE, cprofile=None, tracemalloc=None):
+        self.file = file
+        self.run_id = None
+        self.cprofile = set(
+            _stages_from_environment(CPROFILE_VARIABLE)
+            if cprofile is None
+            else cprofile
+        )
+        self.tracemalloc = set(
+            _stages_from_environment(TRACEMALLOC_VARIABLE)
+            if tracemalloc is None
+            else tracemalloc
+        )
+        self._stack = []
+        self._profiling = False
+
+    @property
+    def active(self):
+        """Whether a run is in progress."""
+        return bool(self._stack)
+
+    def _captures(self, stages, stage):
+        return "all" in stages or stage in stages
+
+    @contextmanager
+    def run(self, stage, **attributes):
+        """Open the root span of a run (or a nested span within a run).
+
+        The run identifier is shared with worker processes via the
+        environment variable HYPERBARD_RUN_ID.
+        """
+        if self.active:
+            with self.span(stage, **attributes) as record:
+                yield record
+            return
+        inherited = RUN_ID_VARIABLE in os.environ
+        self.run_id = os.environ.get(RUN_ID_VARIABLE) or uuid.uuid4().hex[:12]
+        os.environ[RUN_ID_VARIABLE] = self.run_id
+        try:
+            with self._span(stage, attributes) as record:
+                yield record
+        finally:
+            if not inherited:
+                del os.environ[RUN_ID_VARIABLE]
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """Open a span nested in the current one; a no-op outside of runs.
+
+        In worker processes not forked within a run, the span joins the run
+        of the parent process, if any. Yields the record of the span (or
+        None), to which attributes can be added while the span is open.
+        """
+        if not self.active and RUN_ID_VARIABLE not in os.environ:
+            yield None
+            return
+        if not self.active:
+            with self.run(stage, **attributes) as record:
+                yield record
+            return
+        with self._span(stage, attributes) as record:
+            yield record
+
+    @contextmanager
+    def _span(self, stage, attributes):
+        parent = self._stack[-1] if self._stack else None
+        record = {
+            "run_id": self.run_id,
+            "span_id": uuid.uuid4().hex[:12],
+            "parent_id": None if parent is None else parent["span_id"],
+            "path": stage if parent is None else f"{parent['path']}/{stage}",
+            "stage": stage,
+            "attributes": {
+                **({} if parent is None else parent["attributes"]),
+                **attributes,
+            },
+            "start": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        }
+        profile = None
+        if self._captures(self.cprofile, stage) and not self._profiling:
+            profile = cProfile.Profile()
+            self._profiling = True
+        started_tracing = False
+        if self._captures(self.tracemalloc, stage):
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                # Python 3.9+; before, the peak of a nested span is that
+                # since the outermost captured span started.
+                tracemalloc.reset_peak()
+        self._stack.append(record)
+        blocks = sys.getallocatedblocks()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+            record["status"] = "ok"
+        except BaseException as e:
+            record["status"] = f"error: {type(e).__name__}"
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+            record["wall"] = time.perf_counter() - wall
+            record["cpu"] = time.process_time() - cpu
+            record["allocated_blocks"] = sys.getallocatedblocks() - blocks
+            record["peak_rss_mb"] = _peak_rss_mb()
+            self._stack.pop()
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            if profile is not None:
+                stats_file = os.path.join(
+                    os.path.dirname(self.file),
+                    f"{self.run_id}_{record['span_id']}_{stage}.prof",
+                )
+                profile.dump_stats(stats_file)
+                record["cprofile"] = stats_file
+            if self._captures(self.tracemalloc, stage):
+                snapshot = tracemalloc.take_snapshot()
+                record["tracemalloc_peak_mb"] = (
+                    tracemalloc.get_traced_memory()[1] / 2**20
+                )
+                record["tracemalloc_top"] = [
+                    str(statistic) for statistic in snapshot.statistics("lineno")[:10]
+                ]
+                if started_tracing:
+                    tracemalloc.stop()
+            with open(self.file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            if parent is None:
+                self.run_id = None
+
+
+_PROFILER = Profiler()
+
+
+def get_profiler():
+    """The profiler shared by the modules of a process."""
+    return _PROFILER
+
+
+def run(stage, **attributes):
+    """Open a run with the shared profiler, see `Profiler.run`."""
+    return _PROFILER.run(stage, **attributes)
+
+
+def span(stage, **attributes):
+    """Open a span with the shared profiler, see `Profiler.span`."""
+    return _PROFILER.span(stage, **attributes)
+
+
+def add_profiler_arguments(parser):
+    """Add options to switch on cProfile and tracemalloc captures to an
+    argparse.ArgumentParser."""
+    parser.add_argument(
+        "--cprofile",
+        nargs="*",
+        default=[],
+        metavar="STAGE",
+        help='Stages to capture with cProfile ("all" for all stages)',
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        nargs="*",
+        default=[],
+        metavar="STAGE",
+        help='Stages to capture with tracemalloc ("all" for all stages)',
+    )
+
+
+def configure_profiler(args):
+    """Switch on the captures requested via `add_profiler_arguments`, also
+    for worker processes started later on."""
+    _PROFILER.cprofile.update(args.cprofile)
+    _PROFILER.tracemalloc.update(args.tracemalloc)
+    os.environ[CPROFILE_VARIABLE] = ",".join(sorted(_PROFILER.cprofile))
+    os.environ[TRACEMALLOC_VARIABLE] = ",".join(sorted(_PROFILER.tracemalloc))
+
 
 def timeit(method):
-    os.makedirs(RESOURCE_USAGE_PATH, exist_ok=True)
+    """Decorator profiling every call of a function as a span (opening a run
+    if none is in progress), and writing its wall time to
+    RESOURCE_USAGE_PATH/<function name>.txt."""
 
+    @functools.wraps(method)
     def timed(*args, **kw):
-        start = time.time()
-        result = method(*args, **kw)
-        finish = time.time()
+        with run(method.__name__) as record:
+            result = method(*args, **kw)
+        os.makedirs(RESOURCE_USAGE_PATH, exist_ok=True)
         timefile = f"{RESOURCE_USAGE_PATH}/{method.__name__}.txt"
         with open(timefile, "w") as f:
-            f.write(f"{os.path.basename(__file__)}, {finish - start}")
+            f.write(
+                f"{os.path.basename(inspect.getsourcefile(method))}, {record['wall']}"
+            )
         return result
 
     return timed
@@ -1,4 +1,6 @@
+import hashlib
 import os
+import weakref
 from typing import Iterable, List, Union
 
 import pandas as pd
@@ -85,3 +87,39 @@ def string_to_set(character_string: Union[str, float]) -> Union[set, float]:
         if not pd.isna(character_string)
         else character_string
     )
+
+
+_FRAME_CACHES = {}
+
+
+def _content_hash(df: pd.DataFrame) -> str:
+    """Hash of the index, columns, dtypes, and values of a pd.DataFrame."""
+    try:
+        rows = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:
+        # Unhashable cells, e.g., sets, are hashed by their string representation.
+        rows = pd.util.hash_pandas_object(df.astype(str), index=True)
+    digest = hashlib.blake2b(rows.values.tobytes(), digest_size=16)
+    digest.update(repr((list(df.columns), list(map(str, df.dtypes)))).encode())
+    return digest.hexdigest()
+
+
+def get_frame_cache(df: pd.DataFrame) -> dict:
+    """
+    Get a dictionary for memoizing data derived from a pd.DataFrame, e.g., the
+    representations of a play computed from its .agg.csv file.
+    The cache lives as long as the pd.DataFrame object and is keyed by a hash of
+    its content, so it is reset by any modification of the pd.DataFrame, including
+    in-place edits of single values.
+
+    :param df: pd.DataFrame to which the cached data belongs
+    :return: Dictionary specific to the given pd.DataFrame object and its content
+    """
+    key = id(df)
+    signature = _content_hash(df)
+    if key not in _FRAME_CACHES:
+        _FRAME_CACHES[key] = (signature, {})
+        weakref.finalize(df, _FRAME_CACHES.pop, key, None)
+    elif _FRAME_CACHES[key][0] != signature:
+        _FRAME_CACHES[key] = (signature, {})
+    return _FRAME_CACHES[key][1]
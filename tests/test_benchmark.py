@@ -0,0 +1,81 @@
+import os
+import tempfile
+from unittest import mock
+
+from hyperbard.benchmark import (
+    BENCHMARK_STAGES,
+    append_history,
+    benchmark_file,
+    compare_runs,
+    get_cases,
+    load_history,
+    scale_play,
+)
+from hyperbard.create_hypergraph_representations import (
+    DIRECTED_EXPANSIONS,
+    UNDIRECTED_EXPANSIONS,
+)
+from hyperbard.hypergraph_representations import _membership_table
+from hyperbard.preprocessing import get_agg_xml_df, get_raw_xml_df
+from tests.xml_testcase import XMLTestCase
+
+
+class BenchmarkTest(XMLTestCase):
+    def test_benchmark_file(self):
+        results = benchmark_file(self.toy_xml_file, repeat=1)
+        self.assertListEqual([r["stage"] for r in results], BENCHMARK_STAGES)
+        self.assertTrue(all(r["min"] <= r["median"] for r in results))
+
+    def test_benchmark_file_fresh_inputs(self):
+        # Every timed call of the hypergraph constructors and of
+        # get_hypergraph_nodes builds the membership table, none hits the
+        # frame cache.
+        with mock.patch(
+            "hyperbard.hypergraph_representations._membership_table",
+            wraps=_membership_table,
+        ) as membership_table:
+            benchmark_file(self.toy_xml_file, repeat=2)
+        n_timed = len(UNDIRECTED_EXPANSIONS) + len(DIRECTED_EXPANSIONS) + 1
+        self.assertGreaterEqual(membership_table.call_count, 2 * n_timed)
+
+    def test_get_cases(self):
+        with tempfile.TemporaryDirectory() as path:
+            cases = get_cases(False, [], [2], [], path)
+            self.assertListEqual(list(cases), ["toy", "toy-x2"])
+            toy_df = get_agg_xml_df(get_raw_xml_df(cases["toy"]))
+            self.assertEqual(toy_df.act.nunique(), 2)
+            results = benchmark_file(cases["toy"], repeat=1)
+        self.assertListEqual([r["stage"] for r in results], BENCHMARK_STAGES)
+
+    def test_scale_play(self):
+        with tempfile.TemporaryDirectory() as path:
+            scaled_file = os.path.join(path, "toy-x3.xml")
+            scale_play(self.toy_xml_file, 3, scaled_file)
+            scaled_df = get_agg_xml_df(get_raw_xml_df(scaled_file))
+        agg_df = get_agg_xml_df(get_raw_xml_df(self.toy_xml_file))
+        self.assertEqual(len(scaled_df), 3 * len(agg_df))
+        self.assertListEqual(sorted(scaled_df.act.unique()), [1, 2, 3])
+        self.assertEqual(scaled_df.n_tokens.sum(), 3 * agg_df.n_tokens.sum())
+
+    def test_compare_runs(self):
+        baseline = {
+            "results": [
+                {"case": "toy", "stage": "get_soup", "min": 0.1},
+                {"case": "toy", "stage": "set_onstage", "min": 0.1},
+                {"case": "toy", "stage": "get_xml_df", "min": 0.0001},
+            ]
+        }
+        run = {
+            "results": [
+                {"case": "toy", "stage": "get_soup", "min": 0.11},
+                {"case": "toy", "stage": "set_onstage", "min": 0.2},
+                {"case": "toy", "stage": "get_xml_df", "min": 0.0003},
+            ]
+        }
+        comparison = compare_runs(run, baseline)
+        self.assertListEqual(comparison.regression.tolist(), [False, True, False])
+        with tempfile.TemporaryDirectory() as path:
+            file = os.path.join(path, "benchmarks.json")
+            append_history(baseline, file)
+            append_history(run, file)
+            self.assertListEqual(load_history(file), [baseline, run])
@@ -0,0 +1,83 @@
+import networkx as nx
+import numpy as np
+
+from hyperbard.centrality import (
+    CENTRALITY_REPRESENTATIONS,
+    batch_hypergraph_pagerank,
+    get_centrality_matrix,
+    graph_centrality,
+    hypergraph_pagerank,
+    hypergraph_transition_matrix,
+    node_in_edge_weights,
+)
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.graph_representations import get_count_weighted_graph
+from hyperbard.hypergraph_representations import get_hypergraph_edges
+from hyperbard.ranking import get_character_ranking
+from tests.xml_testcase import XMLTestCase
+
+
+class CentralityTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.G = get_count_weighted_graph(self.toy_agg_df, ["act", "scene"])
+
+    def test_graph_centrality(self):
+        for centrality, reference in [
+            ("eigenvector", nx.eigenvector_centrality_numpy(self.G, weight="count")),
+            ("pagerank", nx.pagerank(self.G, weight="count", tol=1e-12)),
+        ]:
+            values = graph_centrality(self.G, centrality, weight="count")
+            for node, value in reference.items():
+                self.assertAlmostEqual(values[node], value, places=8)
+
+    def test_get_centrality_matrix(self):
+        for centrality in ["eigenvector", "pagerank", "katz"]:
+            values = get_centrality_matrix(self.toy_agg_df, centrality)
+            self.assertEqual(values.shape, (8, len(CENTRALITY_REPRESENTATIONS)))
+            self.assertFalse(values.isna().any().any())
+            reference = graph_centrality(self.G, centrality)
+            np.testing.assert_allclose(
+                values["ce-scene-b"].values,
+                [reference[node] for node in values.index],
+                atol=1e-8,
+            )
+
+    def test_get_character_ranking(self):
+        ranking = get_character_ranking(
+            [
+                {"name": "00-ce-scene-b", "graph": self.G},
+                {"name": "01-pagerank", "graph": self.G, "centrality": "pagerank"},
+            ]
+        )
+        self.assertListEqual(list(ranking.columns), ["ce-scene-b", "pagerank"])
+        self.assertEqual(ranking.at["#Philostrate_MND", "pagerank"], 8)
+        self.assertEqual(ranking.at["#Theseus_MND", "pagerank"], 1)
+
+    def test_hypergraph_pagerank(self):
+        edges, node_weights = get_hypergraph_edges(
+            self.toy_agg_df, ["act", "scene", "stagegroup"]
+        )
+        H = CompactHypergraph.from_edges(edges)
+        weights = node_in_edge_weights(H, node_weights)
+        self.assertEqual(len(weights), len(H.indices))
+        P = hypergraph_transition_matrix(H, "n_lines", weights)
+        np.testing.assert_allclose(P.sum(axis=1), 1)
+        pagerank = hypergraph_pagerank(H, node_weights=node_weights)
+        self.assertAlmostEqual(sum(pagerank.values()), 1)
+        uniform = hypergraph_pagerank(H)
+        self.assertAlmostEqual(uniform["#Theseus_MND"], uniform["#ATTENDANTS_MND"])
+        # Characters who speak more in an edge are more likely to be walked to.
+        self.assertGreater(pagerank["#Theseus_MND"], pagerank["#ATTENDANTS_MND"])
+        onstage = hypergraph_pagerank(
+            H, node_weights=node_weights, node_weight="n_lines_onstage"
+        )
+        for node, value in uniform.items():
+            self.assertAlmostEqual(onstage[node], value)
+        batch = batch_hypergraph_pagerank({"a": H, "b": (H, node_weights)})
+        for node, value in pagerank.items():
+            self.assertAlmostEqual(batch["b"][node], value)
+        self.assertDictEqual(
+            graph_centrality(H, "hypergraph_pagerank", weight="n_lines"),
+            batch["a"].to_dict(),
+        )
@@ -0,0 +1,55 @@
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.graph_io import hypergraph_from_edges
+from hyperbard.hypergraph_representations import get_hypergraph_edges
+from hyperbard.ranking import s_degree
+from tests.xml_testcase import XMLTestCase
+
+
+class CompactHypergraphTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.edges, _ = get_hypergraph_edges(
+            self.toy_agg_df, ["act", "scene", "stagegroup"]
+        )
+        self.H = CompactHypergraph.from_edges(self.edges)
+
+    def test_from_edges(self):
+        self.assertEqual(self.H.shape, (8, 4))
+        self.assertListEqual(list(self.H.edge_sizes()), [3, 4, 7, 7])
+        self.assertEqual(self.H.edges[1].n_lines, 5)
+        self.assertListEqual(
+            self.H.members(0), ["#ATTENDANTS_MND", "#Philostrate_MND", "#Theseus_MND"]
+        )
+        self.assertListEqual(self.H.memberships("#Hippolyta_MND"), [1, 2, 3])
+
+    def test_degree(self):
+        self.assertEqual(self.H.degree()["#Theseus_MND"], 4)
+        self.assertEqual(self.H.degree(weight="n_lines")["#Theseus_MND"], 14)
+        self.assertEqual(self.H.s_degree(s=4, weight="n_lines")["#Theseus_MND"], 8)
+        self.assertEqual(
+            self.H.s_degree(s=4, weight="n_lines", superlevel=False)["#Theseus_MND"],
+            11,
+        )
+
+    def test_s_degree_matches_hnx(self):
+        H = hypergraph_from_edges(self.edges)
+        for s in range(1, 8):
+            for superlevel in [True, False]:
+                expected = s_degree(H, s=s, weight="n_lines", superlevel=superlevel)
+                actual = s_degree(self.H, s=s, weight="n_lines", superlevel=superlevel)
+                self.assertDictEqual(expected, actual)
+
+    def test_restrict_and_dual(self):
+        restricted = self.H.restrict_to_edges([0, 1])
+        self.assertEqual(restricted.shape, (4, 2))
+        restricted = self.H.restrict_to_nodes(["#Egeus_MND", "#Philostrate_MND"])
+        self.assertEqual(restricted.shape, (2, 4))
+        dual = self.H.dual()
+        self.assertEqual(dual.shape, (4, 8))
+        self.assertListEqual(dual.members("#Hippolyta_MND"), [1, 2, 3])
+        self.assertDictEqual(dual.dual().setsystem(), self.H.setsystem())
+
+    def test_to_hnx(self):
+        H = self.H.to_hnx()
+        self.assertEqual(H.shape, (8, 4))
+        self.assertEqual(H.edges[1].n_lines, 5)
@@ -0,0 +1,34 @@
+from hyperbard.copresence import CorpusCopresenceIndex, get_copresence_index
+from tests.xml_testcase import XMLTestCase
+
+
+class CopresenceTest(XMLTestCase):
+    def test_get_copresence_index(self):
+        index = get_copresence_index(self.toy_agg_df)
+        self.assertIs(index, get_copresence_index(self.toy_agg_df))
+        self.assertEqual(index.n_units, 5)
+        found = index.find(all_of=["#Hermia_MND", "#Theseus_MND"])
+        self.assertListEqual(found.setting.tolist(), [3, 4, 5])
+        self.assertEqual(
+            index.count(all_of=["#Theseus_MND"], none_of=["#Hermia_MND"]), 2
+        )
+        self.assertEqual(
+            index.count(any_of=["#Egeus_MND", "#Hippolyta_MND"], role="speaker"), 3
+        )
+        self.assertEqual(index.count(all_of=["#Oberon_MND"]), 0)
+        counts = index.intersection_counts()
+        self.assertEqual(counts.loc["#Theseus_MND", "#Theseus_MND"], 5)
+        self.assertEqual(counts.loc["#Hermia_MND", "#Philostrate_MND"], 0)
+        scenes = get_copresence_index(self.toy_agg_df, level="scene")
+        self.assertEqual(len(scenes.find(all_of=["#Hippolyta_MND", "#Egeus_MND"])), 2)
+        with self.assertRaises(ValueError):
+            get_copresence_index(self.toy_agg_df, level="act")
+
+    def test_corpus_copresence_index(self):
+        corpus = CorpusCopresenceIndex(
+            {"mnd": self.toy_agg_df, "empty": self.toy_agg_df.head(1)}
+        )
+        counts = corpus.count(all_of=["#Hermia_MND"])
+        self.assertDictEqual(counts.to_dict(), {"mnd": 3})
+        found = corpus.find(all_of=["#Theseus_MND"])
+        self.assertListEqual(found.play.tolist(), ["mnd"] * 5 + ["empty"])
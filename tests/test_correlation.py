@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import numpy as np
+
+from hyperbard.correlation import (
+    CORRELATION_METHODS,
+    get_correlations,
+    get_file_correlations,
+)
+from hyperbard.ranking import get_character_ranking_df
+from tests.xml_testcase import XMLTestCase
+
+
+class CorrelationTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.ranking = get_character_ranking_df(self.toy_agg_df)
+        self.ranking.iloc[0, 3] = np.nan
+
+    def test_get_correlations(self):
+        rankings = {"a": self.ranking, "b": self.ranking.iloc[:5]}
+        for method in CORRELATION_METHODS:
+            correlations = get_correlations(rankings, method)
+            for play, ranking in rankings.items():
+                np.testing.assert_allclose(
+                    correlations[play].values, ranking.corr(method).values
+                )
+
+    def test_get_file_correlations(self):
+        with tempfile.TemporaryDirectory() as path:
+            file = os.path.join(path, "toy_ranking.csv")
+            self.ranking.to_csv(file)
+            correlations = get_file_correlations([file], "kendall", cache_path=path)
+            self.assertTrue(
+                os.path.exists(os.path.join(path, "rank-correlations_kendall.npz"))
+            )
+            cached = get_file_correlations([file], "kendall", cache_path=path)
+            np.testing.assert_array_equal(
+                cached["toy"].values, correlations["toy"].values
+            )
+            self.assertListEqual(list(cached["toy"].columns), list(self.ranking))
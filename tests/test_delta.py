@@ -0,0 +1,56 @@
+from io import StringIO
+
+import pandas as pd
+
+from hyperbard.create_graph_representations import (
+    NODE_DTYPES,
+    get_graph_tables,
+    patch_graph_tables,
+)
+from hyperbard.create_hypergraph_representations import (
+    get_hypergraph_tables,
+    patch_hypergraph_tables,
+)
+from hyperbard.delta import get_changed_units
+from tests.xml_testcase import XMLTestCase
+
+
+def _round_trip(tables):
+    return {
+        suffix: pd.read_csv(StringIO(table.to_csv(index=False)), dtype=NODE_DTYPES)
+        for suffix, table in tables.items()
+    }
+
+
+class DeltaTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.edited_df = self.toy_agg_df.copy()
+        last = self.edited_df.index[-1]
+        self.edited_df.loc[last, "n_lines"] += 1
+        self.edited_df.loc[last, "onstage"] += " #Puck_MND"
+
+    def test_get_changed_units(self):
+        changed = get_changed_units(self.toy_agg_df, self.edited_df)
+        self.assertEqual(len(changed), 1)
+        self.assertListEqual(
+            changed.iloc[0].tolist(),
+            self.toy_agg_df[["act", "scene", "stagegroup"]].iloc[-1].tolist(),
+        )
+        self.assertEqual(len(get_changed_units(self.toy_agg_df, self.toy_agg_df)), 0)
+
+    def test_patch_tables(self):
+        for get_tables, patch_tables in [
+            (get_graph_tables, patch_graph_tables),
+            (get_hypergraph_tables, patch_hypergraph_tables),
+        ]:
+            tables = _round_trip(get_tables(self.toy_agg_df))
+            patched = patch_tables(tables, self.toy_agg_df, self.edited_df)
+            expected = get_tables(self.edited_df)
+            self.assertListEqual(list(patched), list(expected))
+            for suffix, table in expected.items():
+                self.assertEqual(
+                    patched[suffix].to_csv(index=False),
+                    table.to_csv(index=False),
+                    suffix,
+                )
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from hyperbard.create_hypergraph_representations import get_hypergraph_tables
+from hyperbard.event_log import EventLog, get_event_log
+from hyperbard.preprocessing import get_agg_xml_df, get_raw_xml_df
+from tests.xml_testcase import XMLTestCase
+
+
+class EventLogTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.raw_df = get_raw_xml_df(self.toy_xml_file)
+        self.log = get_event_log(self.raw_df)
+
+    def test_get_event_log(self):
+        events = self.log.to_frame()
+        self.assertListEqual(
+            events.kind.tolist()[:4], ["act", "scene", "group", "enter"]
+        )
+        # Only characters onstage during spoken lines are recorded.
+        self.assertEqual(len(self.log.characters), 4)
+        agg_df = get_agg_xml_df(self.raw_df)
+        self.assertEqual(
+            events[events.kind == "lines"]["count"].sum(), agg_df.n_lines.sum()
+        )
+        pd.testing.assert_frame_equal(self.log.replay(), agg_df)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as path:
+            file = os.path.join(path, "mnd.events.npz")
+            self.log.save(file)
+            loaded = EventLog.load(file)
+        replayed = loaded.replay()
+        pd.testing.assert_frame_equal(replayed, self.log.replay())
+        tables = get_hypergraph_tables(replayed)
+        for suffix, table in get_hypergraph_tables(get_agg_xml_df(self.raw_df)).items():
+            pd.testing.assert_frame_equal(tables[suffix], table)
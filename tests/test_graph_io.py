@@ -0,0 +1,81 @@
+import hypernetx as hnx
+import numpy as np
+
+from hyperbard.graph_io import (
+    hypergraph_from_edges,
+    hypergraph_from_incidence_matrix,
+    hypergraph_from_setsystem,
+)
+from hyperbard.hypergraph_representations import get_hypergraph_edges
+from tests.xml_testcase import XMLTestCase
+
+
+class GraphIOTest(XMLTestCase):
+    def test_hypergraph_from_edges(self):
+        edges, _ = get_hypergraph_edges(self.toy_agg_df, ["act", "scene"])
+        H = hypergraph_from_edges(edges)
+        self.assertEqual(H.shape, (8, 3))
+        self.assertEqual(len(H.edges[0]), 4)
+        self.assertEqual(H.edges[0].n_lines, 11)
+        self.assertEqual(H.edges[2].act, 2)
+        self.assertEqual(set(H.nodes["#Philostrate_MND"].memberships), {0})
+        self.assertEqual(H.degree("#Theseus_MND"), 3)
+
+    def test_hypergraph_from_setsystem(self):
+        H = hypergraph_from_setsystem(
+            {"e1": ["#A", "#B"], "e2": "#B #C"}, edge_attributes={"n_lines": [3, 4]}
+        )
+        self.assertEqual(H.incidence_dict, {"e1": {"#A", "#B"}, "e2": {"#B", "#C"}})
+        self.assertEqual(H.edges["e2"].n_lines, 4)
+        self.assertEqual(set(H.nodes["#B"].memberships), {"e1", "e2"})
+        self.assertEqual(H.restrict_to_edges(["e1"]).shape, (2, 1))
+
+    def test_hypergraph_from_setsystem_matches_hypernetx(self):
+        edges, _ = get_hypergraph_edges(self.toy_agg_df, ["act", "scene", "stagegroup"])
+        setsystem = {idx: onstage.split() for idx, onstage in enumerate(edges.onstage)}
+        H = hypergraph_from_setsystem(setsystem, name="toy")
+        expected = hnx.Hypergraph(setsystem, name="toy")
+        self.assertEqual(H.name, expected.name)
+        self.assertEqual(H.shape, expected.shape)
+        self.assertEqual(H.incidence_dict, expected.incidence_dict)
+        self.assertEqual(
+            [edge.uid for edge in H.edges()], [edge.uid for edge in expected.edges()]
+        )
+        self.assertEqual(H.number_of_nodes(), expected.number_of_nodes())
+        self.assertEqual(H.number_of_edges(), expected.number_of_edges())
+        self.assertEqual(
+            {edge: H.size(H.edges[edge]) for edge in setsystem},
+            {edge: expected.size(expected.edges[edge]) for edge in setsystem},
+        )
+        for node in expected.nodes:
+            self.assertEqual(
+                set(H.nodes[node].memberships), set(expected.nodes[node].memberships)
+            )
+            self.assertEqual(H.degree(node), expected.degree(node))
+            self.assertEqual(H.degree(node, s=2), expected.degree(node, s=2))
+        matrix, rows, columns = H.incidence_matrix(index=True)
+        expected_matrix, expected_rows, expected_columns = expected.incidence_matrix(
+            index=True
+        )
+        self.assertEqual(
+            {(rows[i], columns[j]) for i, j in zip(*matrix.nonzero())},
+            {
+                (expected_rows[i], expected_columns[j])
+                for i, j in zip(*expected_matrix.nonzero())
+            },
+        )
+        self.assertEqual(set(H.bipartite().edges()), set(expected.bipartite().edges()))
+        self.assertEqual(
+            H.restrict_to_edges([0, 2]).incidence_dict,
+            expected.restrict_to_edges([0, 2]).incidence_dict,
+        )
+        with self.assertRaises(ValueError):
+            hypergraph_from_setsystem(setsystem, edge_attributes={"n_lines": [1]})
+
+    def test_hypergraph_from_incidence_matrix(self):
+        incidence = np.array([[1, 0], [1, 1], [0, 1]])
+        H = hypergraph_from_incidence_matrix(
+            incidence, ["#A", "#B", "#C"], edge_attributes={"n_lines": [3, 4]}
+        )
+        self.assertEqual(H.incidence_dict, {0: {"#A", "#B"}, 1: {"#B", "#C"}})
+        self.assertEqual(H.edges[1].n_lines, 4)
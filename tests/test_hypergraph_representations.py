@@ -0,0 +1,53 @@
+from hyperbard.hypergraph_representations import (
+    get_hypergraph_edges,
+    get_hypergraph_nodes,
+    get_membership_table,
+)
+from tests.xml_testcase import XMLTestCase
+
+
+class HypergraphRepresentationsTest(XMLTestCase):
+    def test_get_hypergraph_nodes(self):
+        nodes = get_hypergraph_nodes(self.toy_agg_df).set_index("node")
+        self.assertEqual(len(nodes), 8)
+        self.assertListEqual(
+            list(nodes.columns),
+            [
+                "n_tokens_onstage",
+                "n_tokens_speaker",
+                "n_lines_onstage",
+                "n_lines_speaker",
+            ],
+        )
+        self.assertListEqual(
+            list(nodes.loc["#Theseus_MND"]),
+            [99, 51, 14, 7],
+        )
+        self.assertListEqual(list(nodes.loc["#Egeus_MND"]), [21, 13, 3, 2])
+        self.assertListEqual(list(nodes.loc["#Philostrate_MND"]), [78, 0, 11, 0])
+
+    def test_get_membership_table(self):
+        membership = get_membership_table(self.toy_agg_df)
+        self.assertEqual(len(membership), 28 + 5)
+        self.assertEqual(len(membership.query("role == 'speaker'")), 5)
+        self.assertListEqual(
+            list(membership.query("row == 0 and role == 'onstage'").node),
+            ["#ATTENDANTS_MND", "#Philostrate_MND", "#Theseus_MND"],
+        )
+        self.assertEqual(
+            membership.query(
+                "node == '#Egeus_MND' and role == 'speaker'"
+            ).n_lines.sum(),
+            2,
+        )
+        self.assertIs(get_membership_table(self.toy_agg_df), membership)
+
+    def test_in_place_modification(self):
+        df = self.toy_agg_df.copy()
+        edges, _ = get_hypergraph_edges(df, ["act", "scene"])
+        self.assertNotIn("#Puck_MND", edges.onstage.iloc[-1])
+        df.loc[df.index[-1], "onstage"] += " #Puck_MND"
+        edges, _ = get_hypergraph_edges(df, ["act", "scene"])
+        expected, _ = get_hypergraph_edges(df.copy(), ["act", "scene"])
+        self.assertIn("#Puck_MND", edges.onstage.iloc[-1])
+        self.assertListEqual(list(edges.onstage), list(expected.onstage))
@@ -0,0 +1,16 @@
+from hyperbard.incidence import get_play_incidence
+from tests.xml_testcase import XMLTestCase
+
+
+class IncidenceTest(XMLTestCase):
+    def test_get_play_incidence(self):
+        incidence = get_play_incidence(self.toy_agg_df)
+        self.assertIs(incidence, get_play_incidence(self.toy_agg_df))
+        self.assertEqual(len(incidence.characters), 8)
+        self.assertListEqual(list(incidence["scene"].sizes), [4, 7, 7])
+        self.assertListEqual(list(incidence["group"].sizes), [3, 4, 7, 7])
+        self.assertListEqual(list(incidence["group"].units.n_lines), [6, 5, 2, 1])
+        speech = incidence["speech"]
+        self.assertEqual(speech.onstage.shape, (8, 5))
+        self.assertEqual(speech.speaker.sum(), 5)
+        self.assertEqual(speech.listener.sum(), speech.onstage.sum() - 5)
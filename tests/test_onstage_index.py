@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from hyperbard.onstage_index import OnstageIntervalIndex, get_onstage_interval_index
+from hyperbard.preprocessing import get_raw_xml_df
+from tests.xml_testcase import XMLTestCase
+
+
+class OnstageIndexTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.raw_df = get_raw_xml_df(self.toy_xml_file)
+        self.index = get_onstage_interval_index(self.raw_df)
+
+    def test_get_onstage_interval_index(self):
+        self.assertEqual(self.index.prefix, "fs-mnd-")
+        self.assertEqual(len(self.index), 2)
+        tokens = self.raw_df[
+            self.raw_df["xml:id"].fillna("").str.startswith(self.index.prefix)
+        ]
+        for xml_id, onstage in zip(tokens["xml:id"], tokens.onstage):
+            self.assertListEqual(self.index.onstage_at(xml_id), onstage.split())
+        # The stage direction moved in from 1.2 keeps its place in the runs.
+        self.assertListEqual(
+            self.index.onstage_at("fs-mnd-0057740"),
+            self.index.onstage_at("fs-mnd-0000070"),
+        )
+        self.assertTupleEqual(
+            self.index.line_range("1.1.12"), ("fs-mnd-0001850", "fs-mnd-0001890")
+        )
+        self.assertIn("#Hermia_MND", self.index.onstage_at_line("SD 1.1.20.1"))
+        self.assertNotIn("#Hermia_MND", self.index.onstage_at_line("1.1.12"))
+        runs = self.index.runs_between("fs-mnd-0000250", "fs-mnd-0003120")
+        self.assertListEqual(runs.start.tolist(), ["fs-mnd-0000250", "fs-mnd-0003100"])
+        self.assertListEqual(runs.end.tolist(), ["fs-mnd-0001890", "fs-mnd-0003120"])
+        self.assertEqual(
+            len(self.index.onstage_between("fs-mnd-0000250", "fs-mnd-0003120")), 8
+        )
+        for xml_id in ["stg-0000", "fs-mnd-9999999", "fs-mnd-", None]:
+            with self.assertRaises(ValueError):
+                self.index.onstage_at(xml_id)
+        with self.assertRaises(ValueError):
+            self.index.runs_between("fs-mnd-0003120", "fs-mnd-0000250")
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as path:
+            file = os.path.join(path, "mnd.onstage.npz")
+            self.index.save(file)
+            loaded = OnstageIntervalIndex.load(file)
+        self.assertEqual(loaded.xml_id(0), "fs-mnd-0000070")
+        self.assertListEqual(
+            loaded.onstage_between("fs-mnd-0000070", "fs-mnd-0003300"),
+            self.index.onstage_between("fs-mnd-0000070", "fs-mnd-0003300"),
+        )
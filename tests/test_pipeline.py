@@ -0,0 +1,195 @@
+import os
+import tempfile
+import unittest
+from glob import glob
+
+from hyperbard.pipeline import BLOCKED, FAILED, FRESH, RAN, STAGES, Pipeline, Stage
+
+# Actions run in worker processes, so they are module-level and find their
+# directory via a global set before the pool is created.
+PATH = None
+
+
+def _file(name):
+    return os.path.join(PATH, name)
+
+
+def copy(play, force):
+    if play == "bad":
+        raise ValueError(play)
+    with open(_file(f"{play}.in")) as f, open(_file(f"{play}.out"), "w") as g:
+        g.write(f.read())
+
+
+def count(play, force):
+    with open(_file(f"{play}.out")) as f:
+        content = str(len(f.read()))
+    # Like write_if_changed, keep the file if its content is the same.
+    if os.path.exists(_file(f"{play}.count")):
+        with open(_file(f"{play}.count")) as f:
+            if f.read() == content:
+                return
+    with open(_file(f"{play}.count"), "w") as f:
+        f.write(content)
+
+
+def summarize(play, force):
+    with open(_file("summary"), "w") as f:
+        f.write(str(len(glob(_file("*.count")))))
+
+
+def get_stages():
+    return [
+        Stage(
+            "copy",
+            [],
+            copy,
+            lambda play: [_file(f"{play}.in")],
+            lambda play: [_file(f"{play}.out")],
+        ),
+        Stage(
+            "count",
+            ["copy"],
+            count,
+            lambda play: [_file(f"{play}.out")],
+            lambda play: [_file(f"{play}.count")],
+        ),
+        Stage(
+            "summary",
+            ["count"],
+            summarize,
+            lambda play: sorted(glob(_file("*.count"))),
+            lambda play: [_file("summary")],
+            per_play=False,
+        ),
+    ]
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        global PATH
+        self.directory = tempfile.TemporaryDirectory()
+        PATH = self.directory.name
+        self.plays = ["a", "b", "c"]
+        for play in self.plays + ["bad"]:
+            with open(_file(f"{play}.in"), "w") as f:
+                f.write(play)
+        self.state_file = _file("state.json")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def get_pipeline(self):
+        return Pipeline(get_stages(), self.state_file)
+
+    def test_get_tasks(self):
+        pipeline = self.get_pipeline()
+        tasks = pipeline.get_tasks(["a", "b"])
+        self.assertListEqual(
+            list(tasks),
+            [
+                ("copy", "a"),
+                ("copy", "b"),
+                ("count", "a"),
+                ("count", "b"),
+                ("summary", None),
+            ],
+        )
+        self.assertListEqual(tasks[("count", "b")], [("copy", "b")])
+        self.assertListEqual(tasks[("summary", None)], [("count", "a"), ("count", "b")])
+        self.assertListEqual(pipeline.get_stages(["count"]), ["copy", "count"])
+        tasks = pipeline.get_tasks(["a"], ["summary"], upstream=False)
+        self.assertDictEqual(dict(tasks), {("summary", None): []})
+        with self.assertRaises(ValueError):
+            pipeline.get_stages(["unknown"])
+        with self.assertRaises(ValueError):
+            Pipeline(get_stages()[::-1], self.state_file)
+
+    def test_run(self):
+        for processes in [1, 2]:
+            with self.subTest(processes=processes):
+                for file in glob(_file("*.out")) + glob(_file("*.count")):
+                    os.remove(file)
+                if os.path.exists(self.state_file):
+                    os.remove(self.state_file)
+                pipeline = self.get_pipeline()
+                self.assertTrue(all(pipeline.get_status(self.plays).values()))
+                status = pipeline.run(self.plays, processes=processes)
+                self.assertSetEqual(set(status.values()), {RAN})
+                with open(_file("summary")) as f:
+                    self.assertEqual(f.read(), "3")
+
+                # A new pipeline reads the state of the previous one.
+                pipeline = self.get_pipeline()
+                self.assertFalse(any(pipeline.get_status(self.plays).values()))
+                status = pipeline.run(self.plays, processes=processes)
+                self.assertSetEqual(set(status.values()), {FRESH})
+
+                # Rewriting an input with the same content reruns the
+                # tasks reading changed files only.
+                stat = os.stat(_file("a.in"))
+                os.utime(
+                    _file("a.in"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9)
+                )
+                status = pipeline.run(self.plays, processes=processes)
+                self.assertListEqual(
+                    [task for task, value in status.items() if value == RAN],
+                    [("copy", "a"), ("count", "a")],
+                )
+                self.assertEqual(status[("summary", None)], FRESH)
+
+                status = pipeline.run(["b"], ["count"], processes=processes, force=True)
+                self.assertListEqual(list(status), [("copy", "b"), ("count", "b")])
+                self.assertSetEqual(set(status.values()), {RAN})
+
+    def test_run_failures(self):
+        pipeline = self.get_pipeline()
+        status = pipeline.run(["a", "bad"])
+        self.assertEqual(status[("copy", "a")], RAN)
+        self.assertEqual(status[("count", "a")], RAN)
+        self.assertEqual(status[("copy", "bad")], FAILED)
+        self.assertEqual(status[("count", "bad")], BLOCKED)
+        self.assertEqual(status[("summary", None)], BLOCKED)
+        status = pipeline.run(["missing"], ["copy"])
+        self.assertEqual(status[("copy", "missing")], FAILED)
+
+    def test_run_missing_inputs(self):
+        pipeline = self.get_pipeline()
+        pipeline.run(["a", "b"])
+        # Only the outputs of the first stage are available for a.
+        os.remove(_file("a.in"))
+        os.remove(_file("a.count"))
+        status = pipeline.get_status(["a", "b"], force=True)
+        self.assertIsNone(status[("copy", "a")])
+        self.assertEqual(status[("count", "a")], "forced")
+        for force in [False, True]:
+            status = pipeline.run(["a", "b"], force=force)
+            self.assertEqual(status[("copy", "a")], FRESH)
+            self.assertEqual(status[("count", "a")], RAN)
+            self.assertEqual(status[("summary", None)], RAN)
+        self.assertTrue(os.path.exists(_file("a.count")))
+        os.remove(_file("a.out"))
+        status = pipeline.run(["a"])
+        self.assertEqual(status[("copy", "a")], FAILED)
+        self.assertEqual(status[("count", "a")], BLOCKED)
+
+    def test_stages(self):
+        pipeline = Pipeline(STAGES, self.state_file)
+        self.assertListEqual(
+            list(pipeline.stages),
+            [
+                "preprocess",
+                "representations",
+                "hypergraph_representations",
+                "rankings",
+                "statistics",
+                "plots",
+            ],
+        )
+        tasks = pipeline.get_tasks(["hamlet", "romeo-and-juliet"])
+        self.assertEqual(len(tasks), 4 * 2 + 2)
+        self.assertListEqual(
+            tasks[("rankings", "hamlet")],
+            [("representations", "hamlet"), ("hypergraph_representations", "hamlet")],
+        )
+        self.assertEqual(len(tasks[("plots", None)]), 6)
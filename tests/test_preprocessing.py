@@ -6,12 +6,14 @@ import pandas as pd
 
 from hyperbard.preprocessing import (
     get_agg_xml_df,
+    get_agg_xml_dfs,
     get_aggregated,
     get_attrs,
     get_body,
     get_cast_df,
     get_descendants_ids,
     get_grouped_df,
+    get_onstage_variants,
     get_raw_xml_df,
     get_soup,
     get_who_attributes,
@@ -48,6 +50,33 @@ class PreprocessingTest(XMLTestCase):
         self.assertEqual(agg_df.at[0, "stagegroup"], 1)
         self.assertEqual(agg_df.at[1, "stagegroup"], 1)
 
+    def test_get_agg_xml_dfs(self):
+        df = get_raw_xml_df(self.toy_xml_file)
+        agg_dfs = get_agg_xml_dfs(df)
+        pd.testing.assert_frame_equal(agg_dfs["scene"], get_agg_xml_df(df))
+        self.assertListEqual(
+            agg_dfs["speaker"].onstage.tolist(), agg_dfs["speaker"].speaker.tolist()
+        )
+        with self.assertRaises(ValueError):
+            get_agg_xml_dfs(df, policies=["play"])
+
+    def test_get_onstage_variants(self):
+        xml_df = get_xml_df(get_body(self.soup))
+        set_act(xml_df)
+        set_scene(xml_df)
+        variants = get_onstage_variants(xml_df)
+        set_onstage(xml_df)
+        self.assertListEqual(variants["scene"], xml_df.onstage.tolist())
+        # The toy play has a single scene, so only speaker-only presence differs.
+        self.assertListEqual(variants["act"], variants["scene"])
+        self.assertListEqual(variants["none"], variants["scene"])
+        self.assertEqual(
+            xml_df.onstage[[x == "#Philostrate_MND" for x in variants["speaker"]]].iloc[
+                0
+            ],
+            "#ATTENDANTS_MND #Hippolyta_MND #Philostrate_MND #Theseus_MND",
+        )
+
     def test_get_aggregated(self):
         raw_df = get_raw_xml_df(self.toy_xml_file)
         agg_df = get_aggregated(raw_df)
@@ -0,0 +1,147 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.graph_io import hypergraph_from_edges
+from hyperbard.hypergraph_representations import (
+    get_hypergraph_edges,
+    get_multi_directed_hypergraph_edges,
+)
+from hyperbard.ranking import (
+    degree_wrapper,
+    directed_hypergraph_degrees,
+    get_batched_character_ranking_df,
+    get_character_ranking,
+    get_character_ranking_df,
+    get_degree_matrix,
+    get_representation,
+    rank_degree_matrix,
+    s_degree,
+    s_degrees,
+)
+from hyperbard.utils import get_frame_cache
+from tests.xml_testcase import XMLTestCase
+
+
+class RankingTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.edges, _ = get_hypergraph_edges(
+            self.toy_agg_df, ["act", "scene", "stagegroup"]
+        )
+
+    def test_s_degrees(self):
+        H = hypergraph_from_edges(self.edges)
+        degrees = s_degrees(H, weight="n_lines")
+        self.assertSetEqual(
+            set(degrees.keys()),
+            {(s, superlevel) for s in range(1, 8) for superlevel in [True, False]},
+        )
+        for (s, superlevel), values in degrees.items():
+            self.assertDictEqual(
+                values, s_degree(H, s=s, weight="n_lines", superlevel=superlevel)
+            )
+        degrees = s_degrees(H, s_values=[4])
+        self.assertEqual(degrees[(4, True)]["#Theseus_MND"], 3)
+        self.assertEqual(degrees[(4, False)]["#Theseus_MND"], 2)
+
+    def test_get_character_ranking_hypergraph(self):
+        H = CompactHypergraph.from_edges(self.edges)
+        representations = [
+            {
+                "name": f"{idx:02d}-s{i}-{superlevel}",
+                "graph": H,
+                "weight": "n_lines",
+                "s": i,
+                "superlevel": superlevel,
+            }
+            for idx, (i, superlevel) in enumerate([(1, False), (4, False), (4, True)])
+        ]
+        ranking = get_character_ranking(representations)
+        self.assertListEqual(list(ranking.columns), ["s1-False", "s4-False", "s4-True"])
+        self.assertEqual(ranking["s1-False"].max(), 1)
+        self.assertEqual(ranking.at["#Philostrate_MND", "s4-False"], 1)
+        self.assertEqual(ranking.at["#Hippolyta_MND", "s4-False"], 4)
+        self.assertEqual(ranking.at["#Philostrate_MND", "s4-True"], 4)
+        self.assertEqual(ranking.at["#Egeus_MND", "s4-True"], 5)
+
+    def test_directed_hypergraph_degrees(self):
+        edges = get_multi_directed_hypergraph_edges(self.toy_agg_df)
+        degrees = directed_hypergraph_degrees(edges, weight="n_lines")
+        self.assertListEqual(list(degrees.loc["#Theseus_MND"]), [7, 7])
+        self.assertListEqual(list(degrees.loc["#Egeus_MND"]), [1, 2])
+        self.assertListEqual(list(degrees.loc["#Philostrate_MND"]), [11, 0])
+        degrees = directed_hypergraph_degrees(edges)
+        self.assertListEqual(list(degrees.loc["#Theseus_MND"]), [3, 2])
+        self.assertDictEqual(
+            degree_wrapper(edges, degree_type="out"), degrees["out"].to_dict()
+        )
+        self.assertEqual(degree_wrapper(edges)["#Hippolyta_MND"], 4)
+
+    def test_get_character_ranking_df(self):
+        ranking = get_character_ranking_df(self.toy_agg_df)
+        self.assertEqual(ranking.shape, (8, 18))
+        self.assertListEqual(
+            list(ranking["17_hg-speech-wd_in"]),
+            list(ranking["05_se-speech-wd_in"]),
+        )
+        self.assertEqual(ranking.at["#Theseus_MND", "18_hg-speech-wd_out"], 1)
+
+    def test_get_degree_matrix(self):
+        degrees = get_degree_matrix(self.toy_agg_df)
+        self.assertEqual(degrees.shape, (8, 18))
+        theseus = degrees.loc["#Theseus_MND"]
+        self.assertEqual(theseus["02_se-scene-w"], 14)
+        self.assertEqual(theseus["07_ce-scene-b"], 7)
+        self.assertEqual(theseus["08_ce-scene-mb"], 15)
+        self.assertEqual(theseus["09_ce-scene-mw"], 51)
+        self.assertEqual(theseus["05_se-speech-wd_in"], 7)
+        self.assertEqual(theseus["18_hg-speech-wd_out"], 7)
+
+    def test_get_batched_character_ranking_df(self):
+        self.assertTrue(
+            get_batched_character_ranking_df(self.toy_agg_df).equals(
+                get_character_ranking_df(self.toy_agg_df)
+            )
+        )
+
+    def test_rank_degree_matrix(self):
+        degrees = pd.DataFrame(
+            {"a": [3, 5, 3, 1], "b": [2.5, np.nan, 2.5, 4.0]},
+            index=["w", "x", "y", "z"],
+        )
+        ranks = rank_degree_matrix(degrees)
+        self.assertListEqual(list(ranks["a"]), [2, 1, 2, 4])
+        self.assertEqual(ranks["a"].dtype, np.int64)
+        self.assertListEqual(list(ranks["b"].fillna(0)), [2, 0, 2, 1])
+
+    def test_get_character_ranking_df_lazy(self):
+        columns = ["07_ce-scene-b", "13_hg-scene-mb"]
+        ranking = get_character_ranking_df(self.toy_agg_df, columns=columns)
+        self.assertListEqual(list(ranking.columns), columns)
+        representations = get_frame_cache(self.toy_agg_df)["representations"]
+        self.assertSetEqual(set(representations), {"ce-scene-w", "hg-scene-mw"})
+        self.assertIs(
+            get_representation(self.toy_agg_df, "ce-scene-w"),
+            representations["ce-scene-w"],
+        )
+        # Shared representations cannot be changed by callers.
+        with self.assertRaises(nx.NetworkXError):
+            get_representation(self.toy_agg_df, "ce-scene-w").add_edge("x", "y")
+        H = get_representation(self.toy_agg_df, "hg-scene-mw")
+        for array in [H.node_ids, H.indptr, H.indices, H.edge_attributes["n_lines"]]:
+            with self.assertRaises(ValueError):
+                array[0] = array[1]
+        with self.assertRaises(TypeError):
+            H.edge_ids[0] = H.edge_ids[1]
+        with self.assertRaises(TypeError):
+            H.edge_attributes["n_lines"] = H.edge_attributes["n_lines"] + 1
+        self.assertListEqual(
+            H.to_edges().n_lines.tolist(), list(H.edge_attributes["n_lines"])
+        )
+        edges = get_representation(self.toy_agg_df, "hg-speech-wd")
+        edges.drop(edges.index, inplace=True)
+        self.assertFalse(get_representation(self.toy_agg_df, "hg-speech-wd").empty)
+        with self.assertRaises(ValueError):
+            get_character_ranking_df(self.toy_agg_df, columns=["07_ce-scene"])
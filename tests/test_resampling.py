@@ -0,0 +1,51 @@
+import numpy as np
+
+from hyperbard.ranking import get_character_ranking_df, get_degree_matrix
+from hyperbard.resampling import (
+    bootstrap_rank_correlations,
+    get_unit_contributions,
+    jackknife_corpus_rank_variance,
+    jackknife_rank_variance,
+    permutation_test_rank_correlations,
+)
+from tests.xml_testcase import XMLTestCase
+
+
+class ResamplingTest(XMLTestCase):
+    def test_get_unit_contributions(self):
+        degrees = get_degree_matrix(self.toy_agg_df)
+        for level, n_units, n_columns in [("scene", 3, 18), ("group", 4, 11)]:
+            contributions = get_unit_contributions(self.toy_agg_df, level)
+            self.assertEqual(contributions.n_units, n_units)
+            self.assertEqual(len(contributions.columns), n_columns)
+            np.testing.assert_array_equal(
+                contributions.degrees(np.ones(n_units))[0],
+                degrees[contributions.columns].values,
+            )
+        # Drawing only the first scene leaves Hermia out of all representations.
+        resampled = contributions.degrees([[2, 0, 0, 0]])[0]
+        hermia = list(contributions.characters).index("#Hermia_MND")
+        self.assertTrue(np.isnan(resampled[hermia]).all())
+
+    def test_bootstrap_rank_correlations(self):
+        kwargs = dict(n_resamples=50, level="group", method="spearman", seed=1)
+        intervals = bootstrap_rank_correlations(self.toy_agg_df, **kwargs)
+        self.assertSetEqual(set(intervals), {"correlation", "lower", "upper"})
+        self.assertEqual(intervals["lower"].shape, (11, 11))
+        self.assertTrue((intervals["lower"] <= intervals["upper"] + 1e-12).all().all())
+        again = bootstrap_rank_correlations(self.toy_agg_df, n_jobs=2, **kwargs)
+        self.assertTrue(intervals["upper"].equals(again["upper"]))
+
+    def test_permutation_test_rank_correlations(self):
+        ranking = get_character_ranking_df(self.toy_agg_df)
+        p_values = permutation_test_rank_correlations(ranking, n_permutations=200)
+        self.assertEqual(p_values.shape, (18, 18))
+        self.assertTrue(((p_values > 0) & (p_values <= 1)).all().all())
+
+    def test_jackknife_rank_variance(self):
+        variance = jackknife_rank_variance(self.toy_agg_df)
+        self.assertEqual(variance.shape, (8, 18))
+        self.assertEqual(variance.loc["#Theseus_MND", "01_se-scene-b"], 0)
+        self.assertGreater(variance["02_se-scene-w"].max(), 0)
+        corpus = jackknife_corpus_rank_variance({"toy": self.toy_agg_df}, "group")
+        self.assertEqual(corpus["toy"].shape, (8, 11))
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from hyperbard.event_log import EventLog, get_event_log
+from hyperbard.onstage_index import OnstageIntervalIndex, get_onstage_interval_index
+from hyperbard.preprocessing import get_agg_xml_df, get_raw_xml_df
+from hyperbard.run_preprocessing import handle_file
+from hyperbard.track_time import get_profiler
+from tests.xml_testcase import XMLTestCase
+
+
+class RunPreprocessingTest(XMLTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        # Keep the profile records of the runs out of RESOURCE_USAGE_PATH.
+        self.profile_file = get_profiler().file
+        get_profiler().file = os.path.join(self.directory.name, "profile.jsonl")
+
+    def tearDown(self) -> None:
+        get_profiler().file = self.profile_file
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_handle_file_with_raw_csv(self):
+        raw_df = get_raw_xml_df(self.toy_xml_file)
+        path = os.path.join(self.directory.name, "data")
+        os.makedirs(path)
+        # Files kept from an earlier run; the .raw.csv is used to build
+        # the missing files (the toy play has no cast list).
+        open(f"{path}/tei.cast.csv", "w").close()
+        raw_df.to_csv(f"{path}/tei.raw.csv", index=False)
+        handle_file(self.toy_xml_file, path=path)
+        self.assertListEqual(
+            sorted(os.listdir(path)),
+            [
+                "tei.agg.csv",
+                "tei.cast.csv",
+                "tei.events.npz",
+                "tei.onstage.npz",
+                "tei.raw.csv",
+            ],
+        )
+        agg_df = pd.read_csv(f"{path}/tei.agg.csv")
+        self.assertEqual(len(agg_df), len(get_agg_xml_df(raw_df)))
+        pd.testing.assert_frame_equal(
+            EventLog.load(f"{path}/tei.events.npz").to_frame(),
+            get_event_log(raw_df).to_frame(),
+        )
+        index = OnstageIntervalIndex.load(f"{path}/tei.onstage.npz")
+        expected = get_onstage_interval_index(raw_df)
+        np.testing.assert_array_equal(index.sets, expected.sets)
+        np.testing.assert_array_equal(index.starts, expected.starts)
@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+from hyperbard.preprocessing import get_agg_xml_df, get_cast_df, get_raw_xml_df
+from hyperbard.synthetic import get_synthetic_play, write_synthetic_play
+from tests.xml_testcase import XMLTestCase
+
+
+class SyntheticTest(XMLTestCase):
+    def test_write_synthetic_play(self):
+        parameters = dict(n_characters=12, n_acts=2, scenes_per_act=3)
+        parameters.update(speeches_per_scene=8, churn=0.5)
+        self.assertEqual(
+            get_synthetic_play(seed=1, **parameters),
+            get_synthetic_play(seed=1, **parameters),
+        )
+        self.assertNotEqual(
+            get_synthetic_play(seed=1, **parameters),
+            get_synthetic_play(seed=2, **parameters),
+        )
+        with tempfile.TemporaryDirectory() as path:
+            file = os.path.join(path, "synthetic.xml")
+            write_synthetic_play(file, seed=1, **parameters)
+            raw_df = get_raw_xml_df(file)
+            cast_df = get_cast_df(file)
+        self.assertEqual(len(cast_df), 12)
+        self.assertEqual(raw_df.query("tag == 'sp'").shape[0], 2 * 3 * 8)
+        agg_df = get_agg_xml_df(raw_df)
+        self.assertEqual(agg_df.n_lines.sum(), raw_df.query("tag == 'l'").shape[0])
+        self.assertSetEqual(set(agg_df.act), {1, 2})
+        self.assertSetEqual(set(agg_df.scene), {1, 2, 3})
+        for speaker, onstage in zip(agg_df.speaker, agg_df.onstage):
+            self.assertIn(speaker, onstage.split())
+        with self.assertRaises(ValueError):
+            get_synthetic_play(n_characters=1)
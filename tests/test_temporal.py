@@ -0,0 +1,64 @@
+import numpy as np
+
+from hyperbard.compact_hypergraph import CompactHypergraph
+from hyperbard.hypergraph_representations import get_multi_directed_hypergraph_edges
+from hyperbard.ranking import get_degree_matrix
+from hyperbard.temporal import (
+    ADDITIVE_RANKING_COLUMNS,
+    get_prefix_sum_index,
+    get_ranking_trajectory,
+    get_snapshot_statistics,
+    iter_snapshots,
+)
+from tests.xml_testcase import XMLTestCase
+
+
+class TemporalTest(XMLTestCase):
+    def test_get_prefix_sum_index(self):
+        index = get_prefix_sum_index(self.toy_agg_df)
+        self.assertIs(index, get_prefix_sum_index(self.toy_agg_df))
+        self.assertEqual(len(index), len(self.toy_agg_df))
+        names = [name for name, _, _ in ADDITIVE_RANKING_COLUMNS]
+        degrees = get_degree_matrix(self.toy_agg_df)[names].fillna(0)
+        np.testing.assert_array_equal(
+            index.cumulative()[names].loc[degrees.index].values, degrees.values
+        )
+        self.assertEqual(index.totals.n_lines.iloc[-1], self.toy_agg_df.n_lines.sum())
+        # Windows are differences of prefix sums.
+        np.testing.assert_array_equal(
+            index.window(2, 4).values,
+            index.cumulative(4).values - index.cumulative(2).values,
+        )
+        # Only characters onstage in the window are ranked.
+        stop = index.row_of_setting(self.toy_agg_df.setting.iloc[0])
+        self.assertEqual(
+            len(index.ranking(0, stop)),
+            len(self.toy_agg_df.onstage.iloc[0].split()),
+        )
+
+    def test_get_ranking_trajectory(self):
+        trajectory = get_ranking_trajectory(self.toy_agg_df, by=["act", "scene"])
+        self.assertListEqual(list(trajectory.columns[:3]), ["act", "scene", "node"])
+        last = trajectory[trajectory.scene == trajectory.scene.max()]
+        self.assertEqual(
+            len(last), len(get_prefix_sum_index(self.toy_agg_df).characters)
+        )
+
+    def test_iter_snapshots(self):
+        edges = get_multi_directed_hypergraph_edges(self.toy_agg_df)
+        snapshots = list(iter_snapshots(edges, size=2, step=1))
+        self.assertEqual(
+            snapshots[0][:2], (edges.setting.iloc[0], edges.setting.iloc[0] + 2)
+        )
+        for lo, hi, H in snapshots:
+            window = edges[(edges.setting >= lo) & (edges.setting < hi)]
+            expected = CompactHypergraph.from_edges(window.reset_index(drop=True))
+            self.assertListEqual(list(H.node_ids), list(expected.node_ids))
+            self.assertDictEqual(
+                H.degree(weight="n_lines"), expected.degree(weight="n_lines")
+            )
+        statistics = get_snapshot_statistics(edges, size=100, axis="lines")
+        self.assertEqual(statistics.n_edges.sum(), len(edges))
+        self.assertEqual(statistics.n_lines.sum(), edges.n_lines.sum())
+        with self.assertRaises(ValueError):
+            next(iter_snapshots(edges, size=2, axis="words"))
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+
+from hyperbard.track_time import RUN_ID_VARIABLE, Profiler
+
+
+class ProfilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, "profile.jsonl")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def get_records(self):
+        with open(self.file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_span_outside_run(self):
+        profiler = Profiler(self.file, cprofile=[], tracemalloc=[])
+        with profiler.span("play") as record:
+            self.assertIsNone(record)
+        self.assertFalse(os.path.exists(self.file))
+
+    def test_run(self):
+        profiler = Profiler(self.file, cprofile=["representation"], tracemalloc=[])
+        with profiler.run("run"):
+            for play in ["hamlet", "romeo-and-juliet"]:
+                with profiler.span("play", play=play):
+                    with profiler.span("representation", name="ce-group-w"):
+                        sum(range(1000))
+        records = self.get_records()
+        self.assertListEqual(
+            [record["path"] for record in records],
+            ["run/play/representation", "run/play"] * 2 + ["run"],
+        )
+        self.assertEqual(len({record["run_id"] for record in records}), 1)
+        spans = {record["span_id"]: record for record in records}
+        self.assertIsNone(records[-1]["parent_id"])
+        for record in records[:-1]:
+            parent = spans[record["parent_id"]]
+            self.assertTrue(record["path"].startswith(parent["path"]))
+            self.assertLessEqual(
+                parent["attributes"].items(), record["attributes"].items()
+            )
+        self.assertDictEqual(
+            records[2]["attributes"], {"play": "romeo-and-juliet", "name": "ce-group-w"}
+        )
+        for record in records:
+            self.assertEqual(record["status"], "ok")
+            self.assertGreaterEqual(record["wall"], 0)
+            self.assertGreaterEqual(record["cpu"], 0)
+            self.assertIn("allocated_blocks", record)
+            self.assertEqual("cprofile" in record, record["stage"] == "representation")
+        self.assertTrue(os.path.exists(records[0]["cprofile"]))
+
+    def test_tracemalloc(self):
+        profiler = Profiler(self.file, cprofile=[], tracemalloc=["all"])
+        with self.assertRaises(KeyError):
+            with profiler.run("run"):
+                with profiler.span("play"):
+                    data = [list(range(100)) for _ in range(100)]
+                raise KeyError(len(data))
+        records = self.get_records()
+        self.assertListEqual(
+            [record["path"] for record in records], ["run/play", "run"]
+        )
+        self.assertEqual(records[-1]["status"], "error: KeyError")
+        for record in records:
+            self.assertGreater(record["tracemalloc_peak_mb"], 0)
+            self.assertTrue(record["tracemalloc_top"])
+
+    def test_span_in_worker(self):
+        profiler = Profiler(self.file, cprofile=[], tracemalloc=[])
+        os.environ[RUN_ID_VARIABLE] = "parent"
+        try:
+            with profiler.span("play", play="hamlet"):
+                pass
+        finally:
+            del os.environ[RUN_ID_VARIABLE]
+        (record,) = self.get_records()
+        self.assertEqual(record["run_id"], "parent")
+        self.assertEqual(record["path"], "play")
+
+    def test_run_ids(self):
+        profiler = Profiler(self.file, cprofile=[], tracemalloc=[])
+        for _ in range(2):
+            with profiler.run("run"):
+                pass
+        self.assertEqual(len({record["run_id"] for record in self.get_records()}), 2)
@@ -1,9 +1,12 @@
 import math
 from unittest import TestCase
 
+import pandas as pd
+
 from hyperbard.utils import (
     character_string_to_sorted_list,
     get_filename_base,
+    get_frame_cache,
     get_name_from_identifier,
     remove_hashtag,
     remove_play_abbreviation,
@@ -96,3 +99,20 @@ class UtilsTest(TestCase):
         who_string_nan = float("nan")
         self.assertEqual(string_to_set(who_string_nonan), {"#A", "#B"})
         self.assertTrue(math.isnan(string_to_set(who_string_nan)))
+
+    def test_get_frame_cache(self):
+        df = pd.DataFrame({"a": [1, 2]})
+        cache = get_frame_cache(df)
+        cache["key"] = "value"
+        self.assertIs(get_frame_cache(df), cache)
+        self.assertNotIn("key", get_frame_cache(pd.DataFrame({"a": [1, 2]})))
+        df["b"] = [3, 4]
+        self.assertNotIn("key", get_frame_cache(df))
+        get_frame_cache(df)["key"] = "value"
+        df.loc[1, "a"] = 5
+        self.assertNotIn("key", get_frame_cache(df))
+        df = pd.DataFrame({"who": [{"#A"}, {"#B"}]})
+        get_frame_cache(df)["key"] = "value"
+        self.assertIn("key", get_frame_cache(df))
+        df.at[0, "who"] = {"#C"}
+        self.assertNotIn("key", get_frame_cache(df))